@@ -0,0 +1,85 @@
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Body, Depends, Header, HTTPException
+from fastapi.responses import FileResponse
+
+from app.core.config import settings
+from app.services.profiling import ProfilingError
+from app.services.proof_jobs import QUEUED
+from app.services.shared import profiler, proof_jobs  # Use shared instances
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Admin endpoints need the X-Admin-Token header; they don't exist without ADMIN_TOKEN."""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+@router.post("/profiling")
+async def arm_profiling(data: dict = Body(...)):
+    """
+    Arm a profiling session.
+
+    Body, one of:
+        {"route": "/api/v1/proofs/{model_id}/{proof_id}/verify", "method": "POST", "count": 5}
+        {"proof_id": "<queued job id>"}
+        {"job": true}  (the next proof job)
+
+    Each profiled request or job produces a capture: cProfile stats, a
+    tracemalloc snapshot and a per-stage breakdown of its EzklService and
+    AkaveService calls. Capture ids are listed on the session.
+    """
+    try:
+        if data.get("route"):
+            return profiler.arm_route(data["route"], int(data.get("count", 1)), data.get("method"))
+        if data.get("proof_id"):
+            job = proof_jobs.get(data["proof_id"])
+            if job is None:
+                raise HTTPException(status_code=404, detail="Proof job not found")
+            if job["status"] != QUEUED:
+                raise HTTPException(status_code=400, detail=f"Proof job is already {job['status']}")
+            return profiler.arm_job(data["proof_id"])
+        if data.get("job"):
+            return profiler.arm_job()
+    except (ProfilingError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    raise HTTPException(status_code=400, detail="Provide a route, a proof_id or job: true")
+
+@router.get("/profiling")
+async def profiling_status():
+    """Armed and finished profiling sessions with their capture ids."""
+    return profiler.stats()
+
+@router.delete("/profiling/{session_id}")
+async def disarm_profiling(session_id: str):
+    """Stop a session before it has used up its requests."""
+    session = profiler.disarm(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Profiling session not found")
+    return session
+
+@router.get("/profiling/captures/{capture_id}")
+async def get_capture(capture_id: str):
+    """A capture's summary: target, wall time, per-stage breakdown and stage events."""
+    try:
+        return profiler.summary(capture_id)
+    except ProfilingError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.get("/profiling/captures/{capture_id}/{name}")
+async def download_capture_file(capture_id: str, name: str):
+    """
+    Download a capture file: profile.pstats (load with pstats.Stats),
+    profile.txt, tracemalloc.snapshot (tracemalloc.Snapshot.load),
+    tracemalloc.txt or summary.json.
+    """
+    try:
+        path = profiler.capture_path(capture_id, name)
+    except ProfilingError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return FileResponse(path, filename=f"{capture_id}-{name}")
@@ -0,0 +1,85 @@
+from fastapi import APIRouter, HTTPException, Body, Query, Response
+from app.services.shared import aggregation_service, aggregation_jobs, akave_service as akave  # Use shared instances
+from app.services.aggregation import AggregationError
+from app.services.aggregation_jobs import FAILED
+from app.core.config import settings
+
+router = APIRouter()
+
+@router.post("")
+async def create_aggregate(
+    data: dict = Body(...),
+    wait: bool = Query(False, description="Block until the aggregate is stored instead of returning a job id")
+):
+    """
+    Queue an aggregation of stored proofs of a model into one EVM-verifiable
+    proof and return its job id immediately. Poll GET /aggregates/jobs/{job_id}
+    for the job status.
+
+    Body: {"model_id": "parity", "proof_ids": ["<proof_id>", ...]}
+
+    The proofs must have been generated with PROOF_TYPE=for-aggr. A finished
+    job carries the aggregate record (aggregate_id, covered proof_ids, storage
+    keys) with the calldata for the on-chain aggregate verifier.
+    """
+    model_id = data.get("model_id")
+    proof_ids = data.get("proof_ids")
+    if not model_id or not isinstance(proof_ids, list):
+        raise HTTPException(status_code=400, detail="model_id and a list of proof_ids are required")
+
+    try:
+        job = aggregation_jobs.submit(model_id, [str(p) for p in proof_ids])
+    except AggregationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not wait:
+        return {
+            "job_id": job["job_id"],
+            "model_id": job["model_id"],
+            "proof_ids": job["proof_ids"],
+            "status": job["status"],
+            "status_url": f"{settings.API_V1_STR}/aggregates/jobs/{job['job_id']}",
+            "message": "Aggregation job queued"
+        }
+
+    job = await aggregation_jobs.wait(job["job_id"])
+    if job["status"] == FAILED:
+        raise HTTPException(status_code=500, detail=f"Aggregation failed: {job['error']}")
+    return {**job["aggregate"], "job_id": job["job_id"], "stage_timings": job["stage_timings"]}
+
+@router.get("/jobs/{job_id}")
+async def get_aggregation_job(job_id: str):
+    """Report the status of an aggregation job: queued, running, completed or failed."""
+    job = aggregation_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Aggregation job not found")
+    return job
+
+@router.get("/{aggregate_id}")
+async def get_aggregate(aggregate_id: str):
+    """Get an aggregate record and the proof_ids it covers."""
+    record = aggregation_service.get(aggregate_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Aggregate not found")
+    return record
+
+@router.get("/{aggregate_id}/calldata")
+async def get_aggregate_calldata(aggregate_id: str):
+    """Raw EVM calldata of an aggregate proof."""
+    record = aggregation_service.get(aggregate_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Aggregate not found")
+    result = await akave.download_if_changed(record["calldata_key"])
+    if "error" in result:
+        raise HTTPException(status_code=404, detail="Aggregate calldata not found")
+    return Response(content=result["data"], media_type="application/octet-stream")
+
+@router.post("/{aggregate_id}/verify")
+async def verify_aggregate(aggregate_id: str):
+    """Verify an aggregate proof off-chain with the aggregation verification key."""
+    try:
+        return await aggregation_service.verify(aggregate_id)
+    except AggregationError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Verification failed: {str(e)}")
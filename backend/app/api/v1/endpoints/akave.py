@@ -1,13 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
 from typing import Dict, Any, Optional
 from app.services.akave import AkaveService
+from app.services.shared import akave_service, ezkl_service
 import json
 from fastapi.responses import Response
 
 router = APIRouter()
 
 def get_akave_service():
-    return AkaveService()
+    # Reuse the process-wide client instead of building one per request
+    return akave_service
 
 @router.get("/test")
 async def test_connection(
@@ -34,6 +36,7 @@ async def upload_model_settings(
     result = await akave.upload_model_settings(model_id, settings)
     if "error" in result:
         raise HTTPException(status_code=500, detail=result["error"])
+    ezkl_service.verifiers.invalidate(model_id)
     return result
 
 @router.get("/model-settings/{model_id}")
@@ -62,6 +65,7 @@ async def upload_verification_key(
     result = await akave.upload_verification_key(model_id, vk_data)
     if "error" in result:
         raise HTTPException(status_code=500, detail=result["error"])
+    ezkl_service.verifiers.invalidate(model_id)
     return result
 
 @router.get("/verification-key/{model_id}")
@@ -1,5 +1,8 @@
 from fastapi import APIRouter, HTTPException, Body
+from fastapi.responses import StreamingResponse
 from app.services.shared import ezkl_service
+from app.core.config import settings
+import json
 
 router = APIRouter()
 
@@ -48,6 +51,68 @@ async def run_inference(
         raise HTTPException(status_code=500, detail=f"Inference failed: {str(e)}")
 
 
+@router.post("/batch")
+async def run_batch_inference(
+    data: dict = Body(...)
+):
+    """
+    Run model inference on many input vectors in one call.
+    
+    Body: {"model_id": "parity", "input_vectors": [[1, 0, 1, 0, 1, 0], ...], "stream": false}
+    
+    Each input is validated and predicted independently, so one bad vector
+    doesn't fail the batch. With "stream": true the per-item results are
+    streamed as NDJSON, followed by a summary line.
+    """
+    input_vectors = data.get("input_vectors")
+    model_id = data.get("model_id", "parity")
+    stream = bool(data.get("stream", False))
+    
+    # Validate input
+    if not isinstance(input_vectors, list) or not input_vectors:
+        raise HTTPException(status_code=400, detail="input_vectors must be a non-empty list of input vectors")
+    
+    if len(input_vectors) > settings.INFERENCE_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"input_vectors may contain at most {settings.INFERENCE_BATCH_MAX_ITEMS} items"
+        )
+    
+    try:
+        results = ezkl_service.iter_predict_batch(input_vectors, model_id)
+        # Fail fast on an unknown model before a streamed response has started
+        first = await results.__anext__()
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Inference failed: {str(e)}")
+    
+    async def all_results():
+        yield first
+        async for item in results:
+            yield item
+    
+    if stream:
+        async def ndjson():
+            succeeded = failed = 0
+            async for item in all_results():
+                if "error" in item:
+                    failed += 1
+                else:
+                    succeeded += 1
+                yield json.dumps(item) + "\n"
+            yield json.dumps({"summary": {"model_id": model_id, "succeeded": succeeded, "failed": failed}}) + "\n"
+        
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+    
+    items = [item async for item in all_results()]
+    failed = sum(1 for item in items if "error" in item)
+    return {
+        "model_id": model_id,
+        "results": items,
+        "succeeded": len(items) - failed,
+        "failed": failed
+    }
 
 @router.get("/latest-prediction")
 async def get_latest_prediction():
@@ -1,76 +1,242 @@
-from fastapi import APIRouter, HTTPException, Body, Query
+import asyncio
+import json
+import time
+from fastapi import APIRouter, HTTPException, Body, Query, Response, Header
+from fastapi.responses import StreamingResponse
 from app.models.proof import ProofRequest, ProofResponse
-from app.services.akave import AkaveService
-from app.services.shared import ezkl_service  # Use shared instance
-from typing import List, Optional
-import uuid
+from app.services.shared import ezkl_service, proof_index, proof_jobs, calldata_store  # Use shared instances
+from app.services.shared import akave_service as akave
+from app.services.proof_jobs import FAILED, UPLOADED
+from app.services.verifier_context import VerifierContextError
+from app.services.proof_index import parse_proof_key
+from app.utils import calldata, proof_codec, resources
+from app.core.config import settings
+from typing import List, Optional, Tuple
 
 router = APIRouter()
-akave = AkaveService()
 
 @router.post("/request")
-async def request_proof(request: ProofRequest):
+async def request_proof(
+    request: ProofRequest,
+    wait: bool = Query(False, description="Block until the proof is uploaded instead of returning a job id")
+):
+    """
+    Queue a proof for the latest prediction and return its job id (the proof_id)
+    immediately. Poll GET /proofs/{proof_id} for the job status.
+    """
     try:
-        # Generate proof for the latest prediction
-        proof_result = await ezkl_service.generate_proof_for_latest_prediction()
-        
-        # Generate a unique ID for this proof
-        proof_id = str(uuid.uuid4())
-        
-        # Upload proof to Akave storage
-        model_id = proof_result["model_id"]
-        proof_data = proof_result["proof_data"]
-        
-        upload_result = await akave.upload_proof(
-            model_id=model_id,
-            proof_id=proof_id,
-            proof_data=proof_data
-        )
-        
-        if "error" in upload_result:
-            raise HTTPException(status_code=500, detail=f"Failed to upload proof: {upload_result['error']}")
-        
-        # Return data in the format the frontend expects
+        prediction = ezkl_service.snapshot_latest_prediction()
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    job = proof_jobs.submit(prediction)
+    
+    if not wait:
         return {
-            "proof_id": proof_id,
-            "model_id": model_id,
-            "key": upload_result.get("key"),
-            "etag": upload_result.get("etag"),
-            "checksum_sha256": upload_result.get("checksum_sha256"),
-            "checksum_crc32": upload_result.get("checksum_crc32"),
-            "checksum_type": upload_result.get("checksum_type"),
-            "bucket": upload_result.get("bucket"),
-            "message": "Proof generated and uploaded successfully"
+            "proof_id": job["proof_id"],
+            "job_id": job["job_id"],
+            "model_id": job["model_id"],
+            "key": job["key"],
+            "status": job["status"],
+            "status_url": f"{settings.API_V1_STR}/proofs/{job['proof_id']}",
+            "message": "Proof job queued"
         }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    
+    job = await proof_jobs.wait(job["job_id"])
+    if job["status"] == FAILED:
+        raise HTTPException(status_code=500, detail=job["error"])
+    
+    # Return data in the format the frontend expects
+    return {
+        "proof_id": job["proof_id"],
+        "model_id": job["model_id"],
+        "key": job.get("key"),
+        "etag": job.get("etag"),
+        "checksum_sha256": job.get("checksum_sha256"),
+        "checksum_crc32": job.get("checksum_crc32"),
+        "checksum_type": job.get("checksum_type"),
+        "bucket": job.get("bucket"),
+        "status": job["status"],
+        "stage_timings": job["stage_timings"],
+        "resources": job.get("resources"),
+        "message": "Proof generated and uploaded successfully"
+    }
 
 @router.get("/{proof_id}", response_model=ProofResponse)
 async def get_proof(proof_id: str) -> ProofResponse:
-    try:
-        # TODO: Implement proof retrieval from storage
+    """Report the status of a proof job: queued, running, uploaded or failed."""
+    job = proof_jobs.get(proof_id)
+    if job is None:
+        # Not a recent job: look the stored proof up by id in the proof index
+        record = proof_index.get(proof_id)
+        if record is None:
+            raise HTTPException(status_code=404, detail="Proof not found")
         return ProofResponse(
             proof_id=proof_id,
-            status="completed",
-            proof_hash="0x..." # Mock hash
+            status=UPLOADED,
+            storage_location=record["key"],
+            model_id=record["model_id"],
+            predicted_digits=record["predicted_digits"],
+            input_vector=record["input_vector"],
+            created_at=record["created_at"],
+            finished_at=record["created_at"],
+            resources=resources.from_metadata(record["metadata"]),
+            etag=record["etag"]
         )
-    except Exception as e:
-        raise HTTPException(status_code=404, detail="Proof not found")
+    
+    return ProofResponse(
+        proof_id=job["proof_id"],
+        job_id=job["job_id"],
+        status=job["status"],
+        proof_hash=job.get("proof_hash"),
+        storage_location=job.get("key") if job["status"] == UPLOADED else None,
+        model_id=job["model_id"],
+        predicted_digits=job.get("predicted_digits"),
+        input_vector=job.get("input_vector"),
+        created_at=job["created_at"],
+        started_at=job.get("started_at"),
+        finished_at=job.get("finished_at"),
+        stage_timings=job["stage_timings"],
+        resources=job.get("resources"),
+        etag=job.get("etag"),
+        error=job.get("error")
+    )
 
 @router.get("/", response_model=List[dict])
-async def list_proofs(model_id: Optional[str] = Query(None)):
-    """List all proofs in the Akave bucket, optionally filtered by model_id."""
-    result = await akave.list_proofs(model_id=model_id)
+async def list_proofs(
+    response: Response,
+    model_id: Optional[str] = Query(None),
+    verification_status: Optional[str] = Query(None, description="valid or invalid"),
+    input_hash: Optional[str] = Query(None, description="sha256 of the canonical input vector"),
+    created_after: Optional[str] = Query(None, description="ISO 8601 timestamp"),
+    created_before: Optional[str] = Query(None, description="ISO 8601 timestamp"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    limit: int = Query(1000, ge=1)
+):
+    """
+    List stored proofs newest first, from the local proof index.
+    
+    Items keep the S3 object shape (Key, LastModified, ETag, Size, ...)
+    plus the indexed metadata. When there are more results, the cursor of
+    the next page is returned in the X-Next-Cursor header.
+    
+    Pages are served from the index right away. Until the bucket backfill
+    has completed, older proofs may be missing; the X-Index-Backfill header
+    says "running", "complete" or "failed" (details on /prover/status).
+    """
+    # Starts the backfill if it hasn't run yet (or retries a failed one),
+    # without waiting for it
+    proof_index.start_backfill(akave)
+    response.headers["X-Index-Backfill"] = proof_index.backfill_state()
+    
+    try:
+        records, next_cursor = proof_index.list(
+            model_id=model_id,
+            verification_status=verification_status,
+            input_hash=input_hash,
+            created_after=created_after,
+            created_before=created_before,
+            cursor=cursor,
+            limit=min(limit, settings.PROOF_LIST_MAX_LIMIT)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    
+    return [
+        {
+            "Key": record["key"],
+            "LastModified": record["created_at"],
+            "ETag": record["etag"],
+            "Size": record["size"],
+            "ChecksumSHA256": record["checksum_sha256"],
+            "ChecksumCRC32": record["checksum_crc32"],
+            **record
+        }
+        for record in records
+    ]
+
+@router.get("/{model_id}/{proof_id}/raw")
+async def download_proof_raw(
+    model_id: str,
+    proof_id: str,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    accept: Optional[str] = Header(None)
+):
+    """
+    Stream the stored proof file.
+    
+    Supports If-None-Match (304 when the ETag still matches) and a single
+    byte Range (206). The ETag and storage checksums are returned as headers.
+    
+    The representation follows the Accept header: proof JSON by default, or
+    the compact format for application/vnd.proofs-of-inference.proof+compact.
+    A proof stored in the other format is converted (Range is then ignored).
+    """
+    want_compact = proof_codec.prefers_compact(accept)
+    # Converted representations carry a suffixed ETag; storage only knows the base one
+    stored_etag = if_none_match.replace("-compact\"", "\"").replace("-json\"", "\"") if if_none_match else None
+    
+    result = await akave.open_proof_stream(model_id, proof_id, byte_range=range_header, if_none_match=stored_etag)
+    
+    if result["status"] == 304:
+        return Response(status_code=304, headers={"ETag": if_none_match, "Vary": "Accept"})
     if "error" in result:
-        raise HTTPException(status_code=500, detail=result["error"])
-    contents = result["response"].get("Contents", [])
-    proofs = []
-    for obj in contents:
-        key = obj["Key"]
-        # Filter for proof files (.json extension)
-        if key.startswith("proofs/") and key.endswith(".json"):
-            proofs.append(obj)
-    return proofs
+        if result["status"] == 416:
+            raise HTTPException(status_code=416, detail="Requested range not satisfiable")
+        raise HTTPException(status_code=404, detail="Proof not found")
+    
+    stored_format = proof_codec.stored_format(result["metadata"])
+    if (stored_format in proof_codec.COMPACT_FORMATS) != want_compact:
+        return await _converted_proof_response(model_id, proof_id, result, want_compact)
+    
+    headers = {"Accept-Ranges": "bytes", "Vary": "Accept", "X-Proof-Format": stored_format}
+    for header, field in (
+        ("ETag", "etag"),
+        ("Content-Length", "content_length"),
+        ("Content-Range", "content_range"),
+        ("x-amz-checksum-sha256", "checksum_sha256"),
+        ("x-amz-checksum-crc32", "checksum_crc32"),
+    ):
+        if result.get(field) is not None:
+            headers[header] = str(result[field])
+    if result.get("last_modified") is not None:
+        headers["Last-Modified"] = result["last_modified"].strftime("%a, %d %b %Y %H:%M:%S GMT")
+    
+    return StreamingResponse(
+        result["chunks"],
+        status_code=result["status"],
+        media_type=result["content_type"],
+        headers=headers
+    )
+
+async def _converted_proof_response(model_id: str, proof_id: str, result: dict, want_compact: bool) -> Response:
+    """Serve a proof in the other storage format, converting the whole object."""
+    if result["status"] == 206:
+        # A partial body can't be converted: fetch the whole object instead
+        result["close"]()
+        result = await akave.open_proof_stream(model_id, proof_id)
+        if "error" in result:
+            raise HTTPException(status_code=404, detail="Proof not found")
+    
+    data = b"".join([chunk async for chunk in result["chunks"]])
+    try:
+        if want_compact:
+            data, fmt = proof_codec.encode_compact(data)
+            media_type, suffix = proof_codec.COMPACT_MEDIA_TYPE, "-compact"
+        else:
+            data, fmt = proof_codec.decode_compact(data), proof_codec.FORMAT_JSON
+            media_type, suffix = proof_codec.JSON_MEDIA_TYPE, "-json"
+    except (proof_codec.ProofCodecError, ValueError) as e:
+        raise HTTPException(status_code=500, detail=f"Proof conversion failed: {str(e)}")
+    
+    headers = {"Vary": "Accept", "X-Proof-Format": fmt}
+    if result.get("etag"):
+        headers["ETag"] = result["etag"][:-1] + suffix + '"' if result["etag"].endswith('"') else result["etag"] + suffix
+    return Response(content=data, media_type=media_type, headers=headers)
 
 @router.get("/{model_id}/{proof_id}")
 async def get_proof_details(model_id: str, proof_id: str, evm_encoding: bool = Query(False, description="Return proof data encoded for EVM")):
@@ -81,18 +247,11 @@ async def get_proof_details(model_id: str, proof_id: str, evm_encoding: bool = Q
     
     proof_data = result["data"]
     
-    # If EVM encoding is requested, encode the proof data
+    # If EVM encoding is requested, serve the calldata stored with the proof
     if evm_encoding:
         try:
-            # Convert proof data to string if it's bytes
-            if isinstance(proof_data, bytes):
-                proof_data_str = proof_data.decode('utf-8')
-            else:
-                proof_data_str = proof_data
-            
-            # Encode for EVM
-            encoded_proof = ezkl_service.encode_evm_calldata(proof_data_str)
-            proof_data = encoded_proof
+            # Encoded (and stored) here only for proofs created before calldata was precomputed
+            proof_data = calldata.to_hex(await calldata_store.get(model_id, proof_id, proof_data))
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"EVM encoding failed: {str(e)}")
     
@@ -101,20 +260,39 @@ async def get_proof_details(model_id: str, proof_id: str, evm_encoding: bool = Q
         "model_id": model_id,
         "data": proof_data,
         "evm_encoded": evm_encoding,
+        "format": result.get("format"),
+        "stored_size": result.get("stored_size"),
         "bucket": result.get("bucket"),
         "etag": result.get("etag"),
         "checksum_sha256": result.get("checksum_sha256"),
         "checksum_crc32": result.get("checksum_crc32"),
-        "metadata": result.get("metadata", {})
+        "metadata": result.get("metadata", {}),
+        "resources": resources.from_metadata(result.get("metadata")),
+        "aggregates": proof_index.aggregates_for(proof_id)
     }
 
+@router.get("/{model_id}/{proof_id}/calldata")
+async def get_proof_calldata(model_id: str, proof_id: str):
+    """Raw EVM calldata of a proof, without downloading the proof itself."""
+    try:
+        data = await calldata_store.get(model_id, proof_id)
+    except Exception as e:
+        status_code = 404 if "Proof not found" in str(e) else 500
+        raise HTTPException(status_code=status_code, detail=str(e))
+    return Response(content=data, media_type="application/octet-stream")
+
 @router.post("/{model_id}/{proof_id}/verify")
 async def verify_proof(model_id: str, proof_id: str):
-    """Verify a proof by fetching the proof, verification key, and settings from Akave."""
-    proof_result = await akave.download_proof(model_id, proof_id)
-    vk_result = await akave.download_verification_key(model_id)
-    settings_result = await akave.download_model_settings(model_id)
-    if "error" in proof_result or "error" in vk_result or "error" in settings_result:
+    """Verify a proof fetched from Akave against the model's verifier context."""
+    # One proof fetch; settings and vk are revalidated by ETag only when stale
+    try:
+        proof_result, _ = await asyncio.gather(
+            akave.download_proof(model_id, proof_id),
+            ezkl_service.verifiers.get(model_id)
+        )
+    except VerifierContextError:
+        raise HTTPException(status_code=404, detail="Required file not found in Akave")
+    if "error" in proof_result:
         raise HTTPException(status_code=404, detail="Required file not found in Akave")
     
     # Use the ezkl_service to actually verify the proof
@@ -123,6 +301,9 @@ async def verify_proof(model_id: str, proof_id: str):
         model_id=model_id
     )
     
+    if verification_result.get("verified"):
+        proof_index.set_verification(proof_id, "valid" if verification_result.get("proof_valid") else "invalid")
+    
     # Pass the verification results back to the client
     return {
         "proof_id": proof_id,
@@ -130,5 +311,106 @@ async def verify_proof(model_id: str, proof_id: str):
         "verified": verification_result.get("verified", False),
         "proof_valid": verification_result.get("proof_valid", False),
         "details": verification_result.get("details", "Proof verification completed"),
+        "cached": verification_result.get("cached", False),
         "error": verification_result.get("error")
-    } 
\ No newline at end of file
+    } 
+
+@router.post("/verify/batch")
+async def verify_proofs_batch(data: dict = Body(...)):
+    """
+    Verify many stored proofs in one call.
+    
+    Body: {"keys": ["proofs/parity/<proof_id>.json", ...]}
+       or {"model_id": "parity", "prefix": "", "limit": 1000}
+    
+    Proofs are verified in parallel and the per-proof results are streamed
+    as NDJSON in completion order, followed by a summary line with
+    valid/invalid/error counts and throughput. With model_id, proofs are
+    verified while the bucket is still being listed; if listing fails part
+    way, the summary says so in "aborted".
+    """
+    keys = data.get("keys")
+    model_id = data.get("model_id")
+    try:
+        limit = int(data.get("limit") or settings.VERIFY_BATCH_MAX_ITEMS)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="limit must be an integer")
+    if limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be at least 1")
+    limit = min(limit, settings.VERIFY_BATCH_MAX_ITEMS)
+    
+    malformed: List[str] = []
+    if keys is not None:
+        if not isinstance(keys, list) or not keys:
+            raise HTTPException(status_code=400, detail="keys must be a non-empty list of proof keys")
+        if len(keys) > settings.VERIFY_BATCH_MAX_ITEMS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"keys may contain at most {settings.VERIFY_BATCH_MAX_ITEMS} items"
+            )
+        proofs: List[Tuple] = []
+        for key in keys:
+            parsed = parse_proof_key(key)
+            if parsed is None:
+                malformed.append(key)
+            else:
+                proofs.append((parsed[0], parsed[1], key))
+        source = proofs
+    elif model_id:
+        prefix = data.get('prefix') or ''
+        
+        async def listed():
+            # Listed proofs go to the verifier as they arrive, so only the
+            # proofs in flight (and the segment being split) are held
+            count = 0
+            async for obj in akave.iter_objects(f"proofs/{model_id}/{prefix}"):
+                parsed = parse_proof_key(obj["Key"])
+                if parsed is not None:
+                    yield (parsed[0], parsed[1], obj["Key"])
+                    count += 1
+                    if count >= limit:
+                        return
+            # Compacted proofs: each segment is read once and verified from memory
+            async for entry in akave.iter_segment_proofs(model_id, decode=False):
+                if entry["proof_id"].startswith(prefix):
+                    yield (model_id, entry["proof_id"], entry["key"], entry["data"])
+                    count += 1
+                    if count >= limit:
+                        return
+        
+        source = listed()
+    else:
+        raise HTTPException(status_code=400, detail="Either keys or model_id is required")
+    
+    async def ndjson():
+        counts = {"valid": 0, "invalid": 0, "error": 0}
+        failure = None
+        start = time.perf_counter()
+        
+        for key in malformed:
+            counts["error"] += 1
+            yield json.dumps({"key": key, "status": "error", "error": "Malformed proof key"}) + "\n"
+        
+        try:
+            async for item in ezkl_service.iter_verify_batch(source):
+                counts[item["status"]] += 1
+                if item["status"] != "error":
+                    proof_index.set_verification(item["proof_id"], item["status"])
+                yield json.dumps(item) + "\n"
+        except Exception as e:
+            # E.g. listing the bucket failed part way; results so far were streamed
+            failure = str(e)
+        
+        elapsed = time.perf_counter() - start
+        total = sum(counts.values())
+        summary = {
+            "total": total,
+            **counts,
+            "elapsed_seconds": round(elapsed, 3),
+            "proofs_per_second": round(total / elapsed, 2) if elapsed > 0 else None
+        }
+        if failure is not None:
+            summary["aborted"] = failure
+        yield json.dumps({"summary": summary}) + "\n"
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
@@ -0,0 +1,44 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from app.services.shared import ezkl_service, proof_index, proof_jobs, segment_compactor, calldata_store, aggregation_service, aggregation_jobs
+
+router = APIRouter()
+
+@router.get("/status")
+async def prover_status():
+    """
+    Report prover pool occupancy, proof job queue depth, artifact and
+    result cache hit/miss counters and scratch workspace usage.
+    """
+    return {
+        "pool": ezkl_service.prover.stats(),
+        "proof_jobs": proof_jobs.stats(),
+        "proof_index": proof_index.stats(),
+        "segments": segment_compactor.stats(),
+        "result_cache": ezkl_service.results.stats(),
+        "micro_batching": ezkl_service.batcher.stats() if ezkl_service.batcher else None,
+        "native_inference": ezkl_service.native.stats() if ezkl_service.native else None,
+        "verifier_contexts": ezkl_service.verifiers.stats(),
+        "verification_cache": ezkl_service.verifications.stats(),
+        "calldata": calldata_store.stats(),
+        "aggregation": aggregation_service.stats(),
+        "aggregation_jobs": aggregation_jobs.stats(),
+        "workspaces": ezkl_service.workspaces.stats()
+    }
+
+@router.get("/costs")
+async def prover_costs(
+    model_id: Optional[str] = Query(None),
+    created_after: Optional[str] = Query(None, description="ISO 8601 timestamp"),
+    created_before: Optional[str] = Query(None, description="ISO 8601 timestamp")
+):
+    """
+    Per-model cost report from the resource usage recorded with each proof:
+    worker CPU seconds, prove and queue wall times, peak memory, scratch
+    disk, proof size and circuit logrows, most expensive model first.
+    """
+    try:
+        return proof_index.cost_report(model_id, created_after, created_before)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,8 +1,11 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import proofs, akave, inference
+from app.api.v1.endpoints import proofs, akave, inference, prover, aggregates, admin
 
 router = APIRouter()
 
 router.include_router(proofs.router, prefix="/proofs", tags=["proofs"])
 router.include_router(akave.router, prefix="/akave", tags=["akave"])
-router.include_router(inference.router, prefix="/inference", tags=["inference"]) 
\ No newline at end of file
+router.include_router(inference.router, prefix="/inference", tags=["inference"])
+router.include_router(prover.router, prefix="/prover", tags=["prover"])
+router.include_router(aggregates.router, prefix="/aggregates", tags=["aggregates"])
+router.include_router(admin.router, prefix="/admin", tags=["admin"])
\ No newline at end of file
@@ -18,9 +18,116 @@ class Settings(BaseModel):
     # Storage Configuration
     AKAVE_API_KEY: Optional[str] = os.getenv("AKAVE_API_KEY")
     AKAVE_ENDPOINT: Optional[str] = os.getenv("AKAVE_ENDPOINT")
+    # One pooled client per process; blocking calls run on a bounded thread pool
+    AKAVE_MAX_POOL_CONNECTIONS: int = int(os.getenv("AKAVE_MAX_POOL_CONNECTIONS", "32"))
+    AKAVE_IO_WORKERS: int = int(os.getenv("AKAVE_IO_WORKERS", "16"))
+    AKAVE_CONNECT_TIMEOUT_SECONDS: float = float(os.getenv("AKAVE_CONNECT_TIMEOUT_SECONDS", "5"))
+    AKAVE_READ_TIMEOUT_SECONDS: float = float(os.getenv("AKAVE_READ_TIMEOUT_SECONDS", "30"))
+    AKAVE_MAX_ATTEMPTS: int = int(os.getenv("AKAVE_MAX_ATTEMPTS", "3"))
+
+    # Scratch Workspace Configuration
+    # Defaults to tmpfs (/dev/shm) when available, otherwise artifacts/temp
+    WORKSPACE_ROOT: Optional[str] = os.getenv("WORKSPACE_ROOT")
+    WORKSPACE_MAX_BYTES: int = int(os.getenv("WORKSPACE_MAX_BYTES", str(512 * 1024 * 1024)))
+    WORKSPACE_TTL_SECONDS: int = int(os.getenv("WORKSPACE_TTL_SECONDS", "900"))
+    WORKSPACE_GC_INTERVAL_SECONDS: int = int(os.getenv("WORKSPACE_GC_INTERVAL_SECONDS", "60"))
+
+    # Prover Pool Configuration
+    # 0 means "derive from the number of CPU cores"
+    PROVER_WORKERS: int = int(os.getenv("PROVER_WORKERS", "0"))
+    PROVER_THREADS_PER_WORKER: int = int(os.getenv("PROVER_THREADS_PER_WORKER", "0"))
+    PROVER_TIMEOUT_SECONDS: float = float(os.getenv("PROVER_TIMEOUT_SECONDS", "300"))
+    VERIFY_TIMEOUT_SECONDS: float = float(os.getenv("VERIFY_TIMEOUT_SECONDS", "60"))
+
+    # Bulk verification
+    VERIFY_BATCH_MAX_ITEMS: int = int(os.getenv("VERIFY_BATCH_MAX_ITEMS", "10000"))
+    VERIFY_BATCH_CONCURRENCY: int = int(os.getenv("VERIFY_BATCH_CONCURRENCY", "32"))
+
+    # Per-model settings + vk kept on local disk, revalidated by ETag after the TTL
+    VERIFIER_CONTEXT_DIR: Optional[str] = os.getenv("VERIFIER_CONTEXT_DIR")
+    VERIFIER_CONTEXT_TTL_SECONDS: float = float(os.getenv("VERIFIER_CONTEXT_TTL_SECONDS", "60"))
+
+    # Per-worker budget for keeping compiled circuits and proving keys resident
+    ARTIFACT_CACHE_BYTES: int = int(os.getenv("ARTIFACT_CACHE_BYTES", str(2 * 1024 * 1024 * 1024)))
+
+    # Witness/proof result cache keyed by model artifact hash + canonical input
+    RESULT_CACHE_SIZE: int = int(os.getenv("RESULT_CACHE_SIZE", "1024"))
+    RESULT_CACHE_DIR: Optional[str] = os.getenv("RESULT_CACHE_DIR")
+    RESULT_CACHE_REUSE_PROOF_KEY: bool = os.getenv("RESULT_CACHE_REUSE_PROOF_KEY", "true").lower() == "true"
+
+    # Verification outcomes keyed by sha256 of proof, vk and settings
+    VERIFY_CACHE_SIZE: int = int(os.getenv("VERIFY_CACHE_SIZE", "10000"))
+    VERIFY_CACHE_DIR: Optional[str] = os.getenv("VERIFY_CACHE_DIR")
+
+    # Batch inference
+    INFERENCE_BATCH_MAX_ITEMS: int = int(os.getenv("INFERENCE_BATCH_MAX_ITEMS", "10000"))
+    INFERENCE_BATCH_CHUNK_SIZE: int = int(os.getenv("INFERENCE_BATCH_CHUNK_SIZE", "256"))
+    INFERENCE_BATCH_CONCURRENCY: int = int(os.getenv("INFERENCE_BATCH_CONCURRENCY", "8"))
+
+    # Dynamic micro-batching of concurrent single /inference calls into one
+    # forward pass; native inference mode only (witnesses can't be batched)
+    INFERENCE_MICRO_BATCH_ENABLED: bool = os.getenv("INFERENCE_MICRO_BATCH_ENABLED", "true").lower() == "true"
+    INFERENCE_MICRO_BATCH_MAX_SIZE: int = int(os.getenv("INFERENCE_MICRO_BATCH_MAX_SIZE", "32"))
+    INFERENCE_MICRO_BATCH_MAX_WAIT_MS: float = float(os.getenv("INFERENCE_MICRO_BATCH_MAX_WAIT_MS", "5"))
+
+    # Inference mode: "circuit" generates the ezkl witness on every request,
+    # "native" answers from a PyTorch forward pass and defers the witness
+    # until a proof is requested
+    INFERENCE_MODE: str = os.getenv("INFERENCE_MODE", "circuit")
+    NATIVE_MODEL_NUM_HEADS: int = int(os.getenv("NATIVE_MODEL_NUM_HEADS", "1"))
+    # Fraction of native predictions re-checked against the circuit output
+    NATIVE_CONSISTENCY_SAMPLE_RATE: float = float(os.getenv("NATIVE_CONSISTENCY_SAMPLE_RATE", "0.01"))
+
+    # Background proof jobs
+    PROOF_JOB_WORKERS: int = int(os.getenv("PROOF_JOB_WORKERS", "4"))
+    PROOF_JOB_HISTORY: int = int(os.getenv("PROOF_JOB_HISTORY", "10000"))
+
+    # Local SQLite index of stored proofs (defaults to artifacts/index/proofs.sqlite3)
+    PROOF_INDEX_PATH: Optional[str] = os.getenv("PROOF_INDEX_PATH")
+    PROOF_INDEX_BACKFILL_ON_STARTUP: bool = os.getenv("PROOF_INDEX_BACKFILL_ON_STARTUP", "true").lower() == "true"
+    PROOF_LIST_MAX_LIMIT: int = int(os.getenv("PROOF_LIST_MAX_LIMIT", "1000"))
+
+    # Storage format for new proofs: "json" (as produced by ezkl) or "compact"
+    # (binary field elements + zstd, or zlib when zstandard isn't installed)
+    PROOF_STORAGE_FORMAT: str = os.getenv("PROOF_STORAGE_FORMAT", "json")
+
+    # Segment compaction: proofs older than the minimum age are packed per
+    # model into segment objects; an interval of 0 disables the background job
+    PROOF_SEGMENT_MAX_BYTES: int = int(os.getenv("PROOF_SEGMENT_MAX_BYTES", str(64 * 1024 * 1024)))
+    PROOF_SEGMENT_MIN_AGE_SECONDS: int = int(os.getenv("PROOF_SEGMENT_MIN_AGE_SECONDS", "86400"))
+    PROOF_SEGMENT_COMPACTION_INTERVAL_SECONDS: int = int(os.getenv("PROOF_SEGMENT_COMPACTION_INTERVAL_SECONDS", "0"))
+
+    # EVM calldata, encoded when a proof is created and stored next to it
+    # (calldata/{model_id}/{proof_id}.bin); older proofs are encoded on first request
+    PRECOMPUTE_CALLDATA: bool = os.getenv("PRECOMPUTE_CALLDATA", "true").lower() == "true"
+    CALLDATA_CACHE_SIZE: int = int(os.getenv("CALLDATA_CACHE_SIZE", "10000"))
+    CALLDATA_CACHE_DIR: Optional[str] = os.getenv("CALLDATA_CACHE_DIR")
+
+    # Proof type for new proofs: "single" (EVM transcript, verified on its own)
+    # or "for-aggr" (Poseidon transcript, can be aggregated)
+    PROOF_TYPE: str = os.getenv("PROOF_TYPE", "single")
+
+    # Aggregation of N for-aggr proofs into one EVM-verifiable proof. Keys are
+    # set up once per model and N (defaults to artifacts/aggregation); the SRS
+    # defaults to ezkl's ~/.ezkl/srs/kzg{logrows}.srs
+    AGGREGATION_LOGROWS: int = int(os.getenv("AGGREGATION_LOGROWS", "23"))
+    AGGREGATION_SRS_PATH: Optional[str] = os.getenv("AGGREGATION_SRS_PATH")
+    AGGREGATION_KEYS_DIR: Optional[str] = os.getenv("AGGREGATION_KEYS_DIR")
+    AGGREGATION_MAX_PROOFS: int = int(os.getenv("AGGREGATION_MAX_PROOFS", "16"))
+    AGGREGATION_TIMEOUT_SECONDS: float = float(os.getenv("AGGREGATION_TIMEOUT_SECONDS", "3600"))
+    AGGREGATION_JOB_WORKERS: int = int(os.getenv("AGGREGATION_JOB_WORKERS", "1"))
+    AGGREGATION_JOB_HISTORY: int = int(os.getenv("AGGREGATION_JOB_HISTORY", "1000"))
+    
+    # Admin and Profiling Configuration
+    ADMIN_TOKEN: Optional[str] = os.getenv("ADMIN_TOKEN")
+    PROFILE_DIR: Optional[str] = os.getenv("PROFILE_DIR")
+    PROFILE_MAX_REQUESTS: int = int(os.getenv("PROFILE_MAX_REQUESTS", "100"))
+    PROFILE_TRACEMALLOC_FRAMES: int = int(os.getenv("PROFILE_TRACEMALLOC_FRAMES", "10"))
+    PROFILE_MAX_SESSIONS: int = int(os.getenv("PROFILE_MAX_SESSIONS", "50"))
+    PROFILE_CAPTURE_TTL_SECONDS: int = int(os.getenv("PROFILE_CAPTURE_TTL_SECONDS", str(7 * 24 * 3600)))
 
 @lru_cache()
 def get_settings() -> Settings:
     return Settings()
 
-settings = get_settings() 
\ No newline at end of file
+settings = get_settings()
@@ -1,8 +1,12 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
 from app.api.v1.router import router as api_v1_router
+from app.services.shared import akave_service, ezkl_service, proof_index, proof_jobs, aggregation_jobs, segment_compactor, profiler
+from app.services.metrics import collect_service_metrics
+from app.services.profiling import ProfilingMiddleware
+from app.utils import metrics
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -18,10 +22,46 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# In-flight requests and per-route latency for /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+metrics.REGISTRY.register_collector(collect_service_metrics)
+
+# Profiles requests matched by an armed admin profiling session
+app.add_middleware(ProfilingMiddleware, profiler=profiler)
+
 # Include API router
 app.include_router(api_v1_router, prefix=settings.API_V1_STR)
 
+@app.on_event("startup")
+async def warm_up_models():
+    # Resolve each model's witness input layout once, before traffic arrives
+    await ezkl_service.warm_up()
+
+@app.on_event("startup")
+async def backfill_proof_index():
+    # Index proofs already in the bucket without delaying startup
+    if settings.PROOF_INDEX_BACKFILL_ON_STARTUP:
+        proof_index.start_backfill(akave_service)
+
+@app.on_event("startup")
+async def start_segment_compaction():
+    # Periodically pack older proofs into segments (disabled when the interval is 0)
+    segment_compactor.start_periodic()
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    await proof_jobs.stop()
+    await aggregation_jobs.stop()
+    await segment_compactor.stop()
+    ezkl_service.prover.shutdown()
+    akave_service.close()
+
 # Health check endpoint
 @app.get("/health")
 def health_check():
-    return {"status": "ok"} 
\ No newline at end of file
+    return {"status": "ok"} 
+
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Any, Optional, Dict, List
 from datetime import datetime
 
 class ProofRequest(BaseModel):
@@ -9,7 +9,18 @@ class ProofRequest(BaseModel):
 
 class ProofResponse(BaseModel):
     proof_id: str
+    job_id: Optional[str] = None
     status: str
     proof_hash: Optional[str] = None
     timestamp: datetime = datetime.utcnow()
-    storage_location: Optional[str] = None 
\ No newline at end of file
+    storage_location: Optional[str] = None
+    model_id: Optional[str] = None
+    predicted_digits: Optional[List[int]] = None
+    input_vector: Optional[List[int]] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    stage_timings: Dict[str, float] = {}
+    resources: Optional[Dict[str, Any]] = None
+    etag: Optional[str] = None
+    error: Optional[str] = None
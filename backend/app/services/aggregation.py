@@ -0,0 +1,240 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services import prover_pool
+from app.services.artifact_cache import artifact_digest
+from app.services.proof_index import AGGREGATE_PREFIX, AGGREGATE_RECORD_SUFFIX
+from app.utils import calldata, proof_codec
+
+
+class AggregationError(Exception):
+    """Raised when proofs can't be aggregated (bad request, not for-aggr, missing SRS)."""
+
+
+def aggregate_keys(model_id: str, aggregate_id: str) -> Dict[str, str]:
+    """Storage keys of an aggregate's proof, calldata and record."""
+    base = f"{AGGREGATE_PREFIX}{model_id}/{aggregate_id}"
+    return {
+        "key": f"{base}.json",
+        "calldata_key": f"{base}.calldata.bin",
+        "record_key": f"{base}{AGGREGATE_RECORD_SUFFIX}",
+    }
+
+
+def aggregation_vk_key(model_id: str, proof_count: int) -> str:
+    return f"verification-keys/{model_id}-aggr{proof_count}.vk"
+
+
+class AggregationService:
+    """
+    Aggregates N stored proofs of a model into one EVM-verifiable proof.
+
+    The proofs must have been generated with PROOF_TYPE=for-aggr (Poseidon
+    transcript). The aggregation circuit depends on the model circuit and on
+    N, so its keys are set up once per (model, circuit digest, N) and kept
+    under AGGREGATION_KEYS_DIR; the verification key is also uploaded to
+    Akave for on-chain verifier generation. Each aggregate is stored with
+    its calldata and a record of the proof_ids it covers, in order, which
+    is also kept in the proof index. One on-chain verification then covers
+    N inferences.
+    """
+
+    def __init__(self, ezkl_service, akave, proof_index, keys_dir: Optional[str] = None):
+        self.ezkl = ezkl_service
+        self.akave = akave
+        self.index = proof_index
+        self.keys_dir = keys_dir or settings.AGGREGATION_KEYS_DIR or os.path.join(
+            ezkl_service.base_dir, "artifacts", "aggregation"
+        )
+        self.logrows = settings.AGGREGATION_LOGROWS
+        self.srs_path = settings.AGGREGATION_SRS_PATH
+        self.max_proofs = settings.AGGREGATION_MAX_PROOFS
+
+        self._locks: Dict[Tuple[str, str, int], asyncio.Lock] = {}
+        self.aggregates = 0
+        self.proofs_aggregated = 0
+        self.key_setups = 0
+
+    def _key_paths(self, model_id: str, proof_count: int) -> Dict[str, str]:
+        circuit = artifact_digest(self.ezkl._get_model_paths(model_id)["compiled"])[:16]
+        key_dir = os.path.join(self.keys_dir, model_id, circuit, f"{proof_count}-{self.logrows}")
+        return {"dir": key_dir, "pk": os.path.join(key_dir, "aggr.pk"), "vk": os.path.join(key_dir, "aggr.vk")}
+
+    async def _ensure_keys(self, model_id: str, proof_paths: List[str]) -> Dict[str, str]:
+        """Set up the aggregation keys for this model and proof count on first use."""
+        paths = self._key_paths(model_id, len(proof_paths))
+        if os.path.isfile(paths["pk"]) and os.path.isfile(paths["vk"]):
+            return paths
+
+        lock = self._locks.setdefault((model_id, paths["dir"], len(proof_paths)), asyncio.Lock())
+        async with lock:
+            if os.path.isfile(paths["pk"]) and os.path.isfile(paths["vk"]):
+                return paths
+            os.makedirs(paths["dir"], exist_ok=True)
+            # Write to temporary names so a failed setup never leaves half a key pair
+            tmp_pk, tmp_vk = paths["pk"] + ".tmp", paths["vk"] + ".tmp"
+            await self.ezkl.prover.run(
+                prover_pool.setup_aggregate,
+                proof_paths,
+                tmp_vk,
+                tmp_pk,
+                self.logrows,
+                self.srs_path,
+                timeout=settings.AGGREGATION_TIMEOUT_SECONDS,
+            )
+            os.replace(tmp_pk, paths["pk"])
+            os.replace(tmp_vk, paths["vk"])
+            self.key_setups += 1
+
+            with open(paths["vk"], 'rb') as f:
+                await self.akave.upload_bytes(aggregation_vk_key(model_id, len(proof_paths)), f.read())
+        return paths
+
+    def validate(self, model_id: str, proof_ids: List[str]):
+        """
+        Check an aggregation request without touching storage.
+
+        Raises:
+            AggregationError: If the request can't be aggregated here
+        """
+        if not proof_ids or len(proof_ids) > self.max_proofs:
+            raise AggregationError(f"proof_ids must contain between 1 and {self.max_proofs} proofs")
+        if len(set(proof_ids)) != len(proof_ids):
+            raise AggregationError("proof_ids must not contain duplicates")
+        if self.srs_path and not os.path.isfile(self.srs_path):
+            raise AggregationError(f"Aggregation SRS not found: {self.srs_path}")
+        try:
+            self.ezkl._get_model_paths(model_id)
+        except FileNotFoundError as e:
+            raise AggregationError(str(e))
+
+    async def aggregate(self, model_id: str, proof_ids: List[str]) -> Dict[str, Any]:
+        """
+        Aggregate stored proofs of a model.
+
+        Args:
+            model_id: Model identifier
+            proof_ids: Proofs to aggregate, in the order they are committed to
+
+        Returns:
+            The aggregate record, with its calldata as 0x-prefixed hex
+
+        Raises:
+            AggregationError: If the request or the proofs are not aggregatable
+            Exception: If aggregation fails
+        """
+        self.validate(model_id, proof_ids)
+
+        timings: Dict[str, float] = {}
+        start = time.perf_counter()
+        downloads = await asyncio.gather(*(
+            self.akave.download_proof(model_id, proof_id) for proof_id in proof_ids
+        ))
+        for proof_id, result in zip(proof_ids, downloads):
+            if "error" in result:
+                raise AggregationError(f"Proof not found: {model_id}/{proof_id}")
+            if json.loads(result["data"]).get("transcript_type") != "Poseidon":
+                raise AggregationError(
+                    f"Proof {proof_id} was not generated for aggregation (PROOF_TYPE=for-aggr)"
+                )
+        timings["download"] = time.perf_counter() - start
+
+        with self.ezkl.workspaces.workspace("aggregate") as ws:
+            proof_paths = [
+                ws.write(f"proof-{i}.json", proof_codec.to_json(result["data"])) for i, result in enumerate(downloads)
+            ]
+
+            start = time.perf_counter()
+            keys = await self._ensure_keys(model_id, proof_paths)
+            timings["setup"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            result = await self.ezkl.prover.run(
+                prover_pool.aggregate,
+                proof_paths,
+                ws["proof"],
+                keys["pk"],
+                self.logrows,
+                self.srs_path,
+                ws["calldata"],
+                timeout=settings.AGGREGATION_TIMEOUT_SECONDS,
+            )
+            timings["aggregate"] = time.perf_counter() - start
+            aggregate_proof = ws.read("proof", binary=True)
+
+        aggregate_id = str(uuid.uuid4())
+        storage = aggregate_keys(model_id, aggregate_id)
+        record = {
+            "aggregate_id": aggregate_id,
+            "model_id": model_id,
+            "proof_ids": list(proof_ids),
+            "proof_count": len(proof_ids),
+            "logrows": self.logrows,
+            "key": storage["key"],
+            "calldata_key": storage["calldata_key"],
+            "vk_key": aggregation_vk_key(model_id, len(proof_ids)),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+
+        start = time.perf_counter()
+        uploads = await asyncio.gather(
+            self.akave.upload_bytes(storage["key"], aggregate_proof, proof_codec.JSON_MEDIA_TYPE),
+            self.akave.upload_bytes(storage["calldata_key"], result["calldata"]),
+            self.akave.upload_bytes(storage["record_key"], json.dumps(record).encode(), 'application/json'),
+        )
+        for upload in uploads:
+            if "error" in upload:
+                raise Exception(f"Failed to upload aggregate: {upload['error']}")
+        timings["upload"] = time.perf_counter() - start
+
+        self.index.record_aggregate(record)
+        self.aggregates += 1
+        self.proofs_aggregated += len(proof_ids)
+        return {**record, "calldata": calldata.to_hex(result["calldata"]), "stage_timings": timings}
+
+    def get(self, aggregate_id: str) -> Optional[Dict[str, Any]]:
+        return self.index.get_aggregate(aggregate_id)
+
+    async def verify(self, aggregate_id: str) -> Dict[str, Any]:
+        """
+        Verify a stored aggregate proof off-chain.
+
+        Raises:
+            AggregationError: If the aggregate or its keys are unknown here
+        """
+        record = self.index.get_aggregate(aggregate_id)
+        if record is None:
+            raise AggregationError(f"Aggregate not found: {aggregate_id}")
+        keys = self._key_paths(record["model_id"], record["proof_count"])
+        if not os.path.isfile(keys["vk"]):
+            raise AggregationError("Aggregation keys for this aggregate are not available locally")
+
+        stored = await self.akave.download_if_changed(record["key"])
+        if "error" in stored:
+            raise AggregationError(f"Aggregate proof not found: {stored['error']}")
+
+        with self.ezkl.workspaces.workspace("verify-aggregate") as ws:
+            valid = await self.ezkl.prover.run(
+                prover_pool.verify_aggregate,
+                ws.write("proof", stored["data"]),
+                keys["vk"],
+                record["logrows"],
+                self.srs_path,
+                timeout=settings.AGGREGATION_TIMEOUT_SECONDS,
+            )
+        return {"aggregate_id": aggregate_id, "verified": True, "proof_valid": valid, "proof_ids": record["proof_ids"]}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "logrows": self.logrows,
+            "max_proofs": self.max_proofs,
+            "aggregates": self.aggregates,
+            "proofs_aggregated": self.proofs_aggregated,
+            "key_setups": self.key_setups,
+        }
@@ -0,0 +1,146 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.services.proof_jobs import FAILED, QUEUED, RUNNING, _now
+
+# Job lifecycle (queued, running and failed are shared with proof jobs)
+COMPLETED = "completed"
+
+
+class AggregationJobManager:
+    """
+    Runs aggregation requests as background jobs.
+
+    `submit` checks the request, then returns immediately with a job record;
+    worker tasks run the aggregation (up to AGGREGATION_TIMEOUT_SECONDS) and
+    attach the aggregate record to the job once it is stored. Finished jobs
+    are kept in a bounded history for status lookups.
+    """
+
+    def __init__(
+        self,
+        aggregation_service,
+        workers: int = settings.AGGREGATION_JOB_WORKERS,
+        history: int = settings.AGGREGATION_JOB_HISTORY,
+    ):
+        self.aggregation = aggregation_service
+        self.workers = max(1, workers)
+        self.history = history
+
+        self.jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._events: Dict[str, asyncio.Event] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def _ensure_started(self):
+        """Start the worker tasks on first use, inside the running event loop."""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"aggregation-job-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    def submit(self, model_id: str, proof_ids: List[str]) -> Dict[str, Any]:
+        """
+        Queue an aggregation of stored proofs.
+
+        Args:
+            model_id: Model identifier
+            proof_ids: Proofs to aggregate, in the order they are committed to
+
+        Returns:
+            The new job record
+
+        Raises:
+            AggregationError: If the request can't be aggregated here
+        """
+        self.aggregation.validate(model_id, proof_ids)
+        self._ensure_started()
+
+        job_id = str(uuid.uuid4())
+        job = {
+            "job_id": job_id,
+            "model_id": model_id,
+            "proof_ids": list(proof_ids),
+            "status": QUEUED,
+            "aggregate_id": None,
+            "aggregate": None,
+            "created_at": _now(),
+            "started_at": None,
+            "finished_at": None,
+            "stage_timings": {},
+            "error": None,
+        }
+
+        self.jobs[job_id] = job
+        self._events[job_id] = asyncio.Event()
+        self._trim_history()
+        self._queue.put_nowait((job, time.perf_counter()))
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.jobs.get(job_id)
+
+    async def wait(self, job_id: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Wait until a job is completed or failed and return its record."""
+        # Hold on to the record: history trimming may evict it while we wait
+        job = self.jobs[job_id]
+        event = self._events.get(job_id)
+        if event is not None:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+        return job
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def stats(self) -> Dict[str, Any]:
+        counts = {QUEUED: 0, RUNNING: 0, COMPLETED: 0, FAILED: 0}
+        for job in self.jobs.values():
+            counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return {"workers": self.workers, "queue_depth": self.queue_depth(), "jobs": counts}
+
+    def _trim_history(self):
+        # Only forget finished jobs; queued and running ones must stay visible
+        while len(self.jobs) > self.history:
+            oldest_id, oldest = next(iter(self.jobs.items()))
+            if oldest["status"] not in (COMPLETED, FAILED):
+                break
+            self.jobs.pop(oldest_id)
+            self._events.pop(oldest_id, None)
+
+    async def _worker(self):
+        while True:
+            job, queued_at = await self._queue.get()
+            try:
+                job["stage_timings"]["queued"] = time.perf_counter() - queued_at
+                job["status"] = RUNNING
+                job["started_at"] = _now()
+                record = await self.aggregation.aggregate(job["model_id"], job["proof_ids"])
+                job["stage_timings"].update(record.pop("stage_timings", {}))
+                job["aggregate_id"] = record["aggregate_id"]
+                job["aggregate"] = record
+                job["status"] = COMPLETED
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                job["status"] = FAILED
+                job["error"] = str(e)
+            finally:
+                if job["finished_at"] is None and job["status"] in (COMPLETED, FAILED):
+                    job["finished_at"] = _now()
+                event = self._events.get(job["job_id"])
+                if event is not None:
+                    event.set()
+                self._queue.task_done()
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
@@ -1,32 +1,98 @@
-from typing import Optional, List
+from typing import Optional, List, Any, AsyncIterator, Callable, Dict, Tuple
+import asyncio
+import functools
 import boto3
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from botocore.config import Config
 from botocore.exceptions import ClientError
 import json
 from fastapi import HTTPException
 from dotenv import load_dotenv
 
+from app.core.config import settings
+from app.services.proof_index import SEGMENT_INDEX_SUFFIX, SEGMENT_PREFIX
+from app.utils import metrics, proof_codec
+
 # Ensure environment variables are loaded
 load_dotenv()
 
 class AkaveService:
-    def __init__(self):
-        self.s3 = boto3.client(
+    """
+    Akave O3 (S3-compatible) storage client.
+
+    One instance is shared per process (see app.services.shared). It holds a
+    single boto3 client with a pooled, keep-alive connection pool, and runs
+    the blocking boto3 calls on a bounded thread pool so storage round trips
+    never block the event loop.
+    """
+
+    def __init__(
+        self,
+        max_pool_connections: int = settings.AKAVE_MAX_POOL_CONNECTIONS,
+        io_workers: int = settings.AKAVE_IO_WORKERS,
+    ):
+        self.s3 = boto3.session.Session().client(
             's3',
             endpoint_url=os.getenv("AKAVE_ENDPOINT"),
             aws_access_key_id=os.getenv("AKAVE_ACCESS_KEY"),
             aws_secret_access_key=os.getenv("AKAVE_SECRET_KEY"),
-            region_name="akave-network"
+            region_name="akave-network",
+            config=Config(
+                max_pool_connections=max_pool_connections,
+                tcp_keepalive=True,
+                connect_timeout=settings.AKAVE_CONNECT_TIMEOUT_SECONDS,
+                read_timeout=settings.AKAVE_READ_TIMEOUT_SECONDS,
+                retries={"max_attempts": settings.AKAVE_MAX_ATTEMPTS, "mode": "standard"},
+            )
         )
         self.bucket = os.getenv("AKAVE_BUCKET")
+        
+        # Resolves compacted proofs to their segment: (model_id, proof_id) -> location or None
+        self.locate_proof: Optional[Callable[[str, str], Optional[Dict[str, Any]]]] = None
+        
+        # No more threads than pooled connections, so calls never queue on the pool
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, min(io_workers, max_pool_connections)),
+            thread_name_prefix="akave-io"
+        )
+
+    async def _call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking boto3 call (or a function making several) on the I/O pool."""
+        loop = asyncio.get_running_loop()
+        operation = getattr(fn, "__name__", "call").lstrip("_")
+        key = kwargs.get("Key") or kwargs.get("Prefix") or (args[0] if args and isinstance(args[0], str) else None)
+        model_id = metrics.model_from_key(key)
+        
+        status = "ok"
+        start = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+        except ClientError as e:
+            status = e.response.get('Error', {}).get('Code', 'ClientError')
+            raise
+        except BaseException as e:
+            status = type(e).__name__
+            raise
+        finally:
+            metrics.observe_akave(operation, model_id, status, time.perf_counter() - start)
+
+    def _get_object(self, key: str, **params) -> Tuple[Dict[str, Any], bytes]:
+        """GET an object and read its body; runs on the I/O pool."""
+        response = self.s3.get_object(Bucket=self.bucket, Key=key, **params)
+        return response, response['Body'].read()
+
+    def close(self):
+        self._executor.shutdown(wait=False)
 
     async def test_connection(self) -> dict:
         """Raw test of connection and permissions"""
         try:
             # Try basic operations and return raw responses
             return {
-                "list_buckets": self.s3.list_buckets(),
-                "bucket_info": self.s3.head_bucket(Bucket=self.bucket),
+                "list_buckets": await self._call(self.s3.list_buckets),
+                "bucket_info": await self._call(self.s3.head_bucket, Bucket=self.bucket),
                 "endpoint": self.s3.meta.endpoint_url,
                 "bucket": self.bucket
             }
@@ -44,7 +110,8 @@ class AkaveService:
     async def upload_json(self, key: str, data: dict) -> dict:
         """Upload JSON data and return raw response"""
         try:
-            response = self.s3.put_object(
+            response = await self._call(
+                self.s3.put_object,
                 Bucket=self.bucket,
                 Key=key,
                 Body=json.dumps(data),
@@ -67,7 +134,7 @@ class AkaveService:
             if prefix:
                 params['Prefix'] = prefix
             
-            response = self.s3.list_objects_v2(**params)
+            response = await self._call(self.s3.list_objects_v2, **params)
             return {
                 "response": response,
                 "bucket": self.bucket,
@@ -78,11 +145,32 @@ class AkaveService:
         except Exception as e:
             return {"error": str(e)}
 
+    async def iter_objects(self, prefix: str, page_size: int = 1000) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield every object under a prefix, following list_objects_v2 continuation tokens.
+        
+        Raises:
+            Exception: If a page can't be listed
+        """
+        params = {'Bucket': self.bucket, 'Prefix': prefix, 'MaxKeys': page_size}
+        while True:
+            try:
+                response = await self._call(self.s3.list_objects_v2, **params)
+            except ClientError as e:
+                raise Exception(f"Failed to list {prefix}: {e.response['Error']}")
+            
+            for obj in response.get('Contents', []):
+                yield obj
+            
+            if not response.get('IsTruncated'):
+                return
+            params['ContinuationToken'] = response['NextContinuationToken']
+
     async def download_json(self, key: str) -> dict:
         """Download JSON data and return raw response"""
         try:
-            response = self.s3.get_object(Bucket=self.bucket, Key=key)
-            data = json.loads(response['Body'].read().decode('utf-8'))
+            response, body = await self._call(self._get_object, key)
+            data = json.loads(body)
             return {
                 "data": data,
                 "metadata": response.get('Metadata', {}),
@@ -94,29 +182,61 @@ class AkaveService:
         except Exception as e:
             return {"error": str(e)}
 
+    async def download_if_changed(self, key: str, etag: Optional[str] = None) -> dict:
+        """
+        Conditional download: returns {"not_modified": True} while the stored
+        object still has the given ETag, otherwise its data and new ETag.
+        """
+        params = {"IfNoneMatch": etag} if etag else {}
+        try:
+            response, data = await self._call(self._get_object, key, **params)
+            return {
+                "data": data,
+                "bucket": self.bucket,
+                "key": key,
+                "etag": response.get('ETag'),
+                "version_id": response.get('VersionId')
+            }
+        except ClientError as e:
+            status = e.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+            if status == 304 or e.response['Error'].get('Code') in ('304', 'NotModified'):
+                return {"not_modified": True, "bucket": self.bucket, "key": key, "etag": etag}
+            return {"error": e.response['Error']}
+        except Exception as e:
+            return {"error": str(e)}
+
     async def create_bucket(self, bucket_name: Optional[str] = None) -> dict:
         """Create a new bucket and return raw response"""
         try:
             bucket = bucket_name or self.bucket
-            response = self.s3.create_bucket(Bucket=bucket)
+            response = await self._call(self.s3.create_bucket, Bucket=bucket)
             return response
         except ClientError as e:
             return e.response
         except Exception as e:
             return {"error": str(e)}
 
+    @staticmethod
+    def model_settings_key(model_id: str) -> str:
+        return f"settings/{model_id}.json"
+
+    @staticmethod
+    def verification_key_key(model_id: str) -> str:
+        return f"verification-keys/{model_id}.vk"
+
     async def upload_model_settings(self, model_id: str, settings: dict) -> dict:
-        key = f"settings/{model_id}.json"
+        key = self.model_settings_key(model_id)
         return await self.upload_json(key, settings)
 
     async def download_model_settings(self, model_id: str) -> dict:
-        key = f"settings/{model_id}.json"
+        key = self.model_settings_key(model_id)
         return await self.download_json(key)
 
     async def upload_verification_key(self, model_id: str, vk_data: bytes) -> dict:
-        key = f"verification-keys/{model_id}.vk"
+        key = self.verification_key_key(model_id)
         try:
-            response = self.s3.put_object(
+            response = await self._call(
+                self.s3.put_object,
                 Bucket=self.bucket,
                 Key=key,
                 Body=vk_data,
@@ -129,25 +249,39 @@ class AkaveService:
             return {"error": str(e)}
 
     async def download_verification_key(self, model_id: str) -> dict:
-        key = f"verification-keys/{model_id}.vk"
+        key = self.verification_key_key(model_id)
         try:
-            response = self.s3.get_object(Bucket=self.bucket, Key=key)
-            vk_data = response['Body'].read()
+            response, vk_data = await self._call(self._get_object, key)
             return {"data": vk_data, "bucket": self.bucket, "key": key}
         except ClientError as e:
             return {"error": e.response['Error']}
         except Exception as e:
             return {"error": str(e)}
 
-    async def upload_proof(self, model_id: str, proof_id: str, proof_data: bytes) -> dict:
+    async def upload_proof(
+        self,
+        model_id: str,
+        proof_id: str,
+        proof_data: bytes,
+        storage_format: Optional[str] = None,
+        metadata: Optional[Dict[str, str]] = None
+    ) -> dict:
+        """
+        Upload proof JSON, stored as-is or in the compact format.
+        
+        The storage format (PROOF_STORAGE_FORMAT by default) is recorded in
+        the object metadata so downloads can decode it transparently.
+        """
         key = f"proofs/{model_id}/{proof_id}.json"
         try:
-            response = self.s3.put_object(
+            body, fmt = proof_codec.encode(proof_data, storage_format or settings.PROOF_STORAGE_FORMAT)
+            response = await self._call(
+                self.s3.put_object,
                 Bucket=self.bucket,
                 Key=key,
-                Body=proof_data,
-                ContentType='application/json',
-                Metadata={'model_id': model_id}
+                Body=body,
+                ContentType=proof_codec.JSON_MEDIA_TYPE if fmt == proof_codec.FORMAT_JSON else proof_codec.COMPACT_MEDIA_TYPE,
+                Metadata={**(metadata or {}), 'model_id': model_id, proof_codec.METADATA_KEY: fmt}
             )
             # Extract checksums from the Akave response
             return {
@@ -161,43 +295,322 @@ class AkaveService:
                 "checksum_sha256": response.get('ChecksumSHA256'),
                 "checksum_type": response.get('ChecksumType'),
                 "version_id": response.get('VersionId'),
-                "size": response.get('Size')
+                "size": response.get('Size'),
+                "format": fmt,
+                "stored_size": len(body)
             }
         except ClientError as e:
             return {"error": e.response['Error']}
         except Exception as e:
             return {"error": str(e)}
 
-    async def download_proof(self, model_id: str, proof_id: str) -> dict:
+    async def download_proof(self, model_id: str, proof_id: str, decode: bool = True) -> dict:
+        """Download a proof; compact-format proofs are decoded to JSON unless decode=False."""
         key = f"proofs/{model_id}/{proof_id}.json"
+        location = self.locate_proof(model_id, proof_id) if self.locate_proof else None
+        if location is not None:
+            return await self._download_from_segment(key, location, decode)
+        
         try:
-            # Get object data
-            response = self.s3.get_object(Bucket=self.bucket, Key=key)
-            proof_data = response['Body'].read()
-            
-            # Get complete metadata including checksums
-            head_response = self.s3.head_object(Bucket=self.bucket, Key=key)
+            # One GET returns the data together with its checksums
+            response, proof_data = await self._call(self._get_object, key, ChecksumMode='ENABLED')
+            stored_size = len(proof_data)
+            fmt = proof_codec.stored_format(response.get('Metadata'), proof_data)
+            if decode and fmt in proof_codec.COMPACT_FORMATS:
+                proof_data = proof_codec.decode_compact(proof_data)
             
             return {
                 "data": proof_data, 
+                "format": fmt,
+                "stored_size": stored_size,
                 "bucket": self.bucket, 
                 "key": key, 
                 "metadata": response.get('Metadata', {}),
-                "etag": head_response.get('ETag'),
-                "checksum_crc32": head_response.get('ChecksumCRC32'),
-                "checksum_crc32c": head_response.get('ChecksumCRC32C'),
-                "checksum_sha1": head_response.get('ChecksumSHA1'),
-                "checksum_sha256": head_response.get('ChecksumSHA256'),
-                "checksum_type": head_response.get('ChecksumType'),
-                "last_modified": head_response.get('LastModified'),
-                "content_length": head_response.get('ContentLength'),
-                "version_id": head_response.get('VersionId')
+                **self._object_info(response)
             }
         except ClientError as e:
             return {"error": e.response['Error']}
         except Exception as e:
             return {"error": str(e)}
 
+    async def _download_from_segment(self, key: str, location: Dict[str, Any], decode: bool) -> dict:
+        """Read a compacted proof with one ranged GET inside its segment."""
+        offset, length = location["segment_offset"], location["segment_length"]
+        try:
+            _, proof_data = await self._call(
+                self._get_object, location["segment_key"], Range=f"bytes={offset}-{offset + length - 1}"
+            )
+            fmt = location.get("storage_format") or proof_codec.stored_format(None, proof_data)
+            if decode and fmt in proof_codec.COMPACT_FORMATS:
+                proof_data = proof_codec.decode_compact(proof_data)
+            
+            return {
+                "data": proof_data,
+                "format": fmt,
+                "stored_size": length,
+                "bucket": self.bucket,
+                "key": key,
+                "segment": location["segment_key"],
+                "metadata": location.get("metadata") or {},
+                "etag": location.get("etag"),
+                "checksum_sha256": location.get("checksum_sha256"),
+                "content_length": length
+            }
+        except ClientError as e:
+            return {"error": e.response['Error']}
+        except Exception as e:
+            return {"error": str(e)}
+
+    @staticmethod
+    def _object_info(response: Dict[str, Any]) -> Dict[str, Any]:
+        """ETag, checksums and size fields of a GET/HEAD response."""
+        return {
+            "etag": response.get('ETag'),
+            "checksum_crc32": response.get('ChecksumCRC32'),
+            "checksum_crc32c": response.get('ChecksumCRC32C'),
+            "checksum_sha1": response.get('ChecksumSHA1'),
+            "checksum_sha256": response.get('ChecksumSHA256'),
+            "checksum_type": response.get('ChecksumType'),
+            "last_modified": response.get('LastModified'),
+            "content_length": response.get('ContentLength'),
+            "content_range": response.get('ContentRange'),
+            "version_id": response.get('VersionId')
+        }
+
+    async def open_proof_stream(
+        self,
+        model_id: str,
+        proof_id: str,
+        byte_range: Optional[str] = None,
+        if_none_match: Optional[str] = None,
+        chunk_size: int = 64 * 1024
+    ) -> dict:
+        """
+        Start a streaming GET of a proof object, without buffering its body.
+        
+        Range and If-None-Match are forwarded to storage, so partial reads
+        and unchanged objects cost a single round trip.
+        
+        Returns:
+            {"status": 200 | 206, "chunks": async iterator, ...object info},
+            {"status": 304, "etag"}, or {"error", "status"}
+        """
+        key = f"proofs/{model_id}/{proof_id}.json"
+        location = self.locate_proof(model_id, proof_id) if self.locate_proof else None
+        if location is not None:
+            return await self._open_segment_stream(key, location, byte_range, if_none_match, chunk_size)
+        
+        params: Dict[str, Any] = {"ChecksumMode": 'ENABLED'}
+        if byte_range:
+            params["Range"] = byte_range
+        if if_none_match:
+            params["IfNoneMatch"] = if_none_match
+        
+        try:
+            response = await self._call(self.s3.get_object, Bucket=self.bucket, Key=key, **params)
+        except ClientError as e:
+            status = e.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+            if status == 304 or e.response['Error'].get('Code') in ('304', 'NotModified'):
+                return {"status": 304, "etag": if_none_match, "key": key}
+            return {"error": e.response['Error'], "status": status or 500}
+        except Exception as e:
+            return {"error": str(e), "status": 500}
+        
+        body = response['Body']
+        return {
+            "status": 206 if response.get('ContentRange') else 200,
+            "key": key,
+            "content_type": response.get('ContentType', 'application/json'),
+            "metadata": response.get('Metadata', {}),
+            "chunks": self._stream_body(body, chunk_size, key),
+            "close": body.close,
+            **self._object_info(response)
+        }
+
+    async def _stream_body(self, body, chunk_size: int, key: str) -> AsyncIterator[bytes]:
+        # Each blocking read runs on the I/O pool; the body is never held whole
+        loop = asyncio.get_running_loop()
+        status = "ok"
+        read_seconds = 0.0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    chunk = await loop.run_in_executor(self._executor, body.read, chunk_size)
+                finally:
+                    read_seconds += time.perf_counter() - start
+                if not chunk:
+                    return
+                yield chunk
+        except GeneratorExit:
+            status = "closed"  # The consumer stopped early (e.g. client disconnected)
+            raise
+        except BaseException as e:
+            status = type(e).__name__
+            raise
+        finally:
+            body.close()
+            # One observation per stream: the time spent reading the body,
+            # not counting the time the consumer took between chunks
+            metrics.observe_akave("read_stream", metrics.model_from_key(key), status, read_seconds)
+
+    @staticmethod
+    def _parse_range(byte_range: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+        """
+        Resolve a single "bytes=" range against an object size.
+        
+        Returns (first, last) inclusive, None to serve the whole object
+        (no range, or a form we don't support), or raises ValueError when
+        the range is unsatisfiable.
+        """
+        if not byte_range or not byte_range.startswith("bytes=") or "," in byte_range:
+            return None
+        first, _, last = byte_range[len("bytes="):].strip().partition("-")
+        try:
+            if first == "":
+                first, last = max(0, size - int(last)), size - 1
+            else:
+                first, last = int(first), min(int(last), size - 1) if last else size - 1
+        except ValueError:
+            return None
+        if first >= size or first > last:
+            raise ValueError("Range not satisfiable")
+        return first, last
+
+    async def _open_segment_stream(
+        self,
+        key: str,
+        location: Dict[str, Any],
+        byte_range: Optional[str],
+        if_none_match: Optional[str],
+        chunk_size: int
+    ) -> dict:
+        """Stream a compacted proof (or a range of it) out of its segment."""
+        etag, length = location.get("etag"), location["segment_length"]
+        if if_none_match and etag and if_none_match == etag:
+            return {"status": 304, "etag": etag, "key": key}
+        
+        try:
+            window = self._parse_range(byte_range, length)
+        except ValueError:
+            return {"error": "Range not satisfiable", "status": 416}
+        first, last = window or (0, length - 1)
+        offset = location["segment_offset"]
+        
+        try:
+            response = await self._call(
+                self.s3.get_object,
+                Bucket=self.bucket,
+                Key=location["segment_key"],
+                Range=f"bytes={offset + first}-{offset + last}"
+            )
+        except ClientError as e:
+            return {"error": e.response['Error'], "status": 404}
+        except Exception as e:
+            return {"error": str(e), "status": 500}
+        
+        fmt = location.get("storage_format") or proof_codec.FORMAT_JSON
+        body = response['Body']
+        return {
+            "status": 206 if window else 200,
+            "key": key,
+            "content_type": proof_codec.JSON_MEDIA_TYPE if fmt == proof_codec.FORMAT_JSON else proof_codec.COMPACT_MEDIA_TYPE,
+            "metadata": {**(location.get("metadata") or {}), proof_codec.METADATA_KEY: fmt},
+            "chunks": self._stream_body(body, chunk_size, location["segment_key"]),
+            "close": body.close,
+            "etag": etag,
+            "checksum_sha256": location.get("checksum_sha256"),
+            "content_length": last - first + 1,
+            "content_range": f"bytes {first}-{last}/{length}" if window else None,
+            "segment": location["segment_key"]
+        }
+
+    async def upload_bytes(self, key: str, data: bytes, content_type: str = 'application/octet-stream') -> dict:
+        try:
+            response = await self._call(
+                self.s3.put_object,
+                Bucket=self.bucket,
+                Key=key,
+                Body=data,
+                ContentType=content_type
+            )
+            return {"response": response, "bucket": self.bucket, "key": key, "etag": response.get('ETag')}
+        except ClientError as e:
+            return {"error": e.response['Error']}
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def delete_objects(self, keys: List[str]) -> dict:
+        """Delete objects in batches of 1000 (the DeleteObjects limit)."""
+        deleted, errors = 0, []
+        try:
+            for i in range(0, len(keys), 1000):
+                response = await self._call(
+                    self.s3.delete_objects,
+                    Bucket=self.bucket,
+                    Delete={"Objects": [{"Key": key} for key in keys[i:i + 1000]], "Quiet": True}
+                )
+                errors.extend(response.get('Errors', []))
+                deleted += len(keys[i:i + 1000]) - len(response.get('Errors', []))
+            return {"deleted": deleted, "errors": errors}
+        except ClientError as e:
+            return {"error": e.response['Error'], "deleted": deleted}
+        except Exception as e:
+            return {"error": str(e), "deleted": deleted}
+
+    @staticmethod
+    def calldata_key(model_id: str, proof_id: str) -> str:
+        return f"calldata/{model_id}/{proof_id}.bin"
+
+    async def upload_calldata(self, model_id: str, proof_id: str, calldata: bytes) -> dict:
+        """Store a proof's EVM calldata next to the proof."""
+        return await self.upload_bytes(self.calldata_key(model_id, proof_id), calldata)
+
+    async def download_calldata(self, model_id: str, proof_id: str) -> dict:
+        """Download a proof's stored EVM calldata; "missing" is set when none was stored yet."""
+        key = self.calldata_key(model_id, proof_id)
+        try:
+            response, data = await self._call(self._get_object, key)
+            return {"data": data, "key": key, "etag": response.get('ETag')}
+        except ClientError as e:
+            missing = e.response['Error'].get('Code') in ('NoSuchKey', '404')
+            return {"error": e.response['Error'], "missing": missing}
+        except Exception as e:
+            return {"error": str(e), "missing": False}
+
+    async def iter_segment_proofs(self, model_id: Optional[str] = None, decode: bool = True) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield every compacted proof of a model (or of all models).
+        
+        Each segment is read with one sequential GET and split using its
+        sidecar index, so an export or audit costs two requests per segment
+        instead of one per proof.
+        """
+        prefix = f"{SEGMENT_PREFIX}{model_id}/" if model_id else SEGMENT_PREFIX
+        async for obj in self.iter_objects(prefix):
+            if not obj["Key"].endswith(SEGMENT_INDEX_SUFFIX):
+                continue
+            sidecar = await self.download_json(obj["Key"])
+            if "error" in sidecar:
+                raise Exception(f"Reading segment index {obj['Key']} failed: {sidecar['error']}")
+            sidecar = sidecar["data"]
+            _, segment = await self._call(self._get_object, sidecar["segment_key"])
+            for entry in sidecar["entries"]:
+                data = segment[entry["offset"]:entry["offset"] + entry["length"]]
+                fmt = entry.get("format") or proof_codec.stored_format(None, data)
+                if decode and fmt in proof_codec.COMPACT_FORMATS:
+                    data = proof_codec.decode_compact(data)
+                yield {
+                    "model_id": sidecar["model_id"],
+                    "proof_id": entry["proof_id"],
+                    "key": f"proofs/{sidecar['model_id']}/{entry['proof_id']}.json",
+                    "segment": sidecar["segment_key"],
+                    "data": data,
+                    "format": fmt,
+                    "etag": entry.get("etag"),
+                    "metadata": entry.get("metadata") or {}
+                }
+
     async def list_proofs(self, model_id: str = None) -> dict:
         prefix = f"proofs/{model_id}/" if model_id else "proofs/"
         result = await self.list_files(prefix=prefix)
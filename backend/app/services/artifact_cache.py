@@ -0,0 +1,146 @@
+import hashlib
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+from app.core.config import settings
+
+# Digests are cached per (path, size, mtime) so that large artifacts such as
+# proving keys are only hashed again when they actually change on disk
+_digest_cache: Dict[Tuple[str, int, int], str] = {}
+_digest_lock = threading.Lock()
+
+
+def artifact_digest(path: str) -> str:
+    """Return the sha256 hex digest of an artifact file."""
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+    with _digest_lock:
+        digest = _digest_cache.get(key)
+    if digest is not None:
+        return digest
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+
+    with _digest_lock:
+        _digest_cache[key] = digest
+    return digest
+
+
+def artifacts_digest(paths: List[str]) -> str:
+    """Combined digest of several artifact files (e.g. compiled circuit + pk)."""
+    h = hashlib.sha256()
+    for path in paths:
+        h.update(artifact_digest(path).encode())
+    return h.hexdigest()
+
+
+class _ResidentModel:
+    """Memory mappings that keep one model's artifacts in the page cache."""
+
+    def __init__(self, paths: Dict[str, str]):
+        self.maps: List[mmap.mmap] = []
+        self.size = 0
+        for path in paths.values():
+            with open(path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size == 0:
+                    continue
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if hasattr(mm, "madvise") and hasattr(mmap, "MADV_WILLNEED"):
+                mm.madvise(mmap.MADV_WILLNEED)
+            # Touch every page so the whole file is faulted in now rather
+            # than during the next prove
+            for offset in range(0, size, mmap.PAGESIZE):
+                mm[offset]
+            self.maps.append(mm)
+            self.size += size
+
+    def close(self):
+        for mm in self.maps:
+            mm.close()
+        self.maps = []
+
+
+class ResidentArtifactCache:
+    """
+    Per-worker LRU of memory-resident model artifacts.
+
+    ezkl only accepts artifact paths, so the circuit and proving key can't be
+    handed over already deserialized. Instead the files of hot models are
+    kept mapped and faulted in, so every prove reads them from memory rather
+    than from disk. Entries are keyed by model_id and artifact digest, so a
+    rebuilt model is loaded fresh and the stale mapping ages out.
+    """
+
+    def __init__(self, budget_bytes: int = settings.ARTIFACT_CACHE_BYTES):
+        self.budget_bytes = budget_bytes
+        self._entries: "OrderedDict[Tuple[str, str], _ResidentModel]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def acquire(self, model_id: str, paths: Dict[str, str]) -> Dict[str, str]:
+        """
+        Make sure a model's artifacts are resident and return their paths.
+
+        Args:
+            model_id: Model identifier
+            paths: Artifact name -> file path (e.g. compiled, pk)
+
+        Returns:
+            The same paths, now backed by resident pages
+        """
+        key = (model_id, artifacts_digest(list(paths.values())))
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return paths
+            self.misses += 1
+
+        entry = _ResidentModel(paths)
+
+        with self._lock:
+            if key in self._entries:
+                # Loaded concurrently by another caller
+                entry.close()
+                return paths
+
+            # Drop stale versions of the same model before anything else
+            for stale in [k for k in self._entries if k[0] == model_id and k != key]:
+                self._entries.pop(stale).close()
+                self.evictions += 1
+
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+
+            while self._total_size() > self.budget_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                evicted.close()
+                self.evictions += 1
+
+        return paths
+
+    def _total_size(self) -> int:
+        return sum(e.size for e in self._entries.values())
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "resident_models": len(self._entries),
+                "resident_bytes": self._total_size(),
+                "budget_bytes": self.budget_bytes,
+            }
@@ -0,0 +1,94 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Set, Tuple
+
+from app.core.config import settings
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-item requests into batches.
+
+    Items submitted under the same key (e.g. a model_id) within `max_wait_ms`
+    of the first one are executed together by `run_batch`, up to `max_size`
+    items per batch. Each caller gets back its own result, in the same way
+    dynamic batching works in inference servers.
+
+    `run_batch(key, items)` must return one result per item, in order; a
+    result that is an exception instance is raised to that item's caller only.
+
+    Batching only pays off when `run_batch` executes the items in one pass,
+    so EzklService only batches native-mode predictions (one forward pass);
+    the circuit path has no batched witness generation.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[Hashable, List[Any]], Awaitable[List[Any]]],
+        max_size: int = settings.INFERENCE_MICRO_BATCH_MAX_SIZE,
+        max_wait_ms: float = settings.INFERENCE_MICRO_BATCH_MAX_WAIT_MS,
+    ):
+        self.run_batch = run_batch
+        self.max_size = max(1, max_size)
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._pending: Dict[Hashable, List[Tuple[Any, asyncio.Future]]] = {}
+        self._timers: Dict[Hashable, asyncio.TimerHandle] = {}
+        # The loop only keeps weak references to tasks
+        self._tasks: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, key: Hashable, item: Any) -> Any:
+        """Queue an item for the next batch under `key` and wait for its result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._pending.setdefault(key, [])
+        pending.append((item, future))
+
+        if len(pending) >= self.max_size:
+            self._flush(key)
+        elif key not in self._timers:
+            self._timers[key] = loop.call_later(self.max_wait, self._flush, key)
+
+        return await future
+
+    def _flush(self, key: Hashable):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+
+        batch = self._pending.pop(key, [])
+        if batch:
+            self.batches += 1
+            self.items += len(batch)
+            task = asyncio.get_running_loop().create_task(self._execute(key, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _execute(self, key: Hashable, batch: List[Tuple[Any, asyncio.Future]]):
+        items = [item for item, _ in batch]
+        try:
+            results = await self.run_batch(key, items)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        # Fan the results back out to the waiting callers
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue  # Caller gave up (cancelled)
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "max_size": self.max_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+        }
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.utils import metrics
+from app.utils.cache import LRUCache, SingleFlight
+
+
+class CalldataStore:
+    """
+    EVM calldata of stored proofs.
+
+    Calldata is encoded once, in the prover worker that generates the proof,
+    and stored in Akave next to the proof (calldata/{model_id}/{proof_id}.bin)
+    and in a local LRU, optionally backed by a cache directory. Proofs stored
+    before calldata was precomputed are encoded on their first request and
+    backfilled the same way, so every later request is served directly.
+    """
+
+    def __init__(
+        self,
+        akave,
+        ezkl_service,
+        maxsize: int = settings.CALLDATA_CACHE_SIZE,
+        cache_dir: Optional[str] = settings.CALLDATA_CACHE_DIR,
+    ):
+        self.akave = akave
+        self.ezkl = ezkl_service
+        self.memory = LRUCache(maxsize)
+        self.cache_dir = cache_dir
+        self._inflight = SingleFlight()
+        self.disk_hits = 0
+        self.remote_hits = 0
+        self.backfilled = 0
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _disk_path(self, model_id: str, proof_id: str) -> str:
+        # The ids come from request paths: name the file by their hash so
+        # no id can point outside the cache directory
+        digest = hashlib.sha256(json.dumps([model_id, proof_id]).encode()).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}.bin")
+
+    def _remember(self, model_id: str, proof_id: str, calldata: bytes):
+        self.memory.put((model_id, proof_id), calldata)
+        if not self.cache_dir:
+            return
+
+        path = self._disk_path(model_id, proof_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write atomically so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(calldata)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _cached(self, model_id: str, proof_id: str) -> Optional[bytes]:
+        calldata = self.memory.get((model_id, proof_id))
+        if calldata is not None or not self.cache_dir:
+            return calldata
+
+        try:
+            with open(self._disk_path(model_id, proof_id), 'rb') as f:
+                calldata = f.read()
+        except FileNotFoundError:
+            return None
+
+        # Promote to the memory tier
+        self.disk_hits += 1
+        self.memory.put((model_id, proof_id), calldata)
+        return calldata
+
+    async def put(self, model_id: str, proof_id: str, calldata: bytes) -> Dict[str, Any]:
+        """Cache a proof's calldata locally and store it in Akave."""
+        self._remember(model_id, proof_id, calldata)
+        return await self.akave.upload_calldata(model_id, proof_id, calldata)
+
+    async def get(self, model_id: str, proof_id: str, proof_data: Optional[bytes] = None) -> bytes:
+        """
+        Return a proof's calldata, encoding and storing it if it was never stored.
+
+        Args:
+            model_id: Model identifier
+            proof_id: Proof identifier
+            proof_data: The proof, if the caller already downloaded it
+
+        Raises:
+            Exception: If the proof can't be found or encoded
+        """
+        calldata = self._cached(model_id, proof_id)
+        if calldata is not None:
+            metrics.CACHE_LOOKUPS.inc(cache="calldata", model_id=model_id, result="hit")
+            return calldata
+        # Concurrent first requests share one lookup (and at most one encode)
+        return await self._inflight.do((model_id, proof_id), lambda: self._load(model_id, proof_id, proof_data))
+
+    async def _load(self, model_id: str, proof_id: str, proof_data: Optional[bytes]) -> bytes:
+        stored = await self.akave.download_calldata(model_id, proof_id)
+        if "error" not in stored:
+            self.remote_hits += 1
+            metrics.CACHE_LOOKUPS.inc(cache="calldata", model_id=model_id, result="remote")
+            self._remember(model_id, proof_id, stored["data"])
+            return stored["data"]
+        if not stored.get("missing"):
+            raise Exception(f"Calldata download failed: {stored['error']}")
+
+        # Stored before calldata was precomputed: encode once and backfill
+        metrics.CACHE_LOOKUPS.inc(cache="calldata", model_id=model_id, result="miss")
+        if proof_data is None:
+            proof = await self.akave.download_proof(model_id, proof_id, decode=False)
+            if "error" in proof:
+                raise Exception(f"Proof not found: {proof['error']}")
+            proof_data = proof["data"]
+
+        calldata = await self.ezkl.encode_evm_calldata(proof_data, model_id)
+        upload = await self.put(model_id, proof_id, calldata)
+        if "error" not in upload:
+            self.backfilled += 1
+        return calldata
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.memory.stats()
+        stats["disk_hits"] = self.disk_hits
+        stats["disk_enabled"] = bool(self.cache_dir)
+        stats["remote_hits"] = self.remote_hits
+        stats["backfilled"] = self.backfilled
+        return stats
@@ -3,20 +3,99 @@ import ezkl
 import torch
 import json
 import asyncio
-from typing import List, Dict, Any, Tuple
+import random
+import time
+import numpy as np
+from typing import List, Dict, Any, Tuple, Optional, AsyncIterable, AsyncIterator, Iterable, Union
 from app.services.akave import AkaveService
+from app.services.workspace import Workspace, WorkspaceManager
+from app.services.verifier_context import VerifierContext, VerifierContextError, VerifierContextManager
+from app.services import prover_pool
+from app.services.prover_pool import ProverPool
+from app.services.artifact_cache import artifact_digest, artifacts_digest
+from app.services.result_cache import ResultCache, result_key, verification_key
+from app.services.batching import MicroBatcher
+from app.services.native_inference import NativeInference
+from app.utils import calldata, metrics, proof_codec
+from app.utils.cache import SingleFlight
+from app.utils.resources import directory_size
+from app.core.config import settings
+
+# Candidate layouts for the "input_data" field of an ezkl input file. Which one
+# a compiled circuit accepts depends on how the model was exported, so it is
+# probed once per model version (see resolve_input_format), not per request.
+INPUT_FORMATS = [
+    lambda data: [data],
+    lambda data: data,
+    lambda data: [[[data]]],
+    lambda data: [[data]],
+]
+
+# Each output position is a 10-way score vector over the digits 0-9
+OUTPUT_CLASSES = 10
+
+
+def decode_rescaled_outputs(rescaled: np.ndarray) -> np.ndarray:
+    """
+    Decode rescaled circuit outputs into predicted digits for a whole batch.
+    
+    Args:
+        rescaled: Array of shape (batch, positions * 10), numbers or numeric strings
+    
+    Returns:
+        Integer array of shape (batch, positions) with the argmax of each group of 10
+    """
+    scores = np.asarray(rescaled, dtype=np.float64)
+    return scores.reshape(scores.shape[0], -1, OUTPUT_CLASSES).argmax(axis=2)
+
+
+async def _as_async_iter(items: Iterable[Any]) -> AsyncIterator[Any]:
+    for item in items:
+        yield item
 
 
 class EzklService:
-    def __init__(self):
-        self.akave = AkaveService()
+    def __init__(self, akave: Optional[AkaveService] = None):
+        self.akave = akave or AkaveService()
         # Get absolute paths for artifacts and temp directories
         self.base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         self.artifacts_dir = os.path.join(self.base_dir, "artifacts", "models")
+        metrics.set_models_dir(self.artifacts_dir)
         self.temp_dir = os.path.join(self.base_dir, "artifacts", "temp")
         
-        # Ensure temp directory exists
-        os.makedirs(self.temp_dir, exist_ok=True)
+        # Every job gets its own scratch directory (on tmpfs when available),
+        # so concurrent requests never overwrite each other's files
+        self.workspaces = WorkspaceManager(fallback_root=self.temp_dir)
+        
+        # Settings and vk per model, downloaded once and revalidated by ETag
+        self.verifiers = VerifierContextManager(
+            self.akave,
+            fallback_root=os.path.join(self.base_dir, "artifacts", "verifiers")
+        )
+        
+        # Blocking ezkl mock/prove/verify calls run in worker processes
+        self.prover = ProverPool()
+        
+        # Resolved input layout per model: model_id -> (compiled digest, format index)
+        self._input_formats: Dict[str, Tuple[str, int]] = {}
+        self._probe_locks: Dict[str, asyncio.Lock] = {}
+        
+        # Content-addressed prediction/witness/proof cache; identical requests
+        # in flight at the same time share a single computation
+        self.results = ResultCache()
+        self._inflight = SingleFlight()
+        
+        # Verification outcomes by proof, vk and settings digests
+        self.verifications = ResultCache(settings.VERIFY_CACHE_SIZE, settings.VERIFY_CACHE_DIR)
+        
+        # Concurrent native-mode single predictions for the same model are
+        # coalesced into one batched forward pass
+        self.batcher = MicroBatcher(self._run_micro_batch) if settings.INFERENCE_MICRO_BATCH_ENABLED else None
+        
+        # Native forward pass for "native" inference mode; the ezkl witness is
+        # then only generated when a proof is requested
+        self.native = NativeInference() if settings.INFERENCE_MODE == "native" else None
+        self._background_tasks = set()
         
         # Store the latest prediction metadata for proof generation
         self.latest_prediction = None
@@ -43,13 +122,105 @@ class EzklService:
         
         return paths
 
-    def _get_temp_paths(self) -> Dict[str, str]:
-        """Get temporary file paths."""
-        return {
-            "input": os.path.join(self.temp_dir, "input.json"),
-            "witness": os.path.join(self.temp_dir, "witness.json"),
-            "proof": os.path.join(self.temp_dir, "proof.json")
-        }
+    async def _gen_witness(
+        self,
+        input_payload: Dict[str, Any],
+        compiled_path: str,
+        ws: Workspace,
+        model_id: str = "",
+        format_index: int = -1
+    ) -> str:
+        """Generate the witness for an input inside a workspace and return its raw JSON."""
+        input_path = ws.write("input", input_payload)
+        
+        # Generate witness with timeout; every attempt is timed by input format
+        outcome = "error"
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(
+                ezkl.gen_witness(
+                    input_path,
+                    compiled_path,
+                    ws["witness"]
+                ),
+                timeout=30.0
+            )
+            outcome = "ok"
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            raise
+        finally:
+            metrics.WITNESS_ATTEMPT_SECONDS.observe(
+                time.perf_counter() - start, model_id=model_id, format=str(format_index), outcome=outcome
+            )
+        
+        # The witness file is read exactly once; callers parse the string
+        try:
+            return ws.read("witness")
+        except FileNotFoundError:
+            raise Exception("Witness file was not created")
+
+    async def _probe_input_format(self, compiled_path: str, model_id: str = "") -> int:
+        """Find the input layout a compiled circuit accepts by trying each candidate once."""
+        sample = [0.0] * 6
+        last_error = None
+        
+        with self.workspaces.workspace("probe") as ws:
+            for index, layout in enumerate(INPUT_FORMATS):
+                try:
+                    await self._gen_witness({"input_data": layout(sample)}, compiled_path, ws, model_id, index)
+                    return index
+                except asyncio.TimeoutError:
+                    last_error = "Witness generation timed out"
+                except Exception as e:
+                    last_error = f"Witness generation failed: {str(e)}"
+        
+        raise Exception(f"All input formats failed. Last error: {last_error}")
+
+    async def resolve_input_format(self, model_id: str, model_paths: Dict[str, str] = None) -> int:
+        """
+        Get the input layout for a model, probing the circuit only when the
+        model is new or its compiled artifact has changed.
+        
+        Args:
+            model_id: Model identifier
+            model_paths: Model paths, if already looked up
+        
+        Returns:
+            Index into INPUT_FORMATS
+        """
+        model_paths = model_paths or self._get_model_paths(model_id)
+        digest = artifact_digest(model_paths["compiled"])
+        
+        cached = self._input_formats.get(model_id)
+        if cached and cached[0] == digest:
+            return cached[1]
+        
+        lock = self._probe_locks.setdefault(model_id, asyncio.Lock())
+        async with lock:
+            # Another request may have finished probing while we waited
+            cached = self._input_formats.get(model_id)
+            if cached and cached[0] == digest:
+                return cached[1]
+            
+            index = await self._probe_input_format(model_paths["compiled"], model_id)
+            self._input_formats[model_id] = (digest, index)
+            return index
+
+    async def warm_up(self):
+        """Resolve the input layout of every shipped model ahead of the first request."""
+        if not os.path.isdir(self.artifacts_dir):
+            return
+        
+        for model_id in sorted(os.listdir(self.artifacts_dir)):
+            # Probing only needs the compiled circuit, not the proving key
+            compiled = os.path.join(self.artifacts_dir, model_id, f"{model_id}-network.compiled")
+            if not os.path.isfile(compiled):
+                continue
+            try:
+                await self.resolve_input_format(model_id, {"compiled": compiled})
+            except Exception:
+                pass  # Unusable models are reported on their first request
 
     async def predict(self, input_vector: List[int], model_id: str) -> Dict[str, Any]:
         """
@@ -58,7 +229,7 @@ class EzklService:
         Args:
             input_vector: List of 6 integers
             model_id: Model identifier
-            
+        
         Returns:
             Dict containing predicted digits and witness data
         """
@@ -80,92 +251,39 @@ class EzklService:
                 raise ValueError(f"Model '{model_id}' likely requires inputs in range 0-9. Example: [1, 2, 3, 4, 5, 6]")
         
         try:
-            # Get model and temp paths
+            # Get model paths
             model_paths = self._get_model_paths(model_id)
-            temp_paths = self._get_temp_paths()
-            
-            # Clean up any previous temp files
-            for temp_file in temp_paths.values():
-                if os.path.exists(temp_file):
-                    os.remove(temp_file)
-            
-            # Prepare input tensor
-            shape = [1, 6]
-            x = torch.tensor(input_vector, dtype=torch.float32)
-            x = x.reshape(shape)
-            data_array = x.detach().numpy().reshape([-1]).tolist()
             
-            # Try different input formats until one works
-            formats_to_try = [
-                {"input_data": [data_array]},
-                {"input_data": data_array},
-                {"input_data": [[[data_array]]]},
-                {"input_data": [[data_array]]},
-            ]
+            # Identical (model, input) pairs are served from the result cache,
+            # and concurrent identical requests share a single witness run
+            cache_key = self._result_key(model_paths, input_vector)
             
-            witness_generated = False
-            last_error = None
+            # Native-only entries (no witness yet) don't answer a circuit prediction
+            cached = self.results.get(cache_key)
+            entry = cached if cached and cached.get("witness_data") else None
             
-            for format_data in formats_to_try:
-                if witness_generated:
-                    break
-                
-                # Write this format to file
-                with open(temp_paths["input"], 'w') as f:
-                    json.dump(format_data, f)
-                
-                # Generate witness with timeout
-                try:
-                    res = await asyncio.wait_for(
-                        ezkl.gen_witness(
-                            temp_paths["input"], 
-                            model_paths["compiled"], 
-                            temp_paths["witness"]
-                        ),
-                        timeout=30.0
-                    )
-                    
-                    # Check if witness file was created
-                    if os.path.isfile(temp_paths["witness"]):
-                        witness_generated = True
-                        break
-                        
-                except asyncio.TimeoutError:
-                    last_error = "Witness generation timed out"
-                    continue
-                except Exception as e:
-                    last_error = f"Witness generation failed: {str(e)}"
-                    continue
+            if entry is None and self._use_native(model_paths):
+                return await self._predict_native(input_vector, model_id, model_paths, cache_key, cached)
             
-            if not witness_generated:
-                raise Exception(f"All input formats failed. Last error: {last_error}")
+            metrics.CACHE_LOOKUPS.inc(cache="result", model_id=model_id, result="miss" if entry is None else "hit")
+            if entry is None:
+                entry = await self._inflight.do(
+                    ("witness", cache_key),
+                    lambda: self._compute_prediction(input_vector, model_id, model_paths, cache_key),
+                )
             
-            # Parse witness and extract predictions
-            with open(temp_paths["witness"], 'r') as f:
-                W = json.load(f)
+            predicted_digits = entry["predicted_digits"]
+            witness_data = entry["witness_data"]
             
-            rescaled_list = W["pretty_elements"]["rescaled_outputs"][0]
-            
-            # Group into 6 chunks of 10
-            groups = [rescaled_list[i:i+10] for i in range(0, len(rescaled_list), 10)]
-            
-            # Find argmax for each chunk
-            predicted_digits = []
-            for grp in groups:
-                float_vals = [float(s) for s in grp]
-                argmax_index = int(float_vals.index(max(float_vals)))
-                predicted_digits.append(argmax_index)
-            
-            # Read witness data for potential later use
-            with open(temp_paths["witness"], 'r') as f:
-                witness_data = f.read()
-            
-            # Store this prediction as the latest for potential proof generation
+            # Store this prediction as the latest for potential proof generation.
+            # The witness is kept in memory since the workspace is gone by now.
             self.latest_prediction = {
                 "predicted_digits": predicted_digits,
                 "input_vector": input_vector,
                 "model_id": model_id,
-                "witness_file_exists": True
+                "witness_data": witness_data,
+                "witness_file_exists": True,
+                "cache_key": cache_key
             }
             
             return {
@@ -174,10 +292,303 @@ class EzklService:
                 "model_id": model_id,
                 "witness_data": witness_data
             }
-            
+        
         except Exception as e:
             raise Exception(f"Prediction failed: {str(e)}")
 
+    def _use_native(self, model_paths: Dict[str, str]) -> bool:
+        return self.native is not None and os.path.isfile(model_paths["model"])
+
+    async def _native_forward(self, model_id: str, pt_path: str, vectors: np.ndarray) -> np.ndarray:
+        """Native forward pass (and first-use model load) off the event loop."""
+        return await asyncio.to_thread(self.native.predict, model_id, pt_path, vectors)
+
+    async def _predict_native(
+        self,
+        input_vector: List[int],
+        model_id: str,
+        model_paths: Dict[str, str],
+        cache_key: str,
+        cached: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Answer a prediction from the native model, deferring the witness."""
+        predicted_digits = (cached or {}).get("native_predicted_digits")
+        metrics.CACHE_LOOKUPS.inc(
+            cache="result", model_id=model_id, result="miss" if predicted_digits is None else "hit"
+        )
+        if predicted_digits is None:
+            if self.batcher is not None:
+                # Shares one forward pass with concurrent predictions for this model
+                predicted_digits = await self.batcher.submit(model_id, (input_vector, model_paths["model"]))
+            else:
+                digits = await self._native_forward(model_id, model_paths["model"], np.array([input_vector]))
+                predicted_digits = digits[0].tolist()
+            # Kept apart from predicted_digits, which always come with a witness
+            self.results.update(cache_key, model_id=model_id, native_predicted_digits=predicted_digits)
+        
+        # No witness yet: it is generated on demand if a proof is requested
+        self.latest_prediction = {
+            "predicted_digits": predicted_digits,
+            "input_vector": input_vector,
+            "model_id": model_id,
+            "witness_data": None,
+            "witness_file_exists": True,
+            "cache_key": cache_key,
+            "output_source": "native"
+        }
+        
+        # Re-check a sample of native answers against the circuit to catch quantization drift
+        if random.random() < settings.NATIVE_CONSISTENCY_SAMPLE_RATE:
+            task = asyncio.create_task(self._check_native_consistency(dict(self.latest_prediction)))
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+        
+        return {
+            "predicted_digits": predicted_digits,
+            "input_vector": input_vector,
+            "model_id": model_id,
+            "witness_data": None
+        }
+
+    async def _ensure_witness(self, prediction: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Generate (or fetch from cache) the witness for a native prediction.
+        
+        Returns the prediction with its witness and the circuit's predicted
+        digits, which are what a proof attests to.
+        """
+        model_id = prediction["model_id"]
+        model_paths = self._get_model_paths(model_id)
+        cache_key = prediction["cache_key"]
+        
+        entry = self.results.get(cache_key)
+        if entry is None or not entry.get("witness_data"):
+            entry = await self._inflight.do(
+                ("witness", cache_key),
+                lambda: self._compute_prediction(prediction["input_vector"], model_id, model_paths, cache_key),
+            )
+        
+        completed = dict(prediction)
+        completed["witness_data"] = entry["witness_data"]
+        completed["predicted_digits"] = entry["predicted_digits"]
+        
+        if self.native is not None and prediction.get("output_source") == "native":
+            matched = entry["predicted_digits"] == prediction["predicted_digits"]
+            self.native.record_check(model_id, matched)
+            if not matched:
+                completed["native_predicted_digits"] = prediction["predicted_digits"]
+        
+        return completed
+
+    async def _check_native_consistency(self, prediction: Dict[str, Any]):
+        try:
+            await self._ensure_witness(prediction)
+        except Exception:
+            pass  # Best effort; a failing witness is reported when a proof is requested
+
+    def _result_key(self, model_paths: Dict[str, str], input_vector: List[int]) -> str:
+        """Cache key for a prediction: hash of the circuit and pk plus the canonical input."""
+        model_digest = artifacts_digest([model_paths["compiled"], model_paths["pk"]])
+        return result_key(model_digest, input_vector)
+
+    async def _generate_witness(
+        self,
+        input_vector: List[int],
+        model_id: str,
+        model_paths: Dict[str, str]
+    ) -> Tuple[Dict[str, Any], str]:
+        """Generate the witness for one input; returns the parsed witness and its raw JSON."""
+        # Prepare input tensor
+        shape = [1, 6]
+        x = torch.tensor(input_vector, dtype=torch.float32)
+        x = x.reshape(shape)
+        data_array = x.detach().numpy().reshape([-1]).tolist()
+        
+        # Build the input in the layout this circuit accepts
+        format_index = await self.resolve_input_format(model_id, model_paths)
+        input_payload = {"input_data": INPUT_FORMATS[format_index](data_array)}
+        
+        with self.workspaces.workspace("predict") as ws, metrics.track_stage("witness", model_id):
+            try:
+                witness_data = await self._gen_witness(
+                    input_payload, model_paths["compiled"], ws, model_id, format_index
+                )
+            except asyncio.TimeoutError:
+                raise Exception("Witness generation timed out")
+        
+        # Single parse of the witness; the raw string is kept for proving
+        return json.loads(witness_data), witness_data
+
+    async def _compute_prediction(
+        self,
+        input_vector: List[int],
+        model_id: str,
+        model_paths: Dict[str, str],
+        cache_key: str
+    ) -> Dict[str, Any]:
+        """Generate the witness for one input, decode it and cache the result."""
+        W, witness_data = await self._generate_witness(input_vector, model_id, model_paths)
+        
+        rescaled_list = W["pretty_elements"]["rescaled_outputs"][0]
+        
+        # Group into 6 chunks of 10
+        groups = [rescaled_list[i:i+10] for i in range(0, len(rescaled_list), 10)]
+        
+        # Find argmax for each chunk
+        predicted_digits = []
+        for grp in groups:
+            float_vals = [float(s) for s in grp]
+            argmax_index = int(float_vals.index(max(float_vals)))
+            predicted_digits.append(argmax_index)
+        
+        return self.results.update(
+            cache_key,
+            model_id=model_id,
+            predicted_digits=predicted_digits,
+            witness_data=witness_data
+        )
+
+    def validate_input_batch(self, input_vectors: List[Any], model_id: str) -> Tuple[np.ndarray, List[Optional[str]]]:
+        """
+        Validate many input vectors in one vectorized pass.
+        
+        Args:
+            input_vectors: Raw input vectors from the request
+            model_id: Model identifier
+        
+        Returns:
+            (n, 6) integer array of the inputs and a per-row error message (None if valid)
+        """
+        n = len(input_vectors)
+        errors: List[Optional[str]] = [None] * n
+        vectors = np.zeros((n, 6), dtype=np.int64)
+        
+        shaped = [i for i, v in enumerate(input_vectors) if isinstance(v, list) and len(v) == 6]
+        for i in set(range(n)) - set(shaped):
+            errors[i] = "input_vector must be a list of exactly 6 integers"
+        if not shaped:
+            return vectors, errors
+        
+        try:
+            values = np.array([input_vectors[i] for i in shaped], dtype=np.float64)
+        except (ValueError, TypeError):
+            # Some rows hold non-numeric elements; convert row by row to find them
+            rows = []
+            for i in shaped:
+                try:
+                    rows.append(np.array(input_vectors[i], dtype=np.float64))
+                except (ValueError, TypeError):
+                    errors[i] = "All elements in input_vector must be integers"
+                    rows.append(np.full(6, np.nan))
+            values = np.vstack(rows)
+        
+        # Validate input ranges based on model type
+        if model_id == "parity":
+            in_range = np.isin(values, (0, 1)).all(axis=1)
+            range_error = "Parity model requires binary inputs (0 or 1 only). Example: [1, 0, 1, 0, 1, 0]"
+        else:
+            in_range = ((values >= 0) & (values <= 9) & (values == np.floor(values))).all(axis=1)
+            if model_id == "reverse":
+                range_error = "Reverse model requires digit inputs (0-9 only). Example: [1, 2, 3, 4, 5, 6]"
+            else:
+                range_error = f"Model '{model_id}' likely requires inputs in range 0-9. Example: [1, 2, 3, 4, 5, 6]"
+        
+        for row, i in enumerate(shaped):
+            if errors[i] is None and not in_range[row]:
+                errors[i] = range_error
+        
+        vectors[shaped] = np.nan_to_num(values).astype(np.int64)
+        return vectors, errors
+
+    async def iter_predict_batch(
+        self,
+        input_vectors: List[Any],
+        model_id: str,
+        chunk_size: int = settings.INFERENCE_BATCH_CHUNK_SIZE
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run inference on many input vectors, yielding one result per input in order.
+        
+        Inputs are processed in chunks: witnesses within a chunk are generated
+        concurrently (sharing runs and cache entries with single predictions
+        of the same input), so only one chunk is held in memory at a time.
+        
+        Args:
+            input_vectors: Raw input vectors from the request
+            model_id: Model identifier
+            chunk_size: Number of inputs per chunk
+        
+        Yields:
+            {"index", "input_vector", "output"} or {"index", "input_vector", "error"}
+        """
+        model_paths = self._get_model_paths(model_id)
+        vectors, errors = self.validate_input_batch(input_vectors, model_id)
+        semaphore = asyncio.Semaphore(settings.INFERENCE_BATCH_CONCURRENCY)
+        
+        async def compute(vector: List[int], cache_key: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self._inflight.do(
+                    ("witness", cache_key),
+                    lambda: self._compute_prediction(vector, model_id, model_paths, cache_key),
+                )
+        
+        for start in range(0, len(input_vectors), chunk_size):
+            indices = range(start, min(start + chunk_size, len(input_vectors)))
+            valid = [i for i in indices if errors[i] is None]
+            outputs: Dict[int, List[int]] = {}
+            
+            if valid and self._use_native(model_paths):
+                # One native forward pass for the whole chunk
+                digits = await self._native_forward(model_id, model_paths["model"], vectors[valid])
+                outputs = {i: row.tolist() for i, row in zip(valid, digits)}
+                valid = []
+            
+            keys = {i: self._result_key(model_paths, vectors[i].tolist()) for i in valid}
+            entries = {i: self.results.get(keys[i]) for i in valid}
+            missing = [i for i in valid if entries[i] is None or not entries[i].get("witness_data")]
+            if valid:
+                metrics.CACHE_LOOKUPS.inc(len(valid) - len(missing), cache="result", model_id=model_id, result="hit")
+                metrics.CACHE_LOOKUPS.inc(len(missing), cache="result", model_id=model_id, result="miss")
+            
+            computed = await asyncio.gather(
+                *(compute(vectors[i].tolist(), keys[i]) for i in missing),
+                return_exceptions=True
+            )
+            
+            for i, result in zip(missing, computed):
+                if isinstance(result, BaseException):
+                    errors[i] = f"Witness generation failed: {str(result) or type(result).__name__}"
+                else:
+                    entries[i] = result
+            
+            for i in valid:
+                if errors[i] is None:
+                    outputs[i] = entries[i]["predicted_digits"]
+            
+            for i in indices:
+                if errors[i] is not None:
+                    yield {"index": i, "input_vector": input_vectors[i], "error": errors[i]}
+                else:
+                    yield {
+                        "index": i,
+                        "input_vector": vectors[i].tolist(),
+                        "output": outputs[i]
+                    }
+
+    async def predict_batch(self, input_vectors: List[Any], model_id: str) -> List[Dict[str, Any]]:
+        """Run inference on many input vectors and return all per-item results."""
+        return [item async for item in self.iter_predict_batch(input_vectors, model_id)]
+
+    async def _run_micro_batch(self, model_id: str, items: List[Tuple[List[int], str]]) -> List[List[int]]:
+        """
+        Answer a batch of coalesced native single predictions, given as
+        (input_vector, state dict path), with one forward pass.
+        
+        Returns each item's predicted digits.
+        """
+        digits = await self._native_forward(model_id, items[0][1], np.array([vector for vector, _ in items]))
+        return [row.tolist() for row in digits]
+
     async def generate_proof(self, witness_data: str, model_id: str) -> Dict[str, Any]:
         """
         Generate a ZK proof from witness data.
@@ -185,103 +596,162 @@ class EzklService:
         Args:
             witness_data: JSON string containing witness
             model_id: Model identifier
-            
+        
         Returns:
             Dict containing proof data and metadata
         """
         try:
-            # Get model and temp paths
+            # Get model paths
             model_paths = self._get_model_paths(model_id)
-            temp_paths = self._get_temp_paths()
-            
-            # Write witness data to file
-            with open(temp_paths["witness"], 'w') as f:
-                f.write(witness_data)
-            
-            # Run mock verification first
-            res = ezkl.mock(temp_paths["witness"], model_paths["compiled"])
-            if not res:
-                raise Exception("Mock run failed: constraints not satisfied")
             
-            # Generate proof
-            res = ezkl.prove(
-                temp_paths["witness"],
-                model_paths["compiled"],
-                model_paths["pk"],
-                temp_paths["proof"],
-                "single",
-            )
-            
-            if not os.path.isfile(temp_paths["proof"]):
-                raise Exception("Proof file was not created")
+            # for-aggr proofs use a Poseidon transcript: their calldata would be
+            # rejected on-chain, where the aggregate proof is verified instead
+            with_calldata = settings.PRECOMPUTE_CALLDATA and settings.PROOF_TYPE == "single"
+            
+            with self.workspaces.workspace("prove") as ws:
+                # Run mock verification, generate the proof and (once, here)
+                # its EVM calldata in a prover worker
+                start = time.perf_counter()
+                with metrics.track_stage("prover_job", model_id):
+                    result = await self.prover.run(
+                        prover_pool.mock_and_prove,
+                        model_id,
+                        ws.write("witness", witness_data),
+                        model_paths["compiled"],
+                        model_paths["pk"],
+                        ws["proof"],
+                        settings.PROOF_TYPE,
+                        ws["calldata"] if with_calldata else None,
+                    )
+                
+                # Split the job's wall time into the worker's stages and the wait for a worker
+                for stage, seconds in result["timings"].items():
+                    metrics.observe_stage(stage, model_id, seconds)
+                waited = max(0.0, time.perf_counter() - start - sum(result["timings"].values()))
+                metrics.observe_stage("prover_wait", model_id, waited)
+                
+                # What this proof cost: worker CPU and memory, stage wall times, scratch disk
+                resources = {
+                    **result["resources"],
+                    "stage_seconds": {**result["timings"], "prover_wait": waited},
+                    "temp_disk_bytes": directory_size(ws.path),
+                }
+                
+                proof_data = ws.read("proof")
+                proof_calldata = ws.read("calldata", binary=True) if with_calldata else None
             
-            # Read the generated proof
-            with open(temp_paths["proof"], 'r') as f:
-                proof_data = f.read()
+            resources["proof_size_bytes"] = len(proof_data)
+            resources["logrows"] = await self.circuit_logrows(model_id)
             
             return {
                 "proof_data": proof_data,
-                "model_id": model_id,
-                "proof_file_path": temp_paths["proof"]
+                "calldata": proof_calldata,
+                "proof_type": settings.PROOF_TYPE,
+                "resources": resources,
+                "model_id": model_id
             }
-            
+        
         except Exception as e:
             raise Exception(f"Proof generation failed: {str(e)}")
 
+    async def circuit_logrows(self, model_id: str) -> Optional[int]:
+        """logrows of a model's circuit, from the settings in its verifier context (None if unavailable)."""
+        try:
+            context = await self.verifiers.get(model_id)
+            with open(context.settings_path) as f:
+                return int(json.load(f)["run_args"]["logrows"])
+        except Exception:
+            return None
+
+    def snapshot_latest_prediction(self) -> Dict[str, Any]:
+        """
+        Copy the latest prediction so a later predict can't swap it out
+        while a proof for it is queued or running.
+        """
+        if not self.latest_prediction:
+            raise Exception("No recent prediction found. Please run a prediction first.")
+        
+        latest = dict(self.latest_prediction)
+        
+        if not latest.get("witness_data") and latest.get("output_source") != "native":
+            raise Exception("Witness for latest prediction no longer exists. Please run prediction again.")
+        
+        return latest
+
     async def generate_proof_for_latest_prediction(self) -> Dict[str, Any]:
         """
         Generate a ZK proof for the latest prediction.
-        This assumes the witness.json file still exists in temp directory.
+        Uses the witness kept in memory by the last call to `predict`.
         
         Returns:
             Dict containing proof data and metadata
         """
-        if not self.latest_prediction:
-            raise Exception("No recent prediction found. Please run a prediction first.")
+        return await self.generate_proof_for_prediction(self.snapshot_latest_prediction())
+
+    async def generate_proof_for_prediction(self, latest: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Generate a ZK proof for a prediction snapshot.
         
-        if not self.latest_prediction.get("witness_file_exists"):
-            raise Exception("Witness file for latest prediction no longer exists. Please run prediction again.")
+        Args:
+            latest: Prediction from `snapshot_latest_prediction`
         
-        try:
-            # Get model and temp paths
-            model_paths = self._get_model_paths(self.latest_prediction["model_id"])
-            temp_paths = self._get_temp_paths()
-            
-            # Check if witness file exists
-            if not os.path.isfile(temp_paths["witness"]):
-                raise Exception("Witness file not found. Please run prediction again.")
-            
-            # Run mock verification first
-            res = ezkl.mock(temp_paths["witness"], model_paths["compiled"])
-            if not res:
-                raise Exception("Mock run failed: constraints not satisfied")
-            
-            # Generate proof
-            res = ezkl.prove(
-                temp_paths["witness"],
-                model_paths["compiled"],
-                model_paths["pk"],
-                temp_paths["proof"],
-                "single",
-            )
-            
-            if not os.path.isfile(temp_paths["proof"]):
-                raise Exception("Proof file was not created")
-            
-            # Read the generated proof
-            with open(temp_paths["proof"], 'r') as f:
-                proof_data = f.read()
-            
-            return {
-                "proof_data": proof_data,
-                "model_id": self.latest_prediction["model_id"],
-                "predicted_digits": self.latest_prediction["predicted_digits"],
-                "input_vector": self.latest_prediction["input_vector"],
-                "proof_file_path": temp_paths["proof"]
-            }
-            
-        except Exception as e:
-            raise Exception(f"Proof generation failed: {str(e)}")
+        Returns:
+            Dict containing proof data and metadata
+        """
+        if not latest.get("witness_data"):
+            # Native predictions generate their witness only now
+            latest = await self._ensure_witness(latest)
+        
+        cache_key = latest.get("cache_key")
+        entry = self.results.get(cache_key) if cache_key else None
+        
+        if entry and entry.get("proof_data") and entry.get("proof_type", "single") == settings.PROOF_TYPE:
+            # Already proven: reuse the stored proof (and its storage key, if uploaded)
+            proof_data = entry["proof_data"]
+            proof_calldata = calldata.from_hex(entry["calldata"]) if entry.get("calldata") else None
+            proof_upload = entry.get("proof_upload")
+            # The cost of the original run; nothing was proven this time
+            resources = {**entry["resources"], "reused": True} if entry.get("resources") else None
+        else:
+            async def prove() -> Dict[str, Any]:
+                result = await self.generate_proof(latest["witness_data"], latest["model_id"])
+                if cache_key:
+                    self.results.update(
+                        cache_key,
+                        proof_data=result["proof_data"],
+                        proof_type=result["proof_type"],
+                        calldata=calldata.to_hex(result["calldata"]) if result["calldata"] else None,
+                        resources=result["resources"]
+                    )
+                return result
+            
+            # Concurrent requests for the same proof share a single prover run
+            key = ("proof", cache_key) if cache_key else ("proof", id(latest))
+            proof_result = await self._inflight.do(key, prove)
+            proof_data = proof_result["proof_data"]
+            proof_calldata = proof_result["calldata"]
+            proof_upload = None
+            resources = proof_result["resources"]
+        
+        return {
+            "proof_data": proof_data,
+            "calldata": proof_calldata,
+            "model_id": latest["model_id"],
+            "predicted_digits": latest["predicted_digits"],
+            "input_vector": latest["input_vector"],
+            "native_predicted_digits": latest.get("native_predicted_digits"),
+            "cache_key": cache_key,
+            "proof_upload": proof_upload,
+            "resources": resources
+        }
+
+    def record_proof_upload(self, cache_key: str, upload: Dict[str, Any]):
+        """
+        Remember where a cached proof was stored, so identical requests can be
+        answered with the existing storage key instead of a new upload.
+        """
+        if cache_key:
+            self.results.update(cache_key, proof_upload=upload)
 
     async def verify_proof(self, proof_data: str, model_id: str) -> Dict[str, Any]:
         """
@@ -290,64 +760,163 @@ class EzklService:
         Args:
             proof_data: JSON string containing the proof
             model_id: Model identifier
-            
+        
         Returns:
             Dict containing verification result
         """
         try:
-            # Get temp paths
-            temp_paths = self._get_temp_paths()
-            
-            # Write proof data to file
-            with open(temp_paths["proof"], 'w') as f:
-                if isinstance(proof_data, bytes):
-                    f.write(proof_data.decode('utf-8'))
-                else:
-                    f.write(proof_data)
-            
-            # Download settings and verification key from Akave
-            settings_result = await self.akave.download_model_settings(model_id)
-            vk_result = await self.akave.download_verification_key(model_id)
-            
-            if "error" in settings_result or "error" in vk_result:
+            # Settings and verification key come from the model's local verifier context
+            try:
+                context = await self.verifiers.get(model_id)
+            except VerifierContextError:
                 return {
                     "verified": False,
                     "error": "Failed to download settings or verification key from Akave"
                 }
             
-            # Save settings and vk to temp files
-            settings_path = os.path.join(self.temp_dir, "settings.json")
-            vk_path = os.path.join(self.temp_dir, "test.vk")
-            
-            with open(settings_path, 'w') as f:
-                if isinstance(settings_result["data"], str):
-                    f.write(settings_result["data"])
-                else:
-                    json.dump(settings_result["data"], f)
-            
-            # Handle binary data for verification key
-            if isinstance(vk_result["data"], bytes):
-                with open(vk_path, 'wb') as f:
-                    f.write(vk_result["data"])
-            else:
-                with open(vk_path, 'w') as f:
-                    f.write(vk_result["data"])
-            
-            # Verify proof
-            res = ezkl.verify(temp_paths["proof"], settings_path, vk_path)
+            res, cached = await self._verify_with_context(proof_data, context)
             
             return {
                 "verified": True,
-                "proof_valid": bool(res),
-                "model_id": model_id
+                "proof_valid": res,
+                "model_id": model_id,
+                "cached": cached
             }
-            
+        
         except Exception as e:
             return {
                 "verified": False,
                 "error": f"Verification failed: {str(e)}"
             }
 
+    async def _verify_with_context(self, proof_data: Any, context: VerifierContext) -> Tuple[bool, bool]:
+        """
+        Verify a proof against a verifier context, consulting the verification cache first.
+        
+        ezkl.verify is deterministic for a given proof, vk and settings, so the
+        outcome is cached under their digests; a new vk or settings file
+        changes the key and so never reuses an old outcome.
+        
+        Returns:
+            (proof_valid, served_from_cache)
+        """
+        # Compact-format proofs are verified (and cached) as their JSON form
+        proof_data = proof_codec.to_json(proof_data)
+        key = verification_key(proof_data, context.digest)
+        entry = self.verifications.get(key)
+        metrics.CACHE_LOOKUPS.inc(
+            cache="verification", model_id=context.model_id, result="miss" if entry is None else "hit"
+        )
+        if entry is not None:
+            return entry["proof_valid"], True
+        
+        # Concurrent verifications of the same proof share one prover run
+        async def run() -> bool:
+            with self.workspaces.workspace("verify") as ws, metrics.track_stage("verify", context.model_id):
+                # Only the proof itself goes to the (tmpfs) workspace
+                res = await self.prover.run(
+                    prover_pool.verify,
+                    ws.write("proof", proof_data),
+                    context.settings_path,
+                    context.vk_path,
+                    timeout=settings.VERIFY_TIMEOUT_SECONDS,
+                )
+            self.verifications.update(key, model_id=context.model_id, proof_valid=bool(res))
+            return bool(res)
+        
+        return await self._inflight.do(("verify", key), run), False
+
+    async def iter_verify_batch(
+        self,
+        proofs: Union[Iterable[Tuple], AsyncIterable[Tuple]],
+        concurrency: int = settings.VERIFY_BATCH_CONCURRENCY
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Verify many stored proofs, yielding one result per proof as it finishes.
+        
+        Proofs are taken from `proofs` as they arrive (it may be an async
+        iterator over a bucket listing), so at most `concurrency` of them are
+        fetched or verified, and held in memory, at once. Each model's
+        verifier context is loaded once; proofs are fetched from Akave and
+        verified across the prover pool.
+        
+        Args:
+            proofs: (model_id, proof_id, key) of each proof, or
+                (model_id, proof_id, key, data) when the proof was already read
+                (e.g. from a segment)
+            concurrency: Maximum number of proofs being fetched or verified at once
+        
+        Yields:
+            {"index", "model_id", "proof_id", "key", "status", ...} where status is
+            "valid", "invalid" or "error"
+        """
+        contexts: Dict[str, "asyncio.Future"] = {}
+        
+        def context_for(model_id: str) -> "asyncio.Future":
+            if model_id not in contexts:
+                contexts[model_id] = asyncio.ensure_future(self.verifiers.get(model_id))
+            return contexts[model_id]
+        
+        async def verify_one(index: int, model_id: str, proof_id: str, key: str, data: Optional[bytes]) -> Dict[str, Any]:
+            result = {"index": index, "model_id": model_id, "proof_id": proof_id, "key": key}
+            try:
+                context = await asyncio.shield(context_for(model_id))
+            except VerifierContextError as e:
+                return {**result, "status": "error", "error": str(e)}
+            if data is None:
+                located = self.akave.locate_proof(model_id, proof_id) if self.akave.locate_proof is not None else None
+                if located:
+                    # Compacted: one ranged GET inside its segment
+                    fetched = await self.akave.download_proof(model_id, proof_id, decode=False)
+                else:
+                    fetched = await self.akave.download_if_changed(key)
+                if "error" in fetched:
+                    return {**result, "status": "error", "error": f"Proof not found: {fetched['error']}"}
+                data = fetched["data"]
+            try:
+                valid, cached = await self._verify_with_context(data, context)
+            except Exception as e:
+                return {**result, "status": "error", "error": f"Verification failed: {str(e)}"}
+            return {**result, "status": "valid" if valid else "invalid", "proof_valid": valid, "cached": cached}
+        
+        if not hasattr(proofs, "__aiter__"):
+            proofs = _as_async_iter(proofs)
+        
+        pending = set()
+        source_error = None
+        try:
+            index = 0
+            try:
+                async for model_id, proof_id, key, *data in proofs:
+                    if len(pending) >= max(1, concurrency):
+                        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                        for task in done:
+                            yield task.result()
+                    pending.add(asyncio.ensure_future(
+                        verify_one(index, model_id, proof_id, key, data[0] if data else None)
+                    ))
+                    index += 1
+            except Exception as e:
+                # The source failed part way (e.g. a listing error): finish
+                # the proofs already taken, then report it
+                source_error = e
+            
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+            if source_error is not None:
+                raise source_error
+        finally:
+            # The client went away: don't keep verifying for nobody
+            for task in pending:
+                task.cancel()
+            for future in contexts.values():
+                if not future.done():
+                    future.cancel()
+                elif not future.cancelled():
+                    future.exception()  # Retrieved, even if no proof awaited it
+
     async def predict_and_prove(self, input_vector: List[int], model_id: str) -> Dict[str, Any]:
         """
         Run inference and generate proof in one step.
@@ -355,7 +924,7 @@ class EzklService:
         Args:
             input_vector: List of 6 integers
             model_id: Model identifier
-            
+        
         Returns:
             Dict containing predictions, proof, and metadata
         """
@@ -363,8 +932,8 @@ class EzklService:
             # Step 1: Run prediction
             prediction_result = await self.predict(input_vector, model_id)
             
-            # Step 2: Generate proof for the latest prediction
-            proof_result = await self.generate_proof_for_latest_prediction()
+            # Step 2: Generate proof from this prediction's own witness
+            proof_result = await self.generate_proof(prediction_result["witness_data"], model_id)
             
             return {
                 "predicted_digits": prediction_result["predicted_digits"],
@@ -373,7 +942,7 @@ class EzklService:
                 "proof_data": proof_result["proof_data"],
                 "status": "completed"
             }
-            
+        
         except Exception as e:
             return {
                 "status": "failed",
@@ -381,58 +950,39 @@ class EzklService:
                 "model_id": model_id,
                 "input_vector": input_vector
             }
-    
+
     def cleanup_temp_files(self):
-        """Clean up temporary files to prevent disk space issues."""
-        temp_paths = self._get_temp_paths()
-        for file_path in temp_paths.values():
-            try:
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-            except Exception:
-                pass  # Silently ignore cleanup errors
-    
-    def encode_evm_calldata(self, proof_data: str) -> str:
+        """
+        Remove leaked job workspaces to prevent disk space issues.
+        Workspaces are normally removed when their job finishes and garbage
+        collected automatically, so this is only needed for a manual sweep.
+        """
+        try:
+            self.workspaces.gc(force=True)
+        except Exception:
+            pass  # Silently ignore cleanup errors
+
+    async def encode_evm_calldata(self, proof_data: str, model_id: str = "") -> bytes:
         """
         Encode proof data as EVM calldata for smart contract verification.
         
+        New proofs get their calldata when they are generated; this is for
+        proofs stored before that (see CalldataStore).
+        
         Args:
-            proof_data: JSON string containing the proof
-            
+            proof_data: JSON string (or compact proof) containing the proof
+            model_id: Model identifier, for metrics
+        
         Returns:
-            Hex-encoded calldata string with 0x prefix
+            Calldata bytes (format with app.utils.calldata.to_hex)
         """
         try:
-            # Get temp paths
-            temp_paths = self._get_temp_paths()
-            
-            # Write proof data to temporary file
-            proof_path = temp_paths["proof"]
-            with open(proof_path, 'w') as f:
-                if isinstance(proof_data, bytes):
-                    f.write(proof_data.decode('utf-8'))
-                else:
-                    f.write(proof_data)
-            
-            # Generate calldata using ezkl
-            calldata_path = os.path.join(self.temp_dir, "calldata.bin")
-            
-            # Generate EVM calldata
-            res = ezkl.encode_evm_calldata(
-                proof_path,
-                calldata_path,
-            )
-            
-            # Convert to hex string
-            if isinstance(res, bytes):
-                calldata_hex = "0x" + ''.join(f"{byte:02x}" for byte in res)
-            else:
-                # If ezkl.encode_evm_calldata returns the calldata directly
-                with open(calldata_path, 'rb') as f:
-                    calldata_bytes = f.read()
-                calldata_hex = "0x" + ''.join(f"{byte:02x}" for byte in calldata_bytes)
-            
-            return calldata_hex
-            
+            with self.workspaces.workspace("encode") as ws, metrics.track_stage("calldata", model_id):
+                return await self.prover.run(
+                    prover_pool.encode_calldata,
+                    ws.write("proof", proof_codec.to_json(proof_data)),
+                    ws["calldata"],
+                )
+        
         except Exception as e:
             raise Exception(f"EVM encoding failed: {str(e)}")
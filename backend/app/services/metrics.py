@@ -0,0 +1,63 @@
+from typing import Dict, Iterator, List, Tuple
+
+from app.services.shared import calldata_store, ezkl_service, proof_jobs
+from app.utils import metrics
+from app.utils.metrics import Family
+
+
+def _gauge(name: str, documentation: str, samples: List[Tuple[Dict[str, str], float]]) -> Family:
+    return name, "gauge", documentation, samples
+
+
+def _hit_ratios() -> List[Tuple[Dict[str, str], float]]:
+    """Local hit ratio per cache and model from the cache lookup counters."""
+    totals: Dict[Tuple[str, str], List[float]] = {}
+    for (cache, model_id, result), count in metrics.CACHE_LOOKUPS.values().items():
+        hits_and_total = totals.setdefault((cache, model_id), [0.0, 0.0])
+        if result == "hit":
+            hits_and_total[0] += count
+        hits_and_total[1] += count
+    return [
+        ({"cache": cache, "model_id": model_id}, hits / total)
+        for (cache, model_id), (hits, total) in totals.items() if total
+    ]
+
+
+def collect_service_metrics() -> Iterator[Family]:
+    """Scrape-time gauges read from the shared services' stats."""
+    pool = ezkl_service.prover.stats()
+    busy = min(pool["pending_jobs"], pool["workers"])
+    yield _gauge("prover_pool_workers", "Prover worker processes", [({}, pool["workers"])])
+    yield _gauge("prover_pool_pending_jobs", "Prover jobs queued or running", [({}, pool["pending_jobs"])])
+    yield _gauge("prover_pool_occupancy", "Fraction of prover workers busy", [({}, busy / pool["workers"])])
+
+    jobs = proof_jobs.stats()
+    yield _gauge("proof_job_queue_depth", "Proof jobs waiting for a job worker", [({}, jobs["queue_depth"])])
+    yield _gauge(
+        "proof_jobs_current", "Proof jobs in the job history by status",
+        [({"status": status}, count) for status, count in jobs["jobs"].items()],
+    )
+
+    workspaces = ezkl_service.workspaces.stats()
+    yield _gauge("workspace_usage_bytes", "Bytes used by job scratch workspaces", [({}, workspaces["usage_bytes"])])
+    yield _gauge("workspace_max_bytes", "Workspace usage limit (0 = unlimited)", [({}, workspaces["max_bytes"] or 0)])
+    yield _gauge("workspaces_active", "Job scratch workspaces in use", [({}, workspaces["active_workspaces"])])
+
+    artifacts = pool["artifact_cache"]
+    yield _gauge(
+        "cache_entries", "Entries held by each in-memory cache",
+        [
+            ({"cache": "result"}, ezkl_service.results.stats()["size"]),
+            ({"cache": "verification"}, ezkl_service.verifications.stats()["size"]),
+            ({"cache": "calldata"}, calldata_store.stats()["size"]),
+            ({"cache": "artifact"}, artifacts["resident_models"]),
+        ],
+    )
+    yield _gauge("prover_resident_artifact_bytes", "Model artifacts resident in prover workers",
+                 [({}, artifacts["resident_bytes"])])
+    lookups = artifacts["hits"] + artifacts["misses"]
+    yield _gauge(
+        "cache_hit_ratio", "Share of cache lookups served locally",
+        _hit_ratios() + ([({"cache": "artifact", "model_id": ""}, artifacts["hits"] / lookups)] if lookups else []),
+    )
+
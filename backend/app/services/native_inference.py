@@ -0,0 +1,165 @@
+import math
+import threading
+from typing import Any, Dict, Tuple
+
+import numpy as np
+import torch
+from torch import nn
+import torch.nn.functional as F
+
+from app.core.config import settings
+from app.services.artifact_cache import artifact_digest
+from app.utils.cache import LRUCache
+
+# The network definition mirrors snarks/train_model.py (LittleTransformer),
+# without the pytorch_lightning training wrapper, so the shipped state dicts
+# (artifacts/models/<id>/<id>.pt) can be loaded for a native forward pass.
+
+
+def _attention(queries, keys, values):
+    d = queries.shape[-1]
+    scores = torch.matmul(queries, keys.transpose(-2, -1)) / math.sqrt(d)
+    attention_weights = F.softmax(scores, dim=-1)
+    return torch.matmul(attention_weights, values)
+
+
+class _MultiHeadAttention(nn.Module):
+    def __init__(self, embed_dim: int, num_heads: int):
+        super().__init__()
+        self.embed_dim, self.num_heads = embed_dim, num_heads
+        self.projection_dim = embed_dim // num_heads
+        self.W_q = nn.Linear(embed_dim, embed_dim)
+        self.W_k = nn.Linear(embed_dim, embed_dim)
+        self.W_v = nn.Linear(embed_dim, embed_dim)
+        self.W_o = nn.Linear(embed_dim, embed_dim)
+
+    def transpose(self, x):
+        x = x.reshape(x.shape[0], x.shape[1], self.num_heads, self.projection_dim)
+        return x.permute(0, 2, 1, 3)
+
+    def transpose_output(self, x):
+        x = x.permute(0, 2, 1, 3)
+        return x.reshape(x.shape[0], x.shape[1], self.embed_dim)
+
+    def forward(self, q, k, v):
+        q = self.transpose(self.W_q(q))
+        k = self.transpose(self.W_k(k))
+        v = self.transpose(self.W_v(v))
+        output = _attention(q, k, v)
+        return self.W_o(self.transpose_output(output))
+
+
+class _TransformerBlock(nn.Module):
+    def __init__(self, embed_dim: int, num_heads: int, ff_dim: int):
+        super().__init__()
+        self.att = _MultiHeadAttention(embed_dim, num_heads)
+        self.ffn = nn.Sequential(
+            nn.Linear(embed_dim, ff_dim), nn.ReLU(), nn.Linear(ff_dim, embed_dim)
+        )
+        self.layernorm1 = nn.LayerNorm(embed_dim)
+        self.layernorm2 = nn.LayerNorm(embed_dim)
+        self.dropout = nn.Dropout(0.0)
+
+    def forward(self, x):
+        x = self.layernorm1(x + self.dropout(self.att(x, x, x)))
+        x = self.layernorm2(x + self.dropout(self.ffn(x)))
+        return x
+
+
+class _TokenAndPositionEmbedding(nn.Module):
+    def __init__(self, maxlen: int, vocab_size: int, embed_dim: int):
+        super().__init__()
+        self.token_emb = nn.Embedding(vocab_size, embed_dim)
+        self.pos_emb = nn.Embedding(maxlen, embed_dim)
+
+    def forward(self, x):
+        pos = torch.arange(0, x.size(1), dtype=torch.int32, device=x.device)
+        return self.token_emb(x) + self.pos_emb(pos).view(1, x.size(1), -1)
+
+
+class _LittleTransformer(nn.Module):
+    def __init__(self, seq_len: int, max_value: int, layer_count: int, embed_dim: int, num_heads: int, ff_dim: int):
+        super().__init__()
+        self.model = nn.Sequential(
+            _TokenAndPositionEmbedding(seq_len, max_value, embed_dim),
+            *[_TransformerBlock(embed_dim, num_heads, ff_dim) for _ in range(layer_count)],
+            nn.Linear(embed_dim, max_value),
+            nn.LogSoftmax(dim=-1))
+
+    def forward(self, x):
+        return self.model(x)
+
+
+def load_state_dict_model(pt_path: str, num_heads: int = settings.NATIVE_MODEL_NUM_HEADS) -> nn.Module:
+    """
+    Rebuild a LittleTransformer from a saved state dict.
+
+    Layer sizes are read from the weight shapes; the number of attention
+    heads is not recoverable from the weights and comes from configuration.
+    """
+    state = torch.load(pt_path, map_location="cpu", weights_only=True)
+
+    max_value, embed_dim = state["model.0.token_emb.weight"].shape
+    seq_len = state["model.0.pos_emb.weight"].shape[0]
+    layer_count = len({key.split(".")[1] for key in state if ".att." in key})
+    ff_dim = state["model.1.ffn.0.weight"].shape[0]
+
+    model = _LittleTransformer(seq_len, max_value, layer_count, embed_dim, num_heads, ff_dim)
+    model.load_state_dict(state)
+    model.eval()
+    return model
+
+
+class NativeInference:
+    """
+    Plain PyTorch forward pass for the shipped models.
+
+    Answers predictions without generating an ezkl witness. Loaded models are
+    cached per model_id and weights digest. Consistency counters track how
+    often the native answer matched the circuit's when both were computed.
+    """
+
+    def __init__(self, max_models: int = 8):
+        self._models = LRUCache(max_models)
+        self._lock = threading.Lock()
+        self.checks: Dict[str, Dict[str, int]] = {}
+
+    def _get_model(self, model_id: str, pt_path: str) -> nn.Module:
+        key: Tuple[str, str] = (model_id, artifact_digest(pt_path))
+        model = self._models.get(key)
+        if model is None:
+            with self._lock:
+                model = self._models.get(key)
+                if model is None:
+                    model = load_state_dict_model(pt_path)
+                    self._models.put(key, model)
+        return model
+
+    def predict(self, model_id: str, pt_path: str, vectors: np.ndarray) -> np.ndarray:
+        """
+        Predict digits for a batch of input vectors.
+
+        Args:
+            model_id: Model identifier
+            pt_path: Path to the model's state dict
+            vectors: (batch, 6) integer array
+
+        Returns:
+            (batch, 6) integer array of predicted digits
+        """
+        model = self._get_model(model_id, pt_path)
+        with torch.inference_mode():
+            x = torch.as_tensor(np.asarray(vectors), dtype=torch.long)
+            return model(x).argmax(dim=-1).numpy()
+
+    def record_check(self, model_id: str, matched: bool):
+        with self._lock:
+            counts = self.checks.setdefault(model_id, {"checked": 0, "mismatched": 0})
+            counts["checked"] += 1
+            if not matched:
+                counts["mismatched"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            checks = {model_id: dict(counts) for model_id, counts in self.checks.items()}
+        return {"loaded_models": len(self._models), "consistency_checks": checks}
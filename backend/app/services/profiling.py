@@ -0,0 +1,359 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import shutil
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+from starlette.routing import compile_path
+
+from app.core.config import settings
+from app.utils import metrics
+
+# Files written for each capture
+CAPTURE_FILES = ("summary.json", "profile.pstats", "profile.txt", "tracemalloc.snapshot", "tracemalloc.txt")
+
+
+class ProfilingError(Exception):
+    """Raised for invalid profiling requests (bad route, count out of range, unknown capture)."""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class Capture:
+    """Stage timings collected while one request or job is being profiled."""
+
+    def __init__(self, session: Dict[str, Any], target: Dict[str, Any]):
+        self.capture_id = str(uuid.uuid4())
+        self.session = session
+        self.target = target
+        self.started_at = _now()
+        self.start = time.perf_counter()
+        self.events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def record(self, service: str, stage: str, model_id: str, seconds: float):
+        with self._lock:
+            self.events.append({
+                "service": service,
+                "stage": stage,
+                "model_id": model_id,
+                "seconds": seconds,
+                "ended_at_offset": time.perf_counter() - self.start,
+            })
+
+    def breakdown(self) -> List[Dict[str, Any]]:
+        """Total wall time and call count per (service, stage), largest first."""
+        totals: Dict[tuple, Dict[str, Any]] = {}
+        for event in self.events:
+            entry = totals.setdefault((event["service"], event["stage"]), {
+                "service": event["service"], "stage": event["stage"], "calls": 0, "seconds": 0.0
+            })
+            entry["calls"] += 1
+            entry["seconds"] += event["seconds"]
+        return sorted(totals.values(), key=lambda entry: entry["seconds"], reverse=True)
+
+
+class Profiler:
+    """
+    On-demand profiling of live requests and proof jobs.
+
+    An admin arms a session for the next N requests matching a route (a
+    path or route template such as /api/v1/proofs/{model_id}/{proof_id}/verify,
+    optionally with a method) or for one proof job (a queued job by id, or
+    the next job). Each profiled request or job gets a cProfile dump, a
+    tracemalloc snapshot and a per-stage wall-clock breakdown of its
+    EzklService and AkaveService calls, written to a capture directory
+    under PROFILE_DIR.
+
+    cProfile and tracemalloc observe the whole event loop thread, so other
+    requests served concurrently show up in a capture too; the stage
+    breakdown only covers the profiled request. Work inside prover worker
+    processes appears as stage timings (mock, prove, ...), not in the
+    cProfile dump. One capture runs at a time; matching requests that
+    arrive meanwhile are served unprofiled and don't count.
+
+    While nothing is armed, the only cost is one attribute check per
+    request and per job.
+
+    Only the latest `max_sessions` finished sessions are kept, and capture
+    directories older than `capture_ttl_seconds` are removed whenever a
+    session is armed or a capture is written.
+    """
+
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        max_count: int = settings.PROFILE_MAX_REQUESTS,
+        max_sessions: int = settings.PROFILE_MAX_SESSIONS,
+        capture_ttl_seconds: float = settings.PROFILE_CAPTURE_TTL_SECONDS,
+    ):
+        self.root = root or settings.PROFILE_DIR or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "artifacts", "profiles"
+        )
+        self.max_count = max_count
+        self.max_sessions = max_sessions
+        self.capture_ttl_seconds = capture_ttl_seconds
+        self.armed = False
+
+        self.sessions: Dict[str, Dict[str, Any]] = {}
+        self._patterns: Dict[str, re.Pattern] = {}
+        self._lock = threading.Lock()
+        self._busy = False
+
+    # --- Arming --------------------------------------------------------------
+
+    def arm_route(self, route: str, count: int = 1, method: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Profile the next `count` requests to a route.
+
+        Raises:
+            ProfilingError: If the route or count is invalid
+        """
+        if not route or not route.startswith("/"):
+            raise ProfilingError("route must be a path starting with /")
+        if not 1 <= count <= self.max_count:
+            raise ProfilingError(f"count must be between 1 and {self.max_count}")
+        session = self._new_session({"kind": "route", "route": route, "method": method.upper() if method else None,
+                                     "remaining": count})
+        with self._lock:
+            # Route templates ({model_id}) and literal paths are matched the same way
+            self._patterns[session["session_id"]] = compile_path(route)[0]
+        return session
+
+    def arm_job(self, proof_id: Optional[str] = None) -> Dict[str, Any]:
+        """Profile one proof job: the queued job `proof_id`, or the next job to start."""
+        return self._new_session({"kind": "job", "proof_id": proof_id, "remaining": 1})
+
+    def _new_session(self, session: Dict[str, Any]) -> Dict[str, Any]:
+        session.update({"session_id": str(uuid.uuid4()), "armed_at": _now(), "captures": []})
+        with self._lock:
+            self.sessions[session["session_id"]] = session
+            self.armed = True
+            self._prune_sessions()
+        self._maybe_gc()
+        return session
+
+    def _prune_sessions(self):
+        # Sessions are kept in arming order; drop the oldest finished ones
+        finished = [session_id for session_id, session in self.sessions.items() if session["remaining"] == 0]
+        for session_id in finished[:max(0, len(finished) - self.max_sessions)]:
+            del self.sessions[session_id]
+
+    def disarm(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is not None:
+                session["remaining"] = 0
+                self._patterns.pop(session_id, None)
+                self._update_armed()
+                self._prune_sessions()
+        return session
+
+    def _update_armed(self):
+        self.armed = any(session["remaining"] > 0 for session in self.sessions.values())
+
+    def _claim(self, matches) -> Optional[Dict[str, Any]]:
+        """Take one use of the first armed session accepted by `matches`, if no capture is running."""
+        with self._lock:
+            if self._busy:
+                return None
+            for session in self.sessions.values():
+                if session["remaining"] > 0 and matches(session):
+                    session["remaining"] -= 1
+                    if session["remaining"] == 0:
+                        self._patterns.pop(session["session_id"], None)
+                    self._update_armed()
+                    self._busy = True
+                    return session
+        return None
+
+    def claim_request(self, method: str, path: str) -> Optional[Dict[str, Any]]:
+        def matches(session):
+            pattern = self._patterns.get(session["session_id"])
+            return (
+                session["kind"] == "route"
+                and pattern is not None and pattern.match(path) is not None
+                and session["method"] in (None, method)
+            )
+        return self._claim(matches)
+
+    def claim_job(self, proof_id: str) -> Optional[Dict[str, Any]]:
+        return self._claim(lambda session: session["kind"] == "job" and session["proof_id"] in (None, proof_id))
+
+    # --- Capturing -----------------------------------------------------------
+
+    @contextmanager
+    def capture(self, session: Dict[str, Any], target: Dict[str, Any]) -> Iterator[Capture]:
+        """Profile the block for a claimed session and write the capture when it ends."""
+        capture = Capture(session, target)
+        token = metrics.STAGE_RECORDER.set(capture.record)
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(settings.PROFILE_TRACEMALLOC_FRAMES)
+        profile = cProfile.Profile()
+        error = None
+        profile.enable()
+        try:
+            yield capture
+        except BaseException as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            profile.disable()
+            wall_seconds = time.perf_counter() - capture.start
+            snapshot = tracemalloc.take_snapshot()
+            if started_tracing:
+                tracemalloc.stop()
+            metrics.STAGE_RECORDER.reset(token)
+            try:
+                self._write(capture, profile, snapshot, wall_seconds, error)
+            finally:
+                with self._lock:
+                    self._busy = False
+                    self._prune_sessions()
+                self._maybe_gc()
+
+    def _write(self, capture: Capture, profile: cProfile.Profile, snapshot: tracemalloc.Snapshot,
+               wall_seconds: float, error: Optional[str]):
+        path = os.path.join(self.root, capture.capture_id)
+        os.makedirs(path, exist_ok=True)
+
+        profile.dump_stats(os.path.join(path, "profile.pstats"))
+        text = io.StringIO()
+        pstats.Stats(profile, stream=text).sort_stats("cumulative").print_stats(60)
+        with open(os.path.join(path, "profile.txt"), "w") as f:
+            f.write(text.getvalue())
+
+        snapshot.dump(os.path.join(path, "tracemalloc.snapshot"))
+        top = snapshot.statistics("lineno")
+        with open(os.path.join(path, "tracemalloc.txt"), "w") as f:
+            f.write(f"Traced memory: {sum(stat.size for stat in top)} bytes in {len(top)} lines\n")
+            for stat in top[:50]:
+                f.write(f"{stat}\n")
+
+        summary = {
+            "capture_id": capture.capture_id,
+            "session_id": capture.session["session_id"],
+            "target": capture.target,
+            "started_at": capture.started_at,
+            "wall_seconds": wall_seconds,
+            "error": error,
+            "stages": capture.breakdown(),
+            "events": capture.events,
+            "files": list(CAPTURE_FILES),
+        }
+        with open(os.path.join(path, "summary.json"), "w") as f:
+            json.dump(summary, f, indent=2)
+
+        with self._lock:
+            capture.session["captures"].append(capture.capture_id)
+
+    def gc(self, max_age: Optional[float] = None) -> int:
+        """
+        Remove capture directories older than `max_age` (defaults to the TTL).
+
+        Returns:
+            Number of captures removed
+        """
+        max_age = self.capture_ttl_seconds if max_age is None else max_age
+        now = time.time()
+        removed = 0
+
+        try:
+            entries = list(os.scandir(self.root))
+        except FileNotFoundError:
+            return 0
+
+        for entry in entries:
+            if not entry.is_dir(follow_symlinks=False):
+                continue
+            try:
+                age = now - entry.stat(follow_symlinks=False).st_mtime
+            except OSError:
+                continue
+            if age >= max_age:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+
+        return removed
+
+    def _maybe_gc(self):
+        try:
+            self.gc()
+        except Exception:
+            pass  # GC is best effort and must never fail a request or job
+
+    # --- Retrieval -----------------------------------------------------------
+
+    def capture_path(self, capture_id: str, name: str = "summary.json") -> str:
+        """
+        Path of a capture file.
+
+        Raises:
+            ProfilingError: If the capture or file doesn't exist
+        """
+        try:
+            uuid.UUID(capture_id)
+        except ValueError:
+            raise ProfilingError(f"Capture not found: {capture_id}")
+        if name not in CAPTURE_FILES:
+            raise ProfilingError(f"Unknown capture file: {name}")
+        path = os.path.join(self.root, capture_id, name)
+        if not os.path.isfile(path):
+            raise ProfilingError(f"Capture not found: {capture_id}")
+        return path
+
+    def summary(self, capture_id: str) -> Dict[str, Any]:
+        with open(self.capture_path(capture_id)) as f:
+            return json.load(f)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sessions = [dict(session) for session in self.sessions.values()]
+        return {
+            "armed": self.armed,
+            "capturing": self._busy,
+            "root": self.root,
+            "max_sessions": self.max_sessions,
+            "capture_ttl_seconds": self.capture_ttl_seconds,
+            "sessions": sessions,
+        }
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles requests claimed by an armed session."""
+
+    def __init__(self, app, profiler: Profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if not self.profiler.armed or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        session = self.profiler.claim_request(scope["method"], scope["path"])
+        if session is None:
+            await self.app(scope, receive, send)
+            return
+
+        target = {"kind": "request", "method": scope["method"], "path": scope["path"], "status": None}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                target["status"] = message["status"]
+            await send(message)
+
+        with self.profiler.capture(session, target):
+            await self.app(scope, receive, send_wrapper)
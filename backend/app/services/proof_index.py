@@ -0,0 +1,550 @@
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+# Columns that can be written through `upsert`
+COLUMNS = (
+    "proof_id",
+    "model_id",
+    "key",
+    "input_hash",
+    "input_vector",
+    "predicted_digits",
+    "size",
+    "etag",
+    "checksum_sha256",
+    "checksum_crc32",
+    "created_at",
+    "verification_status",
+    "verified_at",
+    "storage_format",
+    "metadata",
+    "segment_key",
+    "segment_offset",
+    "segment_length",
+)
+
+# Columns holding JSON documents
+JSON_COLUMNS = ("input_vector", "predicted_digits", "metadata")
+
+# Columns added after the first release, with their types, for in-place upgrades
+ADDED_COLUMNS = {
+    "storage_format": "TEXT",
+    "metadata": "TEXT",
+    "segment_key": "TEXT",
+    "segment_offset": "INTEGER",
+    "segment_length": "INTEGER",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS proofs (
+    proof_id TEXT PRIMARY KEY,
+    model_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    input_hash TEXT,
+    input_vector TEXT,
+    predicted_digits TEXT,
+    size INTEGER,
+    etag TEXT,
+    checksum_sha256 TEXT,
+    checksum_crc32 TEXT,
+    created_at TEXT NOT NULL,
+    verification_status TEXT,
+    verified_at TEXT,
+    storage_format TEXT,
+    metadata TEXT,
+    segment_key TEXT,
+    segment_offset INTEGER,
+    segment_length INTEGER
+);
+CREATE INDEX IF NOT EXISTS proofs_by_created ON proofs (created_at DESC, proof_id DESC);
+CREATE INDEX IF NOT EXISTS proofs_by_model ON proofs (model_id, created_at DESC, proof_id DESC);
+CREATE INDEX IF NOT EXISTS proofs_by_input ON proofs (input_hash);
+CREATE INDEX IF NOT EXISTS proofs_by_key ON proofs (key);
+CREATE TABLE IF NOT EXISTS aggregates (
+    aggregate_id TEXT PRIMARY KEY,
+    model_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    calldata_key TEXT,
+    proof_count INTEGER NOT NULL,
+    logrows INTEGER,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS aggregate_proofs (
+    aggregate_id TEXT NOT NULL,
+    proof_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (aggregate_id, position)
+);
+CREATE INDEX IF NOT EXISTS aggregate_proofs_by_proof ON aggregate_proofs (proof_id);
+"""
+
+
+# Segment objects written by the compaction job (see app.services.segments)
+SEGMENT_PREFIX = "segments/"
+SEGMENT_INDEX_SUFFIX = ".idx.json"
+
+# Aggregate proof records written by app.services.aggregation
+AGGREGATE_PREFIX = "aggregates/"
+AGGREGATE_RECORD_SUFFIX = ".meta.json"
+
+# Minimum delay before a failed backfill is started again
+BACKFILL_RETRY_SECONDS = 30.0
+
+
+def parse_proof_key(key: str) -> Optional[Tuple[str, str]]:
+    """Split "proofs/{model_id}/{proof_id}.json" into (model_id, proof_id)."""
+    parts = key.split("/") if isinstance(key, str) else []
+    if len(parts) != 3 or parts[0] != "proofs" or not parts[2].endswith(".json"):
+        return None
+    return parts[1], parts[2][:-len(".json")]
+
+
+def input_hash(input_vector: List[int]) -> str:
+    """sha256 of the canonical JSON form of an input vector."""
+    canonical = json.dumps([int(x) for x in input_vector], separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _parse_time(value: str) -> datetime:
+    # fromisoformat only accepts a "Z" suffix from Python 3.11 on
+    return datetime.fromisoformat(value[:-1] + "+00:00" if value.endswith("Z") else value)
+
+
+def _timestamp(value: Any) -> Optional[str]:
+    """Normalize datetimes (e.g. S3 LastModified) and ISO 8601 strings to ISO 8601 UTC strings."""
+    if isinstance(value, str):
+        try:
+            value = _parse_time(value)
+        except ValueError:
+            return value
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc).isoformat()
+    return value
+
+
+def _time_bound(value: Optional[str], name: str) -> Optional[str]:
+    """
+    A created_at filter bound, normalized like the stored values so they
+    compare as strings (a bound without a timezone is taken as UTC).
+
+    Raises:
+        ValueError: If the bound isn't an ISO 8601 timestamp
+    """
+    if value is None:
+        return None
+    try:
+        return _timestamp(_parse_time(value))
+    except ValueError:
+        raise ValueError(f"Invalid {name}: expected an ISO 8601 timestamp")
+
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    raw = json.dumps([row["created_at"], row["proof_id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        created_at, proof_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(created_at), str(proof_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+class ProofIndex:
+    """
+    Embedded SQLite index of stored proofs.
+
+    Rows are written when a proof is uploaded and backfilled from a paginated
+    scan of the bucket, so listing, filtering and lookups by proof_id are
+    served from B-tree indexes instead of list_objects_v2 calls. Listing uses
+    keyset pagination on (created_at, proof_id), newest first.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.PROOF_INDEX_PATH or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            "artifacts", "index", "proofs.sqlite3"
+        )
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            existing = {row["name"] for row in self._conn.execute("PRAGMA table_info(proofs)")}
+            for column, column_type in ADDED_COLUMNS.items():
+                if column not in existing:
+                    self._conn.execute(f"ALTER TABLE proofs ADD COLUMN {column} {column_type}")
+
+        self._backfill: Optional[asyncio.Task] = None
+        self.last_backfill: Optional[Dict[str, Any]] = None
+        # Progress of the running backfill: objects scanned so far and the current phase
+        self.backfill_progress: Dict[str, Any] = {"phase": None, "scanned": 0}
+        self._backfill_ended = 0.0
+
+    # --- Writes --------------------------------------------------------------
+
+    def upsert(self, record: Dict[str, Any]):
+        self.upsert_many([record])
+
+    def upsert_many(self, records: List[Dict[str, Any]]):
+        """
+        Insert or merge proof records.
+
+        Fields that are missing or None never overwrite known values, and an
+        existing created_at is kept, so a bucket scan can't clobber the
+        richer metadata recorded at upload time.
+        """
+        rows = []
+        for record in records:
+            row = {column: record.get(column) for column in COLUMNS}
+            for column in JSON_COLUMNS:
+                if row[column] is not None and not isinstance(row[column], str):
+                    row[column] = json.dumps(row[column])
+            if row["input_hash"] is None and record.get("input_vector") is not None:
+                row["input_hash"] = input_hash(record["input_vector"])
+            row["created_at"] = _timestamp(row["created_at"]) or _timestamp(datetime.now(timezone.utc))
+            rows.append(row)
+
+        columns = ", ".join(COLUMNS)
+        values = ", ".join(f":{column}" for column in COLUMNS)
+        updates = ", ".join(
+            f"{column} = COALESCE(excluded.{column}, proofs.{column})"
+            for column in COLUMNS if column not in ("proof_id", "created_at")
+        )
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT INTO proofs ({columns}) VALUES ({values}) "
+                f"ON CONFLICT(proof_id) DO UPDATE SET {updates}",
+                rows,
+            )
+
+    def set_verification(self, proof_id: str, status: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE proofs SET verification_status = ?, verified_at = ? WHERE proof_id = ?",
+                (status, _timestamp(datetime.now(timezone.utc)), proof_id),
+            )
+
+    # --- Reads ---------------------------------------------------------------
+
+    @staticmethod
+    def _row(row: sqlite3.Row) -> Dict[str, Any]:
+        record = dict(row)
+        for column in JSON_COLUMNS:
+            if record[column] is not None:
+                record[column] = json.loads(record[column])
+        return record
+
+    def get(self, proof_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM proofs WHERE proof_id = ?", (proof_id,)).fetchone()
+        return self._row(row) if row is not None else None
+
+    def list(
+        self,
+        model_id: Optional[str] = None,
+        verification_status: Optional[str] = None,
+        input_hash: Optional[str] = None,
+        created_after: Optional[str] = None,
+        created_before: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        List proofs newest first.
+
+        Returns:
+            (records, next_cursor); next_cursor is None on the last page
+
+        Raises:
+            ValueError: If the cursor or a created_at bound is malformed
+        """
+        created_after = _time_bound(created_after, "created_after")
+        created_before = _time_bound(created_before, "created_before")
+        clauses, params = [], []
+        for column, value in (
+            ("model_id", model_id),
+            ("verification_status", verification_status),
+            ("input_hash", input_hash),
+        ):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if created_after is not None:
+            clauses.append("created_at > ?")
+            params.append(created_after)
+        if created_before is not None:
+            clauses.append("created_at < ?")
+            params.append(created_before)
+        if cursor is not None:
+            clauses.append("(created_at, proof_id) < (?, ?)")
+            params.extend(decode_cursor(cursor))
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        # Fetch one extra row to know whether there is a next page
+        query = f"SELECT * FROM proofs {where} ORDER BY created_at DESC, proof_id DESC LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(query, (*params, limit + 1)).fetchall()
+
+        records = [self._row(row) for row in rows[:limit]]
+        next_cursor = encode_cursor(records[-1]) if len(rows) > limit and records else None
+        return records, next_cursor
+
+    def locate(self, model_id: str, proof_id: str) -> Optional[Dict[str, Any]]:
+        """Where a compacted proof lives inside a segment, or None if it is a standalone object."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM proofs WHERE proof_id = ? AND segment_key IS NOT NULL", (proof_id,)
+            ).fetchone()
+        if row is None or row["model_id"] != model_id:
+            return None
+        return self._row(row)
+
+    def ingest_segment(self, sidecar: Dict[str, Any]):
+        """Record the proof locations listed in a segment's sidecar index."""
+        self.upsert_many([
+            {
+                "proof_id": entry["proof_id"],
+                "model_id": sidecar["model_id"],
+                "key": f"proofs/{sidecar['model_id']}/{entry['proof_id']}.json",
+                "size": entry["length"],
+                "etag": entry.get("etag"),
+                "checksum_sha256": entry.get("checksum_sha256"),
+                "created_at": entry.get("created_at"),
+                "storage_format": entry.get("format"),
+                "metadata": entry.get("metadata"),
+                "segment_key": sidecar["segment_key"],
+                "segment_offset": entry["offset"],
+                "segment_length": entry["length"],
+            }
+            for entry in sidecar["entries"]
+        ])
+
+    def record_aggregate(self, record: Dict[str, Any]):
+        """Record an aggregate proof and the proof_ids it covers, in order."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO aggregates "
+                "(aggregate_id, model_id, key, calldata_key, proof_count, logrows, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    record["aggregate_id"], record["model_id"], record["key"], record.get("calldata_key"),
+                    len(record["proof_ids"]), record.get("logrows"),
+                    _timestamp(record.get("created_at")) or _timestamp(datetime.now(timezone.utc)),
+                ),
+            )
+            self._conn.execute("DELETE FROM aggregate_proofs WHERE aggregate_id = ?", (record["aggregate_id"],))
+            self._conn.executemany(
+                "INSERT INTO aggregate_proofs (aggregate_id, proof_id, position) VALUES (?, ?, ?)",
+                [(record["aggregate_id"], proof_id, i) for i, proof_id in enumerate(record["proof_ids"])],
+            )
+
+    def get_aggregate(self, aggregate_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM aggregates WHERE aggregate_id = ?", (aggregate_id,)).fetchone()
+            if row is None:
+                return None
+            proof_ids = [r["proof_id"] for r in self._conn.execute(
+                "SELECT proof_id FROM aggregate_proofs WHERE aggregate_id = ? ORDER BY position", (aggregate_id,)
+            )]
+        return {**dict(row), "proof_ids": proof_ids}
+
+    def aggregates_for(self, proof_id: str) -> List[str]:
+        """aggregate_ids of the aggregates covering a proof."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT aggregate_id FROM aggregate_proofs WHERE proof_id = ?", (proof_id,)
+            ).fetchall()
+        return [row["aggregate_id"] for row in rows]
+
+    def cost_report(
+        self,
+        model_id: Optional[str] = None,
+        created_after: Optional[str] = None,
+        created_before: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Per-model totals and averages of the resource usage recorded with proofs.
+
+        Proofs without recorded usage (uploaded before it was recorded, or
+        indexed only from a bucket listing) are counted as "unaccounted", and
+        proofs served from the result cache as "reused".
+
+        Raises:
+            ValueError: If a created_at bound is malformed
+        """
+        created_after = _time_bound(created_after, "created_after")
+        created_before = _time_bound(created_before, "created_before")
+        clauses, params = [], []
+        for clause, value in (
+            ("model_id = ?", model_id),
+            ("created_at > ?", created_after),
+            ("created_at < ?", created_before),
+        ):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        def field(path: str) -> str:
+            return f"json_extract(r, '$.{path}')"
+
+        # Reused proofs carry an earlier run's usage; count each run once
+        accounted = "r IS NOT NULL AND json_extract(r, '$.reused') IS NULL"
+        cpu = f"({field('cpu_user_seconds')} + {field('cpu_system_seconds')})"
+        query = f"""
+            SELECT
+                model_id,
+                COUNT(*) AS proofs,
+                SUM(CASE WHEN r IS NULL THEN 1 ELSE 0 END) AS unaccounted,
+                SUM(CASE WHEN r IS NOT NULL AND NOT ({accounted}) THEN 1 ELSE 0 END) AS reused,
+                SUM(CASE WHEN {accounted} THEN {cpu} END) AS cpu_seconds_total,
+                AVG(CASE WHEN {accounted} THEN {cpu} END) AS cpu_seconds_mean,
+                MAX(CASE WHEN {accounted} THEN {cpu} END) AS cpu_seconds_max,
+                SUM(CASE WHEN {accounted} THEN {field('wall_seconds')} END) AS wall_seconds_total,
+                AVG(CASE WHEN {accounted} THEN {field('stage_seconds.prove')} END) AS prove_seconds_mean,
+                MAX(CASE WHEN {accounted} THEN {field('stage_seconds.prove')} END) AS prove_seconds_max,
+                AVG(CASE WHEN {accounted} THEN {field('stage_seconds.queued')} END) AS queued_seconds_mean,
+                AVG(CASE WHEN {accounted} THEN {field('peak_rss_bytes')} END) AS peak_rss_bytes_mean,
+                MAX(CASE WHEN {accounted} THEN {field('peak_rss_bytes')} END) AS peak_rss_bytes_max,
+                MAX(CASE WHEN {accounted} THEN {field('temp_disk_bytes')} END) AS temp_disk_bytes_max,
+                AVG(CASE WHEN {accounted} THEN {field('proof_size_bytes')} END) AS proof_size_bytes_mean,
+                MAX(CASE WHEN {accounted} THEN {field('logrows')} END) AS logrows
+            FROM (SELECT model_id, json_extract(metadata, '$.resources') AS r FROM proofs {where})
+            GROUP BY model_id
+            ORDER BY cpu_seconds_total DESC
+        """
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM proofs").fetchone()[0]
+
+    # --- Backfill ------------------------------------------------------------
+
+    async def backfill(self, akave, prefix: str = "proofs/", batch_size: int = 500) -> Dict[str, Any]:
+        """Index every proof object in the bucket, one listing page at a time."""
+        start = time.perf_counter()
+        scanned = 0
+        batch: List[Dict[str, Any]] = []
+        progress = self.backfill_progress = {"phase": "proofs", "scanned": 0}
+
+        async for obj in akave.iter_objects(prefix):
+            parsed = parse_proof_key(obj["Key"])
+            if parsed is None:
+                continue
+            scanned += 1
+            progress["scanned"] = scanned
+            batch.append({
+                "proof_id": parsed[1],
+                "model_id": parsed[0],
+                "key": obj["Key"],
+                "size": obj.get("Size"),
+                "etag": obj.get("ETag"),
+                "checksum_sha256": obj.get("ChecksumSHA256"),
+                "checksum_crc32": obj.get("ChecksumCRC32"),
+                "created_at": obj.get("LastModified"),
+            })
+            if len(batch) >= batch_size:
+                self.upsert_many(batch)
+                batch = []
+
+        if batch:
+            self.upsert_many(batch)
+
+        # Compacted proofs are only listed in their segments' sidecar indexes
+        progress["phase"] = "segments"
+        segments = 0
+        async for obj in akave.iter_objects(SEGMENT_PREFIX):
+            if not obj["Key"].endswith(SEGMENT_INDEX_SUFFIX):
+                continue
+            result = await akave.download_json(obj["Key"])
+            if "error" in result:
+                continue
+            self.ingest_segment(result["data"])
+            segments += 1
+            scanned += len(result["data"]["entries"])
+            progress["scanned"] = scanned
+
+        # Aggregates and the proofs they cover (see app.services.aggregation)
+        progress["phase"] = "aggregates"
+        aggregates = 0
+        async for obj in akave.iter_objects(AGGREGATE_PREFIX):
+            if not obj["Key"].endswith(AGGREGATE_RECORD_SUFFIX):
+                continue
+            result = await akave.download_json(obj["Key"])
+            if "error" in result:
+                continue
+            self.record_aggregate(result["data"])
+            aggregates += 1
+
+        self.last_backfill = {
+            "scanned": scanned,
+            "segments": segments,
+            "aggregates": aggregates,
+            "elapsed_seconds": time.perf_counter() - start,
+            "finished_at": _timestamp(datetime.now(timezone.utc)),
+        }
+        progress["phase"] = None
+        return self.last_backfill
+
+    def start_backfill(self, akave) -> asyncio.Task:
+        """
+        Start the bucket backfill once in the background and return its task.
+        A failed backfill is retried, at most once per BACKFILL_RETRY_SECONDS.
+        """
+        if self._backfill is None or (
+            self.backfill_state() == "failed"
+            and time.monotonic() - self._backfill_ended >= BACKFILL_RETRY_SECONDS
+        ):
+            self._backfill = asyncio.create_task(self.backfill(akave))
+            self._backfill.add_done_callback(self._backfill_done)
+        return self._backfill
+
+    def _backfill_done(self, task: asyncio.Task):
+        self._backfill_ended = time.monotonic()
+
+    def backfill_state(self) -> str:
+        """"pending" (not started), "running", "complete" or "failed"."""
+        if self._backfill is None:
+            return "pending"
+        if not self._backfill.done():
+            return "running"
+        if self._backfill.cancelled() or self._backfill.exception() is not None:
+            return "failed"
+        return "complete"
+
+    def stats(self) -> Dict[str, Any]:
+        state = self.backfill_state()
+        error = None
+        if state == "failed" and not self._backfill.cancelled():
+            error = str(self._backfill.exception())
+        return {
+            "path": self.path,
+            "proofs": self.count(),
+            "backfill_state": state,
+            "backfill_running": state == "running",
+            "backfill_progress": self.backfill_progress if state == "running" else None,
+            "backfill_error": error,
+            "last_backfill": self.last_backfill,
+        }
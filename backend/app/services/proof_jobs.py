@@ -0,0 +1,252 @@
+import asyncio
+import hashlib
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.utils import metrics
+from app.utils.resources import to_metadata as resource_metadata
+
+# Job lifecycle
+QUEUED = "queued"
+RUNNING = "running"
+UPLOADED = "uploaded"
+FAILED = "failed"
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class ProofJobManager:
+    """
+    Runs proof requests as background jobs.
+
+    `submit` returns immediately with a job record whose id is the proof_id;
+    worker tasks prove the snapshotted prediction and upload the result to
+    Akave, updating the record's status and stage timings as they go. A job
+    whose proof was already uploaded for an identical request resolves to
+    that proof, so its proof_id then differs from its job_id.
+    Finished jobs are kept in a bounded history for status lookups.
+    """
+
+    def __init__(
+        self,
+        ezkl_service,
+        akave_service,
+        proof_index=None,
+        calldata_store=None,
+        profiler=None,
+        workers: int = settings.PROOF_JOB_WORKERS,
+        history: int = settings.PROOF_JOB_HISTORY,
+    ):
+        self.ezkl = ezkl_service
+        self.akave = akave_service
+        self.index = proof_index
+        self.calldata = calldata_store
+        self.profiler = profiler
+        self.workers = max(1, workers)
+        self.history = history
+
+        self.jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._events: Dict[str, asyncio.Event] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def _ensure_started(self):
+        """Start the worker tasks on first use, inside the running event loop."""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"proof-job-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    def submit(self, prediction: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Queue a proof for a prediction snapshot.
+
+        Args:
+            prediction: Snapshot from `EzklService.snapshot_latest_prediction`
+
+        Returns:
+            The new job record
+        """
+        self._ensure_started()
+
+        proof_id = str(uuid.uuid4())
+        model_id = prediction["model_id"]
+        job = {
+            "job_id": proof_id,
+            "proof_id": proof_id,
+            "model_id": model_id,
+            "status": QUEUED,
+            "key": f"proofs/{model_id}/{proof_id}.json",
+            "predicted_digits": prediction.get("predicted_digits"),
+            "input_vector": prediction.get("input_vector"),
+            "created_at": _now(),
+            "started_at": None,
+            "finished_at": None,
+            "stage_timings": {},
+            "error": None,
+        }
+
+        self.jobs[proof_id] = job
+        self._events[proof_id] = asyncio.Event()
+        self._trim_history()
+        self._queue.put_nowait((job, prediction, time.perf_counter()))
+        return job
+
+    def get(self, proof_id: str) -> Optional[Dict[str, Any]]:
+        return self.jobs.get(proof_id)
+
+    async def wait(self, proof_id: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Wait until a job is uploaded or failed and return its record."""
+        # Hold on to the record: history trimming may evict it while we wait
+        job = self.jobs[proof_id]
+        event = self._events.get(proof_id)
+        if event is not None:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+        return job
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def stats(self) -> Dict[str, Any]:
+        counts = {QUEUED: 0, RUNNING: 0, UPLOADED: 0, FAILED: 0}
+        for job in self.jobs.values():
+            counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return {"workers": self.workers, "queue_depth": self.queue_depth(), "jobs": counts}
+
+    def _trim_history(self):
+        # Only forget finished jobs; queued and running ones must stay visible
+        while len(self.jobs) > self.history:
+            oldest_id, oldest = next(iter(self.jobs.items()))
+            if oldest["status"] not in (UPLOADED, FAILED):
+                break
+            self.jobs.pop(oldest_id)
+            self._events.pop(oldest_id, None)
+
+    async def _worker(self):
+        while True:
+            job, prediction, queued_at = await self._queue.get()
+            try:
+                job["stage_timings"]["queued"] = time.perf_counter() - queued_at
+                session = None
+                if self.profiler is not None and self.profiler.armed:
+                    session = self.profiler.claim_job(job["job_id"])
+                if session is None:
+                    await self._run(job, prediction)
+                else:
+                    target = {"kind": "job", "proof_id": job["job_id"], "model_id": job["model_id"]}
+                    with self.profiler.capture(session, target) as capture:
+                        job["profile_capture_id"] = capture.capture_id
+                        await self._run(job, prediction)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                job["status"] = FAILED
+                job["error"] = str(e)
+            finally:
+                if job["finished_at"] is None and job["status"] in (UPLOADED, FAILED):
+                    job["finished_at"] = _now()
+                    metrics.PROOF_JOBS.inc(model_id=job["model_id"], status=job["status"])
+                    for stage, seconds in job["stage_timings"].items():
+                        metrics.PROOF_JOB_STAGE_SECONDS.observe(seconds, stage=stage, model_id=job["model_id"])
+                event = self._events.get(job["job_id"])
+                if event is not None:
+                    event.set()
+                self._queue.task_done()
+
+    async def _run(self, job: Dict[str, Any], prediction: Dict[str, Any]):
+        job["status"] = RUNNING
+        job["started_at"] = _now()
+
+        # Stage 1: prove (served from the result cache for repeated inputs)
+        start = time.perf_counter()
+        proof_result = await self.ezkl.generate_proof_for_prediction(prediction)
+        job["stage_timings"]["prove"] = time.perf_counter() - start
+
+        proof_data = proof_result["proof_data"]
+        resources = proof_result.get("resources")
+        if resources is not None:
+            resources = {
+                **resources,
+                "stage_seconds": {**resources.get("stage_seconds", {}), "queued": job["stage_timings"]["queued"]},
+            }
+        job["resources"] = resources
+        job["proof_hash"] = "0x" + hashlib.sha256(
+            proof_data.encode() if isinstance(proof_data, str) else proof_data
+        ).hexdigest()
+
+        # An identical request was already uploaded: the job resolves to that
+        # proof (its id, key and index row); the job id stays a lookup alias
+        existing_upload = proof_result.get("proof_upload")
+        if existing_upload and settings.RESULT_CACHE_REUSE_PROOF_KEY:
+            job.update(existing_upload)
+            job["status"] = UPLOADED
+            return
+
+        # Stage 2: upload to Akave, with the calldata encoded at proof time
+        start = time.perf_counter()
+        # The resource usage travels with the object (and into segments on compaction)
+        metadata = resource_metadata(resources) if resources else None
+        uploads = [self.akave.upload_proof(
+            model_id=job["model_id"],
+            proof_id=job["proof_id"],
+            proof_data=proof_data,
+            metadata=metadata
+        )]
+        if self.calldata is not None and proof_result.get("calldata"):
+            uploads.append(self.calldata.put(job["model_id"], job["proof_id"], proof_result["calldata"]))
+        upload_result, *calldata_upload = await asyncio.gather(*uploads)
+        job["stage_timings"]["upload"] = time.perf_counter() - start
+        # A failed calldata upload is not fatal: it is re-encoded on first request
+        job["calldata_stored"] = bool(calldata_upload) and "error" not in calldata_upload[0]
+
+        if "error" in upload_result:
+            raise Exception(f"Failed to upload proof: {upload_result['error']}")
+
+        proof_info = {
+            "proof_id": job["proof_id"],
+            "model_id": job["model_id"],
+            "key": upload_result.get("key"),
+            "etag": upload_result.get("etag"),
+            "checksum_sha256": upload_result.get("checksum_sha256"),
+            "checksum_crc32": upload_result.get("checksum_crc32"),
+            "checksum_type": upload_result.get("checksum_type"),
+            "bucket": upload_result.get("bucket")
+        }
+        self.ezkl.record_proof_upload(proof_result.get("cache_key"), proof_info)
+
+        job.update(proof_info)
+        job["status"] = UPLOADED
+        self._index(job, upload_result.get("stored_size"), metadata)
+
+    def _index(self, job: Dict[str, Any], size: Optional[int], metadata: Optional[Dict[str, str]] = None):
+        """Record an uploaded proof in the local proof index."""
+        if self.index is None:
+            return
+        self.index.upsert({
+            "proof_id": job["proof_id"],
+            "model_id": job["model_id"],
+            "key": job["key"],
+            "input_vector": job.get("input_vector"),
+            "predicted_digits": job.get("predicted_digits"),
+            "size": size,
+            "etag": job.get("etag"),
+            "checksum_sha256": job.get("checksum_sha256"),
+            "checksum_crc32": job.get("checksum_crc32"),
+            "created_at": job["created_at"],
+            "metadata": metadata,
+        })
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
@@ -0,0 +1,328 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from app.core.config import settings
+from app.services.artifact_cache import ResidentArtifactCache
+from app.utils import calldata
+from app.utils.resources import ResourceMeter
+
+# Environment variables that size the native thread pools used by ezkl (rayon)
+# and torch/BLAS. They must be set before those libraries are imported, which
+# is why workers are started with the "spawn" method.
+THREAD_ENV_VARS = (
+    "RAYON_NUM_THREADS",
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+)
+
+
+class ProverTimeoutError(Exception):
+    """Raised when a prover job exceeds its timeout."""
+
+
+# Per-worker artifact residency, created lazily inside each worker process
+_resident: Optional[ResidentArtifactCache] = None
+
+
+def _init_worker(threads: int):
+    """Pin the per-worker thread budget before ezkl is imported."""
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+
+
+def _resident_artifacts() -> ResidentArtifactCache:
+    global _resident
+    if _resident is None:
+        _resident = ResidentArtifactCache()
+    return _resident
+
+
+def _worker_info() -> Dict[str, Any]:
+    return {"pid": os.getpid(), "artifact_cache": _resident_artifacts().stats()}
+
+
+# --- Worker-side jobs --------------------------------------------------------
+# These run inside the prover processes, so they must be module-level
+# functions that only take picklable arguments (file paths and strings).
+
+def mock_and_prove(
+    model_id: str,
+    witness_path: str,
+    compiled_path: str,
+    pk_path: str,
+    proof_path: str,
+    proof_type: str = "single",
+    calldata_path: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Run the mock check and generate a proof for a witness file, then encode
+    its EVM calldata when `calldata_path` is given. Returns the wall time
+    of each stage under "timings" and the job's CPU time and peak memory
+    under "resources".
+    """
+    import ezkl
+
+    timings = {}
+    with ResourceMeter() as meter:
+        # Keep the circuit and proving key of hot models resident in this worker
+        _resident_artifacts().acquire(model_id, {"compiled": compiled_path, "pk": pk_path})
+
+        # Run mock verification first
+        start = time.perf_counter()
+        res = ezkl.mock(witness_path, compiled_path)
+        timings["mock"] = time.perf_counter() - start
+        if not res:
+            raise Exception("Mock run failed: constraints not satisfied")
+
+        # Generate proof
+        start = time.perf_counter()
+        ezkl.prove(
+            witness_path,
+            compiled_path,
+            pk_path,
+            proof_path,
+            proof_type,
+        )
+        timings["prove"] = time.perf_counter() - start
+
+        if not os.path.isfile(proof_path):
+            raise Exception("Proof file was not created")
+
+        if calldata_path:
+            start = time.perf_counter()
+            calldata.encode_proof_file(proof_path, calldata_path)
+            timings["calldata"] = time.perf_counter() - start
+
+    return {
+        "proof_path": proof_path,
+        "calldata_path": calldata_path,
+        "timings": timings,
+        "resources": meter.result,
+        "worker": _worker_info(),
+    }
+
+
+def encode_calldata(proof_path: str, calldata_path: str) -> bytes:
+    """Encode the EVM calldata of a proof file."""
+    return calldata.encode_proof_file(proof_path, calldata_path)
+
+
+def setup_aggregate(
+    sample_paths: List[str],
+    vk_path: str,
+    pk_path: str,
+    logrows: int,
+    srs_path: Optional[str] = None,
+) -> bool:
+    """Generate the aggregation circuit keys for len(sample_paths) for-aggr proofs."""
+    import ezkl
+
+    return bool(ezkl.setup_aggregate(sample_paths, vk_path, pk_path, logrows, srs_path=srs_path))
+
+
+def aggregate(
+    proof_paths: List[str],
+    aggregate_path: str,
+    pk_path: str,
+    logrows: int,
+    srs_path: Optional[str] = None,
+    calldata_path: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Aggregate for-aggr proofs into one EVM-verifiable proof and encode its calldata."""
+    import ezkl
+
+    # ezkl names this argument vk_path, but it loads the aggregation proving key
+    ezkl.aggregate(
+        proof_paths,
+        aggregate_path,
+        pk_path,
+        "evm",
+        logrows,
+        "safe",
+        srs_path=srs_path,
+    )
+    if not os.path.isfile(aggregate_path):
+        raise Exception("Aggregate proof file was not created")
+
+    result = {"aggregate_path": aggregate_path, "worker": _worker_info()}
+    if calldata_path:
+        result["calldata"] = calldata.encode_proof_file(aggregate_path, calldata_path)
+    return result
+
+
+def verify_aggregate(proof_path: str, vk_path: str, logrows: int, srs_path: Optional[str] = None) -> bool:
+    """Verify an aggregate proof against the aggregation verification key."""
+    import ezkl
+
+    return bool(ezkl.verify_aggr(proof_path, vk_path, logrows, "kzg", srs_path=srs_path))
+
+
+def verify(proof_path: str, settings_path: str, vk_path: str) -> bool:
+    """Verify a proof file against settings and a verification key."""
+    import ezkl
+
+    return bool(ezkl.verify(proof_path, settings_path, vk_path))
+
+
+# --- Parent-side pool --------------------------------------------------------
+
+class ProverPool:
+    """
+    Pool of prover worker processes that keeps blocking ezkl calls off the
+    event loop.
+
+    Each worker gets a fixed native thread budget so that N concurrent
+    proofs don't oversubscribe the cores. Jobs are awaited with a timeout;
+    a job that times out while still queued is cancelled, while a job that
+    is already running can only be stopped by killing its process. In that
+    case the pool is swapped for a fresh one and the old processes are
+    terminated once their other in-flight jobs have finished.
+    """
+
+    def __init__(
+        self,
+        workers: int = settings.PROVER_WORKERS,
+        threads_per_worker: int = settings.PROVER_THREADS_PER_WORKER,
+        timeout: float = settings.PROVER_TIMEOUT_SECONDS,
+    ):
+        cpus = os.cpu_count() or 1
+        self.workers = workers or max(1, cpus // 4)
+        self.threads_per_worker = threads_per_worker or max(1, cpus // self.workers)
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._futures: Set[Future] = set()
+        # Latest stats reported back by each worker of the current pool, keyed by pid
+        self._worker_stats: Dict[int, Dict[str, Any]] = {}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.threads_per_worker,),
+                )
+                self._futures = set()
+            return self._executor
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None) -> Any:
+        """
+        Run `fn(*args)` in a prover worker.
+
+        Args:
+            fn: Module-level job function
+            *args: Picklable job arguments
+            timeout: Seconds to wait for the job (defaults to the pool timeout)
+
+        Returns:
+            The job's return value
+        """
+        timeout = self.timeout if timeout is None else timeout
+        executor = self._get_executor()
+        future = executor.submit(fn, *args)
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._forget)
+
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout)
+        except asyncio.TimeoutError:
+            self._abandon(executor, future)
+            raise ProverTimeoutError(f"Prover job timed out after {timeout:.0f}s")
+        except asyncio.CancelledError:
+            self._abandon(executor, future)
+            raise
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); start over with a fresh pool
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+                    self._worker_stats.clear()
+            raise
+
+        if isinstance(result, dict) and "worker" in result:
+            worker = result["worker"]
+            with self._lock:
+                # Workers of a retired pool are about to be killed; don't count them
+                if self._executor is executor:
+                    self._worker_stats[worker["pid"]] = worker
+        return result
+
+    def _forget(self, future: Future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def _abandon(self, executor: ProcessPoolExecutor, future: Future):
+        """Stop a job the caller no longer waits for."""
+        if future.cancel():
+            return  # Still queued, nothing is running yet
+
+        if future.done():
+            return
+
+        # The job is running inside native code and cannot be interrupted,
+        # so retire this executor: new jobs go to a fresh pool and the old
+        # workers are killed once their remaining jobs are done.
+        with self._lock:
+            if self._executor is not executor:
+                return  # Already retired
+            self._executor = None
+            self._worker_stats.clear()
+            siblings = {f for f in self._futures if f is not future}
+
+        thread = threading.Thread(
+            target=self._retire,
+            args=(executor, siblings, self.timeout),
+            name="prover-pool-retire",
+            daemon=True,
+        )
+        thread.start()
+
+    @staticmethod
+    def _retire(executor: ProcessPoolExecutor, pending: Set[Future], timeout: float):
+        # Let the other in-flight jobs finish, but never wait on them longer
+        # than their own timeout would allow
+        wait(pending, timeout=timeout)
+
+        # ProcessPoolExecutor has no public way to kill a busy worker
+        for process in list(getattr(executor, "_processes", {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def artifact_cache_stats(self) -> Dict[str, int]:
+        """Artifact residency counters summed over the workers of the current pool."""
+        totals = {"hits": 0, "misses": 0, "evictions": 0, "resident_models": 0, "resident_bytes": 0}
+        with self._lock:
+            workers = list(self._worker_stats.values())
+        for worker in workers:
+            for name in totals:
+                totals[name] += worker["artifact_cache"].get(name, 0)
+        return totals
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = len(self._futures)
+        return {
+            "workers": self.workers,
+            "threads_per_worker": self.threads_per_worker,
+            "pending_jobs": pending,
+            "timeout_seconds": self.timeout,
+            "artifact_cache": self.artifact_cache_stats(),
+        }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._worker_stats.clear()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,91 @@
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.utils.cache import LRUCache
+
+
+def result_key(model_digest: str, input_vector: List[int]) -> str:
+    """Content address of a prediction: model artifact hash + canonical input."""
+    canonical = json.dumps([int(x) for x in input_vector], separators=(",", ":"))
+    return hashlib.sha256(f"{model_digest}:{canonical}".encode()).hexdigest()
+
+
+def verification_key(proof_data: Any, verifier_digest: str) -> str:
+    """Content address of a verification: proof hash + vk and settings hashes."""
+    if isinstance(proof_data, str):
+        proof_data = proof_data.encode()
+    proof_digest = hashlib.sha256(proof_data).hexdigest()
+    return hashlib.sha256(f"{proof_digest}:{verifier_digest}".encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Cache of prediction, witness and proof results by content address.
+
+    Entries live in an in-memory LRU. When a cache directory is configured,
+    they are also written to disk so they survive restarts and can hold
+    more than the memory tier.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = settings.RESULT_CACHE_SIZE,
+        cache_dir: Optional[str] = settings.RESULT_CACHE_DIR,
+    ):
+        self.memory = LRUCache(maxsize)
+        self.cache_dir = cache_dir
+        self.disk_hits = 0
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self.memory.get(key)
+        if entry is not None or not self.cache_dir:
+            return entry
+
+        try:
+            with open(self._disk_path(key), 'r') as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        # Promote to the memory tier
+        self.disk_hits += 1
+        self.memory.put(key, entry)
+        return entry
+
+    def update(self, key: str, **fields) -> Dict[str, Any]:
+        """Merge fields into an entry (creating it if needed) and store it."""
+        entry = dict(self.get(key) or {})
+        entry.update(fields)
+        self.memory.put(key, entry)
+
+        if self.cache_dir:
+            path = self._disk_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write atomically so readers never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(entry, f)
+                os.replace(tmp_path, path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+        return entry
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.memory.stats()
+        stats["disk_hits"] = self.disk_hits
+        stats["disk_enabled"] = bool(self.cache_dir)
+        return stats
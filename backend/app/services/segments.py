@@ -0,0 +1,214 @@
+import asyncio
+import base64
+import hashlib
+import json
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.services.proof_index import SEGMENT_INDEX_SUFFIX, SEGMENT_PREFIX, parse_proof_key
+from app.utils import proof_codec
+
+SEGMENT_VERSION = 1
+
+
+def segment_keys(model_id: str, segment_id: str):
+    """(segment object key, sidecar index key) of a segment."""
+    base = f"{SEGMENT_PREFIX}{model_id}/{segment_id}"
+    return f"{base}.seg", f"{base}{SEGMENT_INDEX_SUFFIX}"
+
+
+def _sha256_b64(data: bytes) -> str:
+    # Same encoding as the S3 ChecksumSHA256 field
+    return base64.b64encode(hashlib.sha256(data).digest()).decode()
+
+
+class SegmentCompactor:
+    """
+    Packs older proofs into per-model segment objects.
+
+    Proofs keep landing as individual `proofs/{model_id}/{proof_id}.json`
+    objects. Compaction takes the ones older than `min_age_seconds`, appends
+    their stored bytes (JSON or compact) to a segment of at most
+    `max_segment_bytes`, and writes a sidecar index with the offset, length,
+    format, ETag and checksum of each proof:
+
+        segments/{model_id}/{segment_id}.seg
+        segments/{model_id}/{segment_id}.idx.json
+
+    The segment and its sidecar are written and recorded in the proof index
+    before the originals are deleted, so a proof is always readable from at
+    least one place. Downloads then resolve a compacted proof_id to a ranged
+    GET inside its segment (see AkaveService.locate_proof).
+    """
+
+    def __init__(
+        self,
+        akave,
+        proof_index,
+        max_segment_bytes: int = settings.PROOF_SEGMENT_MAX_BYTES,
+        min_age_seconds: int = settings.PROOF_SEGMENT_MIN_AGE_SECONDS,
+        concurrency: int = 16,
+    ):
+        self.akave = akave
+        self.index = proof_index
+        self.max_segment_bytes = max(1, max_segment_bytes)
+        self.min_age_seconds = min_age_seconds
+        self.concurrency = max(1, concurrency)
+
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.segments_written = 0
+        self.proofs_packed = 0
+        self.bytes_packed = 0
+        self.originals_deleted = 0
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    async def compact(self, model_id: Optional[str] = None, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Pack every eligible proof of a model (or of all models) into segments.
+
+        Returns:
+            Counts of proofs and segments, bytes packed and elapsed time
+        """
+        async with self._lock:
+            start = time.perf_counter()
+            cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.min_age_seconds)
+            run = {"proofs": 0, "segments": 0, "bytes": 0, "deleted": 0, "errors": 0, "dry_run": dry_run}
+
+            prefix = f"proofs/{model_id}/" if model_id else "proofs/"
+            current_model: Optional[str] = None
+            pending: List[Dict[str, Any]] = []
+            pending_bytes = 0
+            stale: List[str] = []
+
+            # Keys are listed in order, so each model's proofs arrive together
+            async for obj in self.akave.iter_objects(prefix):
+                parsed = parse_proof_key(obj["Key"])
+                if parsed is None or obj["LastModified"] > cutoff:
+                    continue
+                if self.index.locate(*parsed) is not None:
+                    # Already in a segment; a previous run stopped before deleting it
+                    stale.append(obj["Key"])
+                    continue
+                if parsed[0] != current_model or pending_bytes + obj["Size"] > self.max_segment_bytes:
+                    if pending:
+                        await self._write_segment(current_model, pending, run)
+                    current_model, pending, pending_bytes = parsed[0], [], 0
+                pending.append({**obj, "proof_id": parsed[1]})
+                pending_bytes += obj["Size"]
+
+            if pending:
+                await self._write_segment(current_model, pending, run)
+            if stale and not dry_run:
+                deleted = await self.akave.delete_objects(stale)
+                run["deleted"] += deleted.get("deleted", 0)
+
+            run["elapsed_seconds"] = time.perf_counter() - start
+            run["finished_at"] = datetime.now(timezone.utc).isoformat()
+            self.last_run = run
+            return run
+
+    async def _write_segment(self, model_id: str, objects: List[Dict[str, Any]], run: Dict[str, Any]):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(obj: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.akave.download_proof(model_id, obj["proof_id"], decode=False)
+
+        downloads = await asyncio.gather(*(fetch(obj) for obj in objects))
+
+        parts: List[bytes] = []
+        entries: List[Dict[str, Any]] = []
+        offset = 0
+        for obj, result in zip(objects, downloads):
+            if "error" in result:
+                # Left as a standalone object; the next run will retry it
+                run["errors"] += 1
+                continue
+            data = bytes(result["data"])
+            entries.append({
+                "proof_id": obj["proof_id"],
+                "offset": offset,
+                "length": len(data),
+                "format": result["format"],
+                "etag": result.get("etag"),
+                "checksum_sha256": _sha256_b64(data),
+                "created_at": obj["LastModified"].isoformat(),
+                "metadata": {
+                    k: v for k, v in (result.get("metadata") or {}).items() if k != proof_codec.METADATA_KEY
+                },
+            })
+            parts.append(data)
+            offset += len(data)
+
+        if not entries:
+            return
+        run["proofs"] += len(entries)
+        run["segments"] += 1
+        run["bytes"] += offset
+        if run["dry_run"]:
+            return
+
+        segment_id = f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}-{uuid.uuid4().hex[:8]}"
+        segment_key, sidecar_key = segment_keys(model_id, segment_id)
+        sidecar = {
+            "version": SEGMENT_VERSION,
+            "model_id": model_id,
+            "segment_key": segment_key,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "entries": entries,
+        }
+
+        uploaded = await self.akave.upload_bytes(segment_key, b"".join(parts))
+        if "error" in uploaded:
+            raise Exception(f"Writing segment {segment_key} failed: {uploaded['error']}")
+        uploaded = await self.akave.upload_bytes(
+            sidecar_key, json.dumps(sidecar, separators=(",", ":")).encode(), 'application/json'
+        )
+        if "error" in uploaded:
+            raise Exception(f"Writing segment index {sidecar_key} failed: {uploaded['error']}")
+
+        self.index.ingest_segment(sidecar)
+        deleted = await self.akave.delete_objects([f"proofs/{model_id}/{e['proof_id']}.json" for e in entries])
+
+        run["deleted"] += deleted.get("deleted", 0)
+        self.segments_written += 1
+        self.proofs_packed += len(entries)
+        self.bytes_packed += offset
+        self.originals_deleted += deleted.get("deleted", 0)
+
+    def start_periodic(self, interval_seconds: int = settings.PROOF_SEGMENT_COMPACTION_INTERVAL_SECONDS):
+        """Compact every `interval_seconds` in the background; 0 disables it."""
+        if interval_seconds <= 0 or self._task is not None:
+            return
+
+        async def loop():
+            while True:
+                await asyncio.sleep(interval_seconds)
+                try:
+                    await self.compact()
+                except Exception as e:
+                    self.last_run = {"error": str(e), "finished_at": datetime.now(timezone.utc).isoformat()}
+
+        self._task = asyncio.create_task(loop(), name="segment-compaction")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_segment_bytes": self.max_segment_bytes,
+            "min_age_seconds": self.min_age_seconds,
+            "running": self._lock.locked(),
+            "segments_written": self.segments_written,
+            "proofs_packed": self.proofs_packed,
+            "bytes_packed": self.bytes_packed,
+            "originals_deleted": self.originals_deleted,
+            "last_run": self.last_run,
+        }
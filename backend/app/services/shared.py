@@ -1,7 +1,22 @@
 # Shared service instances to ensure state persistence across endpoints
 from app.services.ezkl_service import EzklService
 from app.services.akave import AkaveService
+from app.services.proof_jobs import ProofJobManager
+from app.services.proof_index import ProofIndex
+from app.services.segments import SegmentCompactor
+from app.services.calldata_store import CalldataStore
+from app.services.aggregation import AggregationService
+from app.services.aggregation_jobs import AggregationJobManager
+from app.services.profiling import Profiler
 
 # Create singleton instances
-ezkl_service = EzklService()
-akave_service = AkaveService()
+akave_service = AkaveService()  # One pooled storage client per process
+ezkl_service = EzklService(akave_service)
+proof_index = ProofIndex()
+akave_service.locate_proof = proof_index.locate  # Compacted proofs are read from their segment
+segment_compactor = SegmentCompactor(akave_service, proof_index)
+calldata_store = CalldataStore(akave_service, ezkl_service)
+profiler = Profiler()  # Idle until an admin arms a profiling session
+proof_jobs = ProofJobManager(ezkl_service, akave_service, proof_index, calldata_store, profiler)
+aggregation_service = AggregationService(ezkl_service, akave_service, proof_index)
+aggregation_jobs = AggregationJobManager(aggregation_service)
@@ -0,0 +1,186 @@
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.services.artifact_cache import artifact_digest
+
+
+class VerifierContextError(Exception):
+    """Raised when a model's settings or verification key can't be obtained."""
+
+
+class VerifierContext:
+    """A model's settings and verification key, materialized on local disk."""
+
+    def __init__(self, model_id: str, path: str, settings_etag: Optional[str], vk_etag: Optional[str]):
+        self.model_id = model_id
+        self.path = path
+        self.settings_path = os.path.join(path, "settings.json")
+        self.vk_path = os.path.join(path, "test.vk")
+        self.settings_etag = settings_etag
+        self.vk_etag = vk_etag
+        self.checked_at = time.monotonic()
+        self._digest: Optional[str] = None
+
+    @property
+    def digest(self) -> str:
+        """sha256 of the vk and of the settings; changes whenever either file does."""
+        if self._digest is None:
+            self._digest = f"{artifact_digest(self.vk_path)}:{artifact_digest(self.settings_path)}"
+        return self._digest
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "settings_etag": self.settings_etag,
+            "vk_etag": self.vk_etag,
+            "age_seconds": time.monotonic() - self.checked_at,
+        }
+
+
+class VerifierContextManager:
+    """
+    Per-model verifier contexts, built once and revalidated by ETag.
+
+    The settings and verification key of a model are downloaded from Akave
+    the first time the model is verified and kept on local disk. After
+    `ttl_seconds` the next verification revalidates both objects with
+    conditional GETs (If-None-Match); they are only downloaded again when
+    the stored object changed. Each version lives in its own directory, so a
+    refresh never rewrites files that an in-flight verification is reading.
+    """
+
+    def __init__(
+        self,
+        akave,
+        root: Optional[str] = None,
+        ttl_seconds: float = settings.VERIFIER_CONTEXT_TTL_SECONDS,
+        fallback_root: Optional[str] = None,
+    ):
+        self.akave = akave
+        self.root = root or settings.VERIFIER_CONTEXT_DIR or fallback_root or os.path.join(
+            tempfile.gettempdir(), "proofs-of-inference-verifiers"
+        )
+        self.ttl_seconds = ttl_seconds
+
+        self._contexts: Dict[str, VerifierContext] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.downloads = 0
+        self.revalidations = 0
+        self.not_modified = 0
+
+        os.makedirs(self.root, exist_ok=True)
+
+    async def get(self, model_id: str) -> VerifierContext:
+        """
+        Return the verifier context of a model, building or revalidating it as needed.
+
+        Raises:
+            VerifierContextError: If settings or vk can't be fetched and no
+                previous context exists
+        """
+        context = self._contexts.get(model_id)
+        if context is not None and time.monotonic() - context.checked_at < self.ttl_seconds:
+            return context
+
+        lock = self._locks.setdefault(model_id, asyncio.Lock())
+        async with lock:
+            # Another request may have refreshed it while we waited
+            context = self._contexts.get(model_id)
+            if context is not None and time.monotonic() - context.checked_at < self.ttl_seconds:
+                return context
+            return await self._refresh(model_id, context)
+
+    def invalidate(self, model_id: str):
+        """Force the next verification of a model to revalidate against Akave."""
+        context = self._contexts.get(model_id)
+        if context is not None:
+            context.checked_at = float("-inf")
+
+    async def _refresh(self, model_id: str, current: Optional[VerifierContext]) -> VerifierContext:
+        settings_result, vk_result = await asyncio.gather(
+            self.akave.download_if_changed(
+                self.akave.model_settings_key(model_id),
+                current.settings_etag if current else None,
+            ),
+            self.akave.download_if_changed(
+                self.akave.verification_key_key(model_id),
+                current.vk_etag if current else None,
+            ),
+        )
+
+        if "error" in settings_result or "error" in vk_result:
+            if current is not None:
+                # Keep serving the last known context while Akave is unreachable
+                current.checked_at = time.monotonic()
+                return current
+            raise VerifierContextError(
+                f"Failed to download settings or verification key for model {model_id}"
+            )
+
+        if current is not None:
+            self.revalidations += 1
+            if settings_result.get("not_modified") and vk_result.get("not_modified"):
+                self.not_modified += 1
+                current.checked_at = time.monotonic()
+                return current
+
+        context = self._materialize(model_id, current, settings_result, vk_result)
+        self._contexts[model_id] = context
+        return context
+
+    def _materialize(
+        self,
+        model_id: str,
+        current: Optional[VerifierContext],
+        settings_result: Dict[str, Any],
+        vk_result: Dict[str, Any],
+    ) -> VerifierContext:
+        """Write a new version directory, reusing whichever file did not change."""
+        version = hashlib.sha256(
+            f"{settings_result.get('etag')}:{vk_result.get('etag')}:{time.time_ns()}".encode()
+        ).hexdigest()[:16]
+        model_dir = os.path.join(self.root, model_id)
+        context = VerifierContext(
+            model_id,
+            os.path.join(model_dir, version),
+            settings_result.get("etag"),
+            vk_result.get("etag"),
+        )
+        os.makedirs(context.path, exist_ok=True)
+
+        for result, path, previous in (
+            (settings_result, context.settings_path, current.settings_path if current else None),
+            (vk_result, context.vk_path, current.vk_path if current else None),
+        ):
+            if result.get("not_modified"):
+                shutil.copyfile(previous, path)
+            else:
+                self.downloads += 1
+                with open(path, 'wb') as f:
+                    f.write(result["data"])
+
+        self._prune(model_dir, keep={context.path, current.path if current else None})
+        return context
+
+    @staticmethod
+    def _prune(model_dir: str, keep: set):
+        # Keep the new and the previous version; older ones have no readers left
+        for name in os.listdir(model_dir):
+            path = os.path.join(model_dir, name)
+            if path not in keep:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "models": {model_id: context.as_dict() for model_id, context in self._contexts.items()},
+            "ttl_seconds": self.ttl_seconds,
+            "downloads": self.downloads,
+            "revalidations": self.revalidations,
+            "not_modified": self.not_modified,
+        }
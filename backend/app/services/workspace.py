@@ -0,0 +1,231 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Union
+
+from app.core.config import settings
+
+# Marker file naming the process that owns a workspace
+OWNER_FILE = ".owner"
+
+
+class WorkspaceFullError(Exception):
+    """Raised when the scratch area is over its disk-usage cap."""
+
+
+class Workspace:
+    """A private scratch directory for a single predict/prove/verify/encode job."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.paths: Dict[str, str] = {
+            "input": os.path.join(path, "input.json"),
+            "witness": os.path.join(path, "witness.json"),
+            "proof": os.path.join(path, "proof.json"),
+            "settings": os.path.join(path, "settings.json"),
+            "vk": os.path.join(path, "test.vk"),
+            "calldata": os.path.join(path, "calldata.bin"),
+        }
+
+    def __getitem__(self, name: str) -> str:
+        # Other names (e.g. "proof-3.json") are files directly in the workspace
+        return self.paths.get(name) or os.path.join(self.path, os.path.basename(name))
+
+    def write(self, name: str, data: Any) -> str:
+        """
+        Write an artifact for ezkl to read and return its path.
+
+        Strings and bytes are written as-is; anything else is serialized as
+        JSON. A single write call per artifact, no re-encoding of bytes.
+        """
+        path = self[name]
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            with open(path, 'wb') as f:
+                f.write(data)
+        else:
+            if not isinstance(data, str):
+                data = json.dumps(data, separators=(",", ":"))
+            with open(path, 'w') as f:
+                f.write(data)
+        return path
+
+    def read(self, name: str, binary: bool = False) -> Union[str, bytes]:
+        """Read an artifact ezkl produced in this workspace."""
+        with open(self[name], 'rb' if binary else 'r') as f:
+            return f.read()
+
+
+class WorkspaceManager:
+    """
+    Hands out job-scoped scratch directories.
+
+    Every job gets its own directory under the workspace root, so concurrent
+    requests never share input/witness/proof files. Directories are removed
+    when the job finishes; anything leaked by a crashed job is garbage
+    collected once it is older than the configured TTL.
+
+    The root may be shared by several server processes, so each workspace
+    records its owner's pid and GC never removes one whose owner is still
+    running. Disk usage is measured by the GC pass and adjusted as
+    workspaces are removed, instead of walking the root for every job.
+    """
+
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        max_bytes: int = settings.WORKSPACE_MAX_BYTES,
+        ttl_seconds: int = settings.WORKSPACE_TTL_SECONDS,
+        gc_interval_seconds: int = settings.WORKSPACE_GC_INTERVAL_SECONDS,
+        fallback_root: Optional[str] = None,
+    ):
+        self.root = root or settings.WORKSPACE_ROOT or self._default_root(fallback_root)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.gc_interval_seconds = gc_interval_seconds
+
+        os.makedirs(self.root, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._active = set()
+        self._last_gc = 0.0
+        self._usage_bytes = self._measure()
+
+    @staticmethod
+    def _default_root(fallback_root: Optional[str]) -> str:
+        """Prefer tmpfs so scratch files never hit the disk."""
+        shm = "/dev/shm"
+        if os.path.isdir(shm) and os.access(shm, os.W_OK):
+            return os.path.join(shm, "proofs-of-inference")
+        if fallback_root:
+            return fallback_root
+        return os.path.join(tempfile.gettempdir(), "proofs-of-inference")
+
+    @contextmanager
+    def workspace(self, job: str = "job") -> Iterator[Workspace]:
+        """
+        Create a private workspace for the duration of a `with` block.
+
+        Args:
+            job: Short job label used as the directory prefix (e.g. "predict")
+
+        Yields:
+            Workspace with per-job file paths
+        """
+        self._maybe_gc()
+
+        if self.max_bytes and self.usage() >= self.max_bytes:
+            # Try once to reclaim space from leaked workspaces before failing
+            self.gc(force=True)
+            if self.usage() >= self.max_bytes:
+                raise WorkspaceFullError(
+                    f"Scratch workspace usage exceeds {self.max_bytes} bytes"
+                )
+
+        path = tempfile.mkdtemp(prefix=f"{job}-", dir=self.root)
+        with open(os.path.join(path, OWNER_FILE), "w") as f:
+            f.write(str(os.getpid()))
+        with self._lock:
+            self._active.add(path)
+        try:
+            yield Workspace(path)
+        finally:
+            size = self._measure(path)
+            with self._lock:
+                self._active.discard(path)
+                # Files written since the last GC pass were never counted
+                self._usage_bytes = max(0, self._usage_bytes - size)
+            shutil.rmtree(path, ignore_errors=True)
+
+    def usage(self) -> int:
+        """Bytes used under the workspace root, as of the last GC pass."""
+        with self._lock:
+            return self._usage_bytes
+
+    def _measure(self, path: Optional[str] = None) -> int:
+        """Total size of the files under `path` (the whole root by default)."""
+        total = 0
+        for dirpath, _, filenames in os.walk(path or self.root):
+            for name in filenames:
+                try:
+                    total += os.path.getsize(os.path.join(dirpath, name))
+                except OSError:
+                    pass  # File removed while walking
+        return total
+
+    @staticmethod
+    def _owner_alive(path: str) -> bool:
+        """Whether another running process owns the workspace at `path`."""
+        try:
+            with open(os.path.join(path, OWNER_FILE)) as f:
+                pid = int(f.read().strip())
+        except (OSError, ValueError):
+            return False
+        if pid == os.getpid():
+            return False  # Our own live workspaces are in _active
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True  # Exists, owned by another user
+        return True
+
+    def gc(self, force: bool = False, max_age: Optional[float] = None) -> int:
+        """
+        Remove inactive workspaces older than `max_age` (defaults to the TTL)
+        and re-measure the disk usage of the root.
+
+        Returns:
+            Number of workspaces removed
+        """
+        max_age = self.ttl_seconds if max_age is None else max_age
+        now = time.time()
+        removed = 0
+
+        with self._lock:
+            if not force and now - self._last_gc < self.gc_interval_seconds:
+                return 0
+            self._last_gc = now
+            active = set(self._active)
+
+        try:
+            entries = list(os.scandir(self.root))
+        except FileNotFoundError:
+            return 0
+
+        for entry in entries:
+            if entry.path in active or not entry.is_dir(follow_symlinks=False):
+                continue
+            try:
+                age = now - entry.stat(follow_symlinks=False).st_mtime
+            except OSError:
+                continue
+            if age >= max_age and not self._owner_alive(entry.path):
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+
+        usage = self._measure()
+        with self._lock:
+            self._usage_bytes = usage
+        return removed
+
+    def _maybe_gc(self):
+        try:
+            self.gc()
+        except Exception:
+            pass  # GC is best effort and must never fail a request
+
+    def stats(self) -> dict:
+        self._maybe_gc()
+        with self._lock:
+            active = len(self._active)
+        return {
+            "root": self.root,
+            "active_workspaces": active,
+            "usage_bytes": self.usage(),
+            "max_bytes": self.max_bytes,
+        }
@@ -0,0 +1,100 @@
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU mapping with hit/miss counters."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into one execution.
+
+    The first caller starts the coroutine as a task; it and every caller
+    arriving while it is in flight wait for and share its result (or
+    exception). A caller that is cancelled (e.g. its client disconnected)
+    only stops waiting: the shared task keeps running for the others and
+    is cancelled once nobody waits for it anymore.
+    """
+
+    def __init__(self):
+        # key -> [task, number of callers waiting on it]
+        self._inflight: Dict[Hashable, list] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        flight = self._inflight.get(key)
+        if flight is None:
+            task = asyncio.ensure_future(fn())
+            flight = self._inflight[key] = [task, 0]
+            task.add_done_callback(lambda _, key=key, flight=flight: self._done(key, flight))
+        task = flight[0]
+
+        flight[1] += 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            flight[1] -= 1
+            if flight[1] == 0 and not task.done():
+                # Forget it right away, so a caller arriving before the task
+                # has finished cancelling starts a fresh one instead of joining
+                self._done(key, flight)
+                task.cancel()
+
+    def _done(self, key: Hashable, flight: list):
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+
+    def in_flight(self, key: Optional[Hashable] = None) -> int:
+        if key is not None:
+            return int(key in self._inflight)
+        return len(self._inflight)
@@ -0,0 +1,30 @@
+"""
+EVM calldata encoding for ezkl proofs.
+
+Shared by the backend (calldata is generated when a proof is created) and
+by contracts/src/genoutput.py, so both produce byte-identical output. Only
+the standard library is needed to format calldata; ezkl is imported when
+encoding a proof file.
+"""
+from typing import Union
+
+
+def encode_proof_file(proof_path: str, calldata_path: str) -> bytes:
+    """Encode a proof JSON file as verifier calldata, also written to `calldata_path`."""
+    import ezkl
+
+    res = ezkl.encode_evm_calldata(proof_path, calldata_path)
+    # ezkl returns the calldata bytes; only fall back to the file if it didn't
+    if res:
+        return bytes(res)
+    with open(calldata_path, 'rb') as f:
+        return f.read()
+
+
+def to_hex(calldata: Union[bytes, bytearray, memoryview]) -> str:
+    """0x-prefixed lowercase hex, as sent in an eth_call or transaction."""
+    return "0x" + bytes(calldata).hex()
+
+
+def from_hex(calldata_hex: str) -> bytes:
+    return bytes.fromhex(calldata_hex[2:] if calldata_hex.startswith("0x") else calldata_hex)
@@ -0,0 +1,366 @@
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Prometheus text exposition format, version 0.0.4
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; spans cache hits (milliseconds) to full proofs (minutes)
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0
+)
+
+# A metric family as produced by a collector: (name, type, help, [(labels, value), ...])
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+# model_id labels often come from request paths and storage keys, so only
+# the models shipped in the artifacts directory get a series of their own;
+# anything else is reported as OTHER_MODEL to keep the label set bounded.
+OTHER_MODEL = "other"
+_MODELS_REFRESH_SECONDS = 60.0
+_models = {"dir": None, "names": frozenset(), "listed_at": 0.0}
+_models_lock = threading.Lock()
+
+
+def set_models_dir(path: str):
+    """Directory whose subdirectories are the known model ids (artifacts/models)."""
+    with _models_lock:
+        _models.update({"dir": path, "names": frozenset(), "listed_at": 0.0})
+
+
+def _known_models() -> frozenset:
+    with _models_lock:
+        if _models["dir"] and time.monotonic() - _models["listed_at"] > _MODELS_REFRESH_SECONDS:
+            try:
+                names = frozenset(
+                    entry.name for entry in os.scandir(_models["dir"]) if entry.is_dir(follow_symlinks=False)
+                )
+            except OSError:
+                names = frozenset()
+            _models.update({"names": names, "listed_at": time.monotonic()})
+        return _models["names"]
+
+
+def model_label(model_id: Any) -> str:
+    """The model_id label value: the id of a known model, "" for none, else OTHER_MODEL."""
+    if not model_id:
+        return ""
+    return model_id if model_id in _known_models() else OTHER_MODEL
+
+
+class Registry:
+    """
+    Metrics of this process, rendered in the Prometheus text format.
+
+    Besides counters, gauges and histograms updated as things happen, it
+    holds collectors: functions called at scrape time that read the current
+    state (queue depths, cache sizes) from the services' own stats.
+    """
+
+    def __init__(self):
+        self._metrics: List["_Metric"] = []
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: "_Metric"):
+        with self._lock:
+            self._metrics.append(metric)
+
+    def register_collector(self, collector: Callable[[], Iterable[Family]]):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics, collectors = list(self._metrics), list(self._collectors)
+
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for collector in collectors:
+            try:
+                families = list(collector())
+            except Exception:
+                continue  # A failing collector must not break the whole scrape
+            for name, kind, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry: Registry = REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames) or any(name not in labels for name in self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(
+            model_label(labels[name]) if name == "model_id" else str(labels[name]) for name in self.labelnames
+        )
+
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def values(self) -> Dict[Tuple[str, ...], Any]:
+        """Current value per label tuple, in `labelnames` order."""
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        lines = self._header()
+        for key, value in values:
+            lines.append(f"{self.name}{_format_labels(self._labels(key))} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        registry: Registry = REGISTRY,
+    ):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, sum
+                state = self._values[key] = [[0] * len(self.buckets), 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the duration of the block, whether or not it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        lines = self._header()
+        for key, counts, total in values:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                bucket_labels = _format_labels({**labels, "le": _format_value(bound)})
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+# --- Application metrics -----------------------------------------------------
+# model_id is "" where a measurement isn't tied to one model, and "other"
+# for ids that aren't a known model (see model_label).
+
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being served")
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency, until the last body chunk is sent",
+    ("method", "route", "status", "model_id"),
+)
+
+EZKL_STAGE_SECONDS = Histogram(
+    "ezkl_stage_duration_seconds",
+    "Duration of EzklService stages (witness, mock, prove, calldata, verify, prover_job, prover_wait)",
+    ("stage", "model_id"),
+)
+EZKL_STAGE_ERRORS = Counter("ezkl_stage_errors_total", "Failed EzklService stages", ("stage", "model_id"))
+WITNESS_ATTEMPT_SECONDS = Histogram(
+    "ezkl_witness_attempt_duration_seconds",
+    "Duration of each witness generation attempt, by input format and outcome",
+    ("model_id", "format", "outcome"),
+)
+
+AKAVE_REQUESTS = Counter("akave_requests_total", "Akave storage calls", ("operation", "model_id", "status"))
+AKAVE_REQUEST_SECONDS = Histogram(
+    "akave_request_duration_seconds", "Akave storage call latency", ("operation", "model_id")
+)
+
+CACHE_LOOKUPS = Counter("cache_lookups_total", "Cache lookups by result", ("cache", "model_id", "result"))
+
+PROOF_JOBS = Counter("proof_jobs_total", "Finished proof jobs", ("model_id", "status"))
+PROOF_JOB_STAGE_SECONDS = Histogram(
+    "proof_job_stage_duration_seconds", "Proof job stage durations (queued, prove, upload)", ("stage", "model_id")
+)
+
+
+# Set while a profiling capture runs in this context (see app.services.profiling);
+# called as recorder(service, stage, model_id, seconds)
+STAGE_RECORDER: ContextVar[Optional[Callable[[str, str, str, float], None]]] = ContextVar(
+    "stage_recorder", default=None
+)
+
+
+def _record_stage(service: str, stage: str, model_id: str, seconds: float):
+    recorder = STAGE_RECORDER.get()
+    if recorder is not None:
+        recorder(service, stage, model_id, seconds)
+
+
+def observe_stage(stage: str, model_id: str, seconds: float):
+    """Record the duration of an EzklService stage."""
+    EZKL_STAGE_SECONDS.observe(seconds, stage=stage, model_id=model_id)
+    _record_stage("ezkl", stage, model_id, seconds)
+
+
+def observe_akave(operation: str, model_id: str, status: str, seconds: float):
+    """Record an AkaveService storage call."""
+    AKAVE_REQUEST_SECONDS.observe(seconds, operation=operation, model_id=model_id)
+    AKAVE_REQUESTS.inc(operation=operation, model_id=model_id, status=status)
+    _record_stage("akave", operation, model_id, seconds)
+
+
+@contextmanager
+def track_stage(stage: str, model_id: str) -> Iterator[None]:
+    """Time an EzklService stage and count it as failed if the block raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        EZKL_STAGE_ERRORS.inc(stage=stage, model_id=model_id)
+        raise
+    finally:
+        observe_stage(stage, model_id, time.perf_counter() - start)
+
+
+# Clients can send any method token; keep the label set bounded
+_HTTP_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting in-flight requests and timing each one by route.
+
+    A plain ASGI wrapper rather than BaseHTTPMiddleware, so streamed
+    responses pass through untouched and are timed until their last chunk.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = ["500"]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = str(message["status"])
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            # The router fills in the matched route and its path parameters
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method=scope["method"] if scope["method"] in _HTTP_METHODS else "other",
+                route=getattr(route, "path", "unmatched"),
+                status=status[0],
+                model_id=scope.get("path_params", {}).get("model_id", ""),
+            )
+
+
+def model_from_key(key: Optional[str]) -> str:
+    """
+    Model id of a storage key such as proofs/{model_id}/... or settings/{model_id}.json.
+
+    Keys are arbitrary strings, so the result is only safe as a label after
+    model_label (which every metric applies to its model_id label).
+    """
+    if not key:
+        return ""
+    parts = key.split("/")
+    if len(parts) >= 3:
+        return parts[1]
+    if len(parts) == 2 and parts[1]:
+        return parts[1].rsplit(".", 1)[0]
+    return ""
@@ -0,0 +1,195 @@
+import json
+import re
+import struct
+import zlib
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency; zlib is used instead
+    zstandard = None
+
+# Storage formats, recorded in the object metadata under METADATA_KEY
+FORMAT_JSON = "json"
+FORMAT_COMPACT_ZSTD = "compact-zstd-v1"
+FORMAT_COMPACT_ZLIB = "compact-zlib-v1"
+COMPACT_FORMATS = (FORMAT_COMPACT_ZSTD, FORMAT_COMPACT_ZLIB)
+METADATA_KEY = "proof-format"
+
+# Media types for content negotiation on download
+JSON_MEDIA_TYPE = "application/json"
+COMPACT_MEDIA_TYPE = "application/vnd.proofs-of-inference.proof+compact"
+
+MAGIC = b"POIC"
+_VERSION = 1
+_COMPRESSION = {FORMAT_COMPACT_ZSTD: 1, FORMAT_COMPACT_ZLIB: 2}
+_FORMATS = {code: fmt for fmt, code in _COMPRESSION.items()}
+
+# Placeholder key for binary blobs in the JSON skeleton
+_BLOB = "\u0000b"
+_HEX = 0        # lowercase hex string
+_HEX_0X = 1     # "0x"-prefixed lowercase hex string
+_UINT8 = 2      # list of integers 0..255
+
+# Values shorter than this stay in the skeleton as they are
+_MIN_BLOB_BYTES = 16
+_HEX_RE = re.compile(r"(0x)?((?:[0-9a-f]{2})+)")
+
+
+class ProofCodecError(Exception):
+    """Raised when a stored proof can't be decoded."""
+
+
+def default_compact_format() -> str:
+    return FORMAT_COMPACT_ZSTD if zstandard is not None else FORMAT_COMPACT_ZLIB
+
+
+def is_compact(data: Union[bytes, str]) -> bool:
+    return isinstance(data, (bytes, bytearray, memoryview)) and bytes(data[:len(MAGIC)]) == MAGIC
+
+
+class _BlobTable:
+    """Concatenated binary values, deduplicated (e.g. `proof` and `hex_proof`)."""
+
+    def __init__(self):
+        self.parts: List[bytes] = []
+        self.offsets: Dict[bytes, int] = {}
+        self.size = 0
+
+    def add(self, blob: bytes) -> int:
+        offset = self.offsets.get(blob)
+        if offset is None:
+            offset = self.offsets[blob] = self.size
+            self.parts.append(blob)
+            self.size += len(blob)
+        return offset
+
+
+def _pack(value: Any, blobs: _BlobTable) -> Any:
+    if isinstance(value, dict):
+        return {k: _pack(v, blobs) for k, v in value.items()}
+    if isinstance(value, list):
+        if (
+            len(value) >= _MIN_BLOB_BYTES
+            and all(type(x) is int and 0 <= x <= 255 for x in value)
+        ):
+            blob = bytes(value)
+            return {_BLOB: [blobs.add(blob), len(blob), _UINT8]}
+        return [_pack(v, blobs) for v in value]
+    if isinstance(value, str) and len(value) >= 2 * _MIN_BLOB_BYTES:
+        match = _HEX_RE.fullmatch(value)
+        if match:
+            blob = bytes.fromhex(match.group(2))
+            kind = _HEX_0X if match.group(1) else _HEX
+            return {_BLOB: [blobs.add(blob), len(blob), kind]}
+    return value
+
+
+def _unpack_hook(blobs: memoryview):
+    def hook(obj: Dict[str, Any]) -> Any:
+        if len(obj) == 1 and _BLOB in obj:
+            offset, length, kind = obj[_BLOB]
+            blob = bytes(blobs[offset:offset + length])
+            if kind == _UINT8:
+                return list(blob)
+            return ("0x" if kind == _HEX_0X else "") + blob.hex()
+        return obj
+    return hook
+
+
+def encode_compact(proof: Union[bytes, str], fmt: Optional[str] = None) -> Tuple[bytes, str]:
+    """
+    Encode an ezkl proof JSON document in the compact format.
+
+    Hex strings and byte arrays (field elements, the proof transcript) are
+    stored as raw bytes, and repeated values are stored once, before
+    the whole document is compressed.
+
+    Returns:
+        (encoded bytes, storage format)
+    """
+    fmt = fmt or default_compact_format()
+    if fmt == FORMAT_COMPACT_ZSTD and zstandard is None:
+        raise ProofCodecError("zstandard is not installed")
+
+    blobs = _BlobTable()
+    skeleton = json.dumps(_pack(json.loads(proof), blobs), separators=(",", ":")).encode()
+    payload = struct.pack(">I", len(skeleton)) + skeleton + b"".join(blobs.parts)
+
+    if fmt == FORMAT_COMPACT_ZSTD:
+        compressed = zstandard.ZstdCompressor(level=10).compress(payload)
+    else:
+        compressed = zlib.compress(payload, 9)
+    return MAGIC + bytes([_VERSION, _COMPRESSION[fmt]]) + compressed, fmt
+
+
+def decode_compact(data: bytes) -> bytes:
+    """Decode a compact proof back to ezkl proof JSON (compact separators)."""
+    if not is_compact(data):
+        raise ProofCodecError("Not a compact proof")
+    version, compression = data[len(MAGIC)], data[len(MAGIC) + 1]
+    if version != _VERSION or compression not in _FORMATS:
+        raise ProofCodecError(f"Unsupported compact proof version {version}/{compression}")
+
+    body = bytes(data[len(MAGIC) + 2:])
+    try:
+        if _FORMATS[compression] == FORMAT_COMPACT_ZSTD:
+            if zstandard is None:
+                raise ProofCodecError("zstandard is required to decode this proof")
+            payload = zstandard.ZstdDecompressor().decompress(body)
+        else:
+            payload = zlib.decompress(body)
+    except ProofCodecError:
+        raise
+    except Exception as e:
+        raise ProofCodecError(f"Corrupt compact proof: {e}")
+
+    (skeleton_length,) = struct.unpack_from(">I", payload)
+    skeleton = payload[4:4 + skeleton_length]
+    blobs = memoryview(payload)[4 + skeleton_length:]
+    proof = json.loads(skeleton, object_hook=_unpack_hook(blobs))
+    return json.dumps(proof, separators=(",", ":")).encode()
+
+
+def to_json(data: Union[bytes, str]) -> Union[bytes, str]:
+    """Return proof JSON, decoding the compact format if needed."""
+    return decode_compact(data) if is_compact(data) else data
+
+
+def encode(proof: Union[bytes, str], fmt: str) -> Tuple[bytes, str]:
+    """Encode proof JSON in a storage format; returns (data, format)."""
+    if fmt == FORMAT_JSON:
+        return (proof.encode() if isinstance(proof, str) else bytes(proof)), FORMAT_JSON
+    if fmt == "compact":
+        fmt = None
+    return encode_compact(proof, fmt)
+
+
+def stored_format(metadata: Optional[Dict[str, str]], data: Optional[bytes] = None) -> str:
+    """Storage format of an object from its metadata, falling back to sniffing the data."""
+    fmt = (metadata or {}).get(METADATA_KEY)
+    if fmt:
+        return fmt
+    if data is not None and is_compact(data):
+        return _FORMATS.get(data[len(MAGIC) + 1], FORMAT_COMPACT_ZSTD)
+    return FORMAT_JSON
+
+
+def prefers_compact(accept: Optional[str]) -> bool:
+    """Whether an Accept header asks for the compact form over JSON."""
+    if not accept:
+        return False
+    weights: Dict[str, float] = {}
+    for item in accept.split(","):
+        parts = [p.strip() for p in item.split(";")]
+        quality = 1.0
+        for param in parts[1:]:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        weights[parts[0].lower()] = quality
+    compact = weights.get(COMPACT_MEDIA_TYPE, 0.0)
+    json_quality = max(weights.get(JSON_MEDIA_TYPE, 0.0), weights.get("*/*", 0.0) * 0.99)
+    return compact > 0 and compact >= json_quality
@@ -0,0 +1,93 @@
+import json
+import os
+import resource
+import sys
+import time
+from typing import Any, Dict, Optional
+
+# Object metadata key holding a proof's resource usage as compact JSON
+METADATA_KEY = "resources"
+
+
+def peak_rss_bytes() -> int:
+    """High-water mark of this process's resident memory."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def reset_peak_rss() -> bool:
+    """Reset the resident memory high-water mark (Linux); False if unsupported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+class ResourceMeter:
+    """
+    Measures the CPU time, peak memory and wall time of a block of work in
+    the current process.
+
+    Meant for prover workers, which run one job at a time: CPU time covers
+    all of the process's threads (ezkl's rayon pool included), and the
+    memory high-water mark is reset at the start so the peak belongs to
+    this job. Where it can't be reset, the peak is the worker's lifetime
+    peak and "peak_rss_scope" says "process".
+    """
+
+    def __enter__(self) -> "ResourceMeter":
+        self.per_job_peak = reset_peak_rss()
+        self._usage = resource.getrusage(resource.RUSAGE_SELF)
+        self._start = time.perf_counter()
+        self.result: Dict[str, Any] = {}
+        return self
+
+    def __exit__(self, *exc_info):
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        self.result = {
+            "wall_seconds": time.perf_counter() - self._start,
+            "cpu_user_seconds": usage.ru_utime - self._usage.ru_utime,
+            "cpu_system_seconds": usage.ru_stime - self._usage.ru_stime,
+            "peak_rss_bytes": peak_rss_bytes(),
+            "peak_rss_scope": "job" if self.per_job_peak else "process",
+            "major_page_faults": usage.ru_majflt - self._usage.ru_majflt,
+        }
+        return False
+
+
+def directory_size(path: str) -> int:
+    """Total size of the files directly inside a directory."""
+    total = 0
+    try:
+        for entry in os.scandir(path):
+            if entry.is_file(follow_symlinks=False):
+                total += entry.stat(follow_symlinks=False).st_size
+    except OSError:
+        pass
+    return total
+
+
+def to_metadata(resources: Dict[str, Any]) -> Dict[str, str]:
+    """Object metadata entries for a proof's resource usage."""
+    return {METADATA_KEY: json.dumps(resources, separators=(",", ":"))}
+
+
+def from_metadata(metadata: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """A proof's resource usage from its object (or index) metadata, if recorded."""
+    value = (metadata or {}).get(METADATA_KEY)
+    if not value:
+        return None
+    try:
+        return json.loads(value)
+    except ValueError:
+        return None
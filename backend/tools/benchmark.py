@@ -0,0 +1,339 @@
+"""
+Stage-level micro-benchmarks for the predict/prove pipeline.
+
+Times each stage on its own, in-process and offline, against the model
+artifacts (artifacts/models/<model_id>/ by default):
+
+    gen_witness          ezkl.gen_witness
+    witness_parse        json.loads of the witness file
+    decode_outputs       rescaled outputs -> predicted digits
+    native_predict       PyTorch forward pass (needs <model_id>.pt)
+    mock                 ezkl.mock
+    prove                ezkl.prove (needs <model_id>-test.pk)
+    verify               ezkl.verify (needs <model_id>-test.vk and <model_id>-settings.json)
+    encode_evm_calldata  ezkl.encode_evm_calldata
+
+Stages whose artifacts are missing are reported as skipped. Run from the
+backend directory, e.g.:
+
+    python -m tools.benchmark --iterations 20 --out bench.json
+    python -m tools.benchmark --stages gen_witness witness_parse decode_outputs --iterations 200
+    python -m tools.benchmark --out new.json --compare bench.json --threshold 0.15
+
+Results are JSON: p50/p95/mean/min/max per stage in milliseconds, the
+peak RSS of each stage and proof/calldata sizes. The memory high-water
+mark is reset before each stage (Linux); where it can't be, the peak is
+the process's so far and "peak_rss_scope" says "process". --compare
+exits with status 1 when a stage's p50 or p95, or the proof size,
+regressed by more than the threshold against the baseline.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import ezkl
+import numpy as np
+
+from app.services.artifact_cache import artifact_digest
+from app.services.ezkl_service import INPUT_FORMATS, decode_rescaled_outputs
+from app.services.native_inference import NativeInference
+from app.utils import proof_codec
+from app.utils.resources import peak_rss_bytes, reset_peak_rss
+
+STAGES = [
+    "gen_witness",
+    "witness_parse",
+    "decode_outputs",
+    "native_predict",
+    "mock",
+    "prove",
+    "verify",
+    "encode_evm_calldata",
+]
+
+# Metrics compared against a baseline; larger is worse for all of them
+COMPARED = ("p50_ms", "p95_ms")
+
+DEFAULT_ARTIFACTS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app", "artifacts", "models"
+)
+
+
+def summarize(samples: List[float]) -> Dict[str, Any]:
+    ms = np.asarray(samples) * 1000.0
+    return {
+        "samples": len(samples),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+        "min_ms": round(float(ms.min()), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def sample_input(model_id: str, rng: random.Random) -> List[int]:
+    high = 1 if model_id == "parity" else 9
+    return [rng.randint(0, high) for _ in range(6)]
+
+
+class ModelBenchmark:
+    """Runs the selected stages for one model inside a scratch directory."""
+
+    def __init__(self, model_id: str, model_dir: str, work_dir: str, srs_dir: Optional[str]):
+        self.model_id = model_id
+        self.paths = {
+            "compiled": os.path.join(model_dir, f"{model_id}-network.compiled"),
+            "pt": os.path.join(model_dir, f"{model_id}.pt"),
+            "pk": os.path.join(model_dir, f"{model_id}-test.pk"),
+            "vk": os.path.join(model_dir, f"{model_id}-test.vk"),
+            "settings": os.path.join(model_dir, f"{model_id}-settings.json"),
+            "input": os.path.join(work_dir, "input.json"),
+            "witness": os.path.join(work_dir, "witness.json"),
+            "proof": os.path.join(work_dir, "proof.json"),
+            "calldata": os.path.join(work_dir, "calldata.bin"),
+        }
+        self.srs_path = self._srs_path(srs_dir)
+        self.format_index: Optional[int] = None
+        self.native = NativeInference()
+
+    def _srs_path(self, srs_dir: Optional[str]) -> Optional[str]:
+        if not srs_dir or not os.path.isfile(self.paths["settings"]):
+            return None
+        with open(self.paths["settings"]) as f:
+            logrows = json.load(f)["run_args"]["logrows"]
+        path = os.path.join(srs_dir, f"kzg{logrows}.srs")
+        return path if os.path.isfile(path) else None
+
+    def missing(self, stage: str) -> Optional[str]:
+        """Why a stage can't run, or None."""
+        needs = {
+            "native_predict": ["pt"],
+            "prove": ["compiled", "pk"],
+            "verify": ["vk", "settings"],
+        }.get(stage, ["compiled"])
+        for name in needs:
+            if not os.path.isfile(self.paths[name]):
+                return f"{name} not found: {self.paths[name]}"
+        if stage in ("verify", "encode_evm_calldata") and not os.path.isfile(self.paths["proof"]):
+            return "no proof (the prove stage was skipped or failed)"
+        return None
+
+    def _gen_witness(self, input_vector: List[int]):
+        data = [float(x) for x in input_vector]
+        if self.format_index is None:
+            # Same probing as EzklService.resolve_input_format, done once
+            for index, layout in enumerate(INPUT_FORMATS):
+                try:
+                    self._write_input(layout(data))
+                    asyncio.run(self._run_gen_witness())
+                    self.format_index = index
+                    return
+                except Exception:
+                    continue
+            raise Exception("No input format accepted by the compiled circuit")
+        self._write_input(INPUT_FORMATS[self.format_index](data))
+        asyncio.run(self._run_gen_witness())
+
+    async def _run_gen_witness(self):
+        # ezkl.gen_witness must be called with an event loop running
+        await ezkl.gen_witness(self.paths["input"], self.paths["compiled"], self.paths["witness"])
+
+    def _write_input(self, input_data: Any):
+        with open(self.paths["input"], 'w') as f:
+            json.dump({"input_data": input_data}, f)
+
+    def stage_fn(self, stage: str, input_vector: List[int]) -> Callable[[], Any]:
+        """The timed callable for a stage; untimed preparation happens here."""
+        if stage == "gen_witness":
+            return lambda: self._gen_witness(input_vector)
+
+        if stage == "witness_parse":
+            self._gen_witness(input_vector)
+            with open(self.paths["witness"]) as f:
+                raw = f.read()
+            return lambda: json.loads(raw)
+
+        if stage == "decode_outputs":
+            self._gen_witness(input_vector)
+            with open(self.paths["witness"]) as f:
+                rescaled = json.load(f)["pretty_elements"]["rescaled_outputs"][0]
+            return lambda: decode_rescaled_outputs(np.array([rescaled]))
+
+        if stage == "native_predict":
+            vectors = np.array([input_vector])
+            self.native.predict(self.model_id, self.paths["pt"], vectors)  # Load outside the timing
+            return lambda: self.native.predict(self.model_id, self.paths["pt"], vectors)
+
+        if stage == "mock":
+            self._gen_witness(input_vector)
+            return lambda: ezkl.mock(self.paths["witness"], self.paths["compiled"])
+
+        if stage == "prove":
+            self._gen_witness(input_vector)
+            return lambda: ezkl.prove(
+                self.paths["witness"], self.paths["compiled"], self.paths["pk"],
+                self.paths["proof"], "single", srs_path=self.srs_path,
+            )
+
+        if stage == "verify":
+            return lambda: ezkl.verify(
+                self.paths["proof"], self.paths["settings"], self.paths["vk"], srs_path=self.srs_path
+            )
+
+        if stage == "encode_evm_calldata":
+            return lambda: ezkl.encode_evm_calldata(self.paths["proof"], self.paths["calldata"])
+
+        raise ValueError(f"Unknown stage: {stage}")
+
+    def run(self, stages: List[str], iterations: int, warmup: int, seed: int) -> Dict[str, Any]:
+        rng = random.Random(seed)
+        result: Dict[str, Any] = {
+            "artifacts": {
+                name: artifact_digest(self.paths[name])
+                for name in ("compiled", "pk", "vk", "settings", "pt") if os.path.isfile(self.paths[name])
+            },
+            "stages": {},
+            "skipped": {},
+        }
+
+        for stage in stages:
+            reason = self.missing(stage)
+            if reason:
+                result["skipped"][stage] = reason
+                continue
+
+            samples, errors, last_error = [], 0, None
+            # Otherwise the peak would be inherited from earlier stages
+            per_stage_peak = reset_peak_rss()
+            for i in range(warmup + iterations):
+                # Some inputs fall outside a circuit's lookup range; count them and move on
+                try:
+                    fn = self.stage_fn(stage, sample_input(self.model_id, rng))
+                    start = time.perf_counter()
+                    fn()
+                    elapsed = time.perf_counter() - start
+                except Exception as e:
+                    errors, last_error = errors + 1, e
+                    continue
+                if i >= warmup:
+                    samples.append(elapsed)
+            if not samples:
+                result["skipped"][stage] = f"failed: {last_error}"
+                continue
+            result["stages"][stage] = {
+                **summarize(samples),
+                "errors": errors,
+                "peak_rss_bytes": peak_rss_bytes(),
+                "peak_rss_scope": "stage" if per_stage_peak else "process",
+            }
+            print(f"  {self.model_id}/{stage}: p50 {result['stages'][stage]['p50_ms']:.2f} ms", file=sys.stderr)
+
+        if os.path.isfile(self.paths["proof"]):
+            with open(self.paths["proof"], 'rb') as f:
+                proof = f.read()
+            result["proof_size_bytes"] = len(proof)
+            result["proof_size_compact_bytes"] = len(proof_codec.encode_compact(proof)[0])
+        if os.path.isfile(self.paths["calldata"]):
+            result["calldata_size_bytes"] = os.path.getsize(self.paths["calldata"])
+        return result
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """Stage timings and proof sizes that got worse than the baseline by more than `threshold`."""
+    regressions = []
+    for model_id, model in current["models"].items():
+        base_model = baseline.get("models", {}).get(model_id)
+        if not base_model:
+            continue
+        for stage, stats in model["stages"].items():
+            base_stats = base_model.get("stages", {}).get(stage)
+            if not base_stats:
+                continue
+            for metric in COMPARED:
+                before, after = base_stats[metric], stats[metric]
+                if before > 0 and (after - before) / before > threshold:
+                    regressions.append({
+                        "model_id": model_id, "stage": stage, "metric": metric,
+                        "baseline": before, "current": after, "change": round((after - before) / before, 4),
+                    })
+        before, after = base_model.get("proof_size_bytes"), model.get("proof_size_bytes")
+        if before and after and (after - before) / before > threshold:
+            regressions.append({
+                "model_id": model_id, "stage": "prove", "metric": "proof_size_bytes",
+                "baseline": before, "current": after, "change": round((after - before) / before, 4),
+            })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark each stage of the predict/prove pipeline.")
+    parser.add_argument("--models", nargs="+", default=["parity", "reverse"], help="Model ids to benchmark")
+    parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES, help="Stages to run")
+    parser.add_argument("--iterations", type=int, default=10, help="Timed runs per stage")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed runs per stage")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the sampled inputs")
+    parser.add_argument("--artifacts-dir", type=str, default=DEFAULT_ARTIFACTS_DIR,
+                        help="Directory holding <model_id>/ artifact folders")
+    parser.add_argument("--srs-dir", type=str, default=None,
+                        help="Directory with kzg<logrows>.srs files (defaults to ezkl's ~/.ezkl/srs)")
+    parser.add_argument("--out", type=str, default=None, help="Write the JSON results here (default: stdout)")
+    parser.add_argument("--compare", type=str, default=None, help="Baseline results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative slowdown (or proof growth) reported as a regression")
+    args = parser.parse_args()
+
+    stages = [stage for stage in STAGES if stage in args.stages]
+    results = {
+        "version": 1,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "ezkl": getattr(ezkl, "__version__", None),
+        },
+        "config": {"iterations": args.iterations, "warmup": args.warmup, "seed": args.seed, "stages": stages},
+        "models": {},
+    }
+
+    for model_id in args.models:
+        with tempfile.TemporaryDirectory(prefix=f"bench-{model_id}-") as work_dir:
+            bench = ModelBenchmark(model_id, os.path.join(args.artifacts_dir, model_id), work_dir, args.srs_dir)
+            results["models"][model_id] = bench.run(stages, args.iterations, args.warmup, args.seed)
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        results["comparison"] = {
+            "baseline": args.compare,
+            "threshold": args.threshold,
+            "regressions": compare(results, baseline, args.threshold),
+        }
+        for r in results["comparison"]["regressions"]:
+            print(
+                f"REGRESSION {r['model_id']}/{r['stage']} {r['metric']}: "
+                f"{r['baseline']} -> {r['current']} ({r['change']:+.1%})",
+                file=sys.stderr,
+            )
+        exit_code = 1 if results["comparison"]["regressions"] else 0
+
+    output = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Pack older proofs into per-model segment objects.
+
+Run from the backend directory, e.g.:
+
+    python -m tools.compact_segments
+    python -m tools.compact_segments --model-id parity --min-age-seconds 3600 --dry-run
+"""
+import argparse
+import asyncio
+
+from app.core.config import settings
+from app.services.akave import AkaveService
+from app.services.proof_index import ProofIndex
+from app.services.segments import SegmentCompactor
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Pack older proofs into segment objects with a sidecar index.")
+    parser.add_argument("--model-id", type=str, default=None, help="Only compact proofs of this model")
+    parser.add_argument("--max-segment-bytes", type=int, default=settings.PROOF_SEGMENT_MAX_BYTES,
+                        help="Maximum size of a segment object")
+    parser.add_argument("--min-age-seconds", type=int, default=settings.PROOF_SEGMENT_MIN_AGE_SECONDS,
+                        help="Only compact proofs at least this old")
+    parser.add_argument("--concurrency", type=int, default=16, help="Proofs downloaded in parallel")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be packed without writing anything")
+    args = parser.parse_args()
+
+    akave = AkaveService()
+    index = ProofIndex()
+    akave.locate_proof = index.locate
+    compactor = SegmentCompactor(akave, index, args.max_segment_bytes, args.min_age_seconds, args.concurrency)
+
+    run = await compactor.compact(args.model_id, dry_run=args.dry_run)
+    print(
+        f"{'Would pack' if args.dry_run else 'Packed'} {run['proofs']} proofs into {run['segments']} segments "
+        f"({run['bytes']} bytes, {run['deleted']} originals deleted, {run['errors']} errors) "
+        f"in {run['elapsed_seconds']:.1f}s"
+    )
+    akave.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,32 @@
+"""
+Generate a local (insecure, testing only) KZG SRS for offline aggregation.
+
+Run from the backend directory, e.g.:
+
+    python -m tools.gen_srs --logrows 20 --out /tmp/kzg20.srs
+
+then start the backend with AGGREGATION_LOGROWS=20 AGGREGATION_SRS_PATH=/tmp/kzg20.srs.
+Production deployments should use the SRS from ezkl's trusted setup
+(ezkl get-srs) instead.
+"""
+import argparse
+import os
+import time
+
+import ezkl
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a local KZG SRS for testing proof aggregation.")
+    parser.add_argument("--logrows", type=int, required=True, help="log2 of the number of rows")
+    parser.add_argument("--out", type=str, required=True, help="Where to write the SRS")
+    args = parser.parse_args()
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    start = time.perf_counter()
+    ezkl.gen_srs(args.out, args.logrows)
+    print(f"Wrote {args.out} ({os.path.getsize(args.out)} bytes) in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
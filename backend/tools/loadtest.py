@@ -0,0 +1,433 @@
+"""
+End-to-end load test of the API against a local S3 stand-in.
+
+Boots `app.main:app` with uvicorn in a subprocess, pointed at a local
+S3-compatible server instead of Akave, seeds it with proofs, then drives
+a weighted mix of traffic at a fixed concurrency (closed loop) or a fixed
+request rate (open loop) and reports throughput, latency percentiles,
+error rates and the proof queue / prover pool depths sampled from
+/prover/status.
+
+The stand-in is moto's S3 server, started in-process (pip install
+"moto[server]"), unless --s3-endpoint points at one already running
+(e.g. MinIO). --app-url targets an already running app instead of
+booting one. Run from the backend directory, e.g.:
+
+    python -m tools.loadtest --concurrency 32 --duration 60
+    python -m tools.loadtest --rate 200 --mix inference=80,list=10,download=10 --out load.json
+    python -m tools.loadtest --keys-dir ../snarks/models --proof-file proof.json --mix verify=1
+
+Operations (--mix weights):
+    inference  POST /inference/ with a random valid input
+    proof      POST /proofs/request (queued; proving needs the model's pk)
+    list       GET  /proofs/?limit=100
+    download   GET  /proofs/{model_id}/{proof_id}/raw of a seeded proof
+    details    GET  /proofs/{model_id}/{proof_id}
+    verify     POST /proofs/{model_id}/{proof_id}/verify of a seeded proof
+               (needs --keys-dir and a real --proof-file to be valid)
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import boto3
+import httpx
+import numpy as np
+
+API = "/api/v1"
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MIX = "inference=60,proof=5,list=10,download=15,details=5,verify=5"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in OPERATIONS:
+            raise SystemExit(f"Unknown operation in --mix: {name}")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+def sample_input(model_id: str, rng: random.Random) -> List[int]:
+    high = 1 if model_id == "parity" else 9
+    return [rng.randint(0, high) for _ in range(6)]
+
+
+# --- S3 stand-in and app -----------------------------------------------------
+
+def start_s3(port: int):
+    try:
+        from moto.server import ThreadedMotoServer
+    except ImportError:
+        raise SystemExit('The local S3 stand-in needs moto: pip install "moto[server]" (or pass --s3-endpoint)')
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=port, verbose=False)
+    server.start()
+    return server
+
+
+def seed(endpoint: str, bucket: str, models: List[str], count: int, proof_file: Optional[str],
+         keys_dir: Optional[str]) -> List[Tuple[str, str]]:
+    """Create the bucket and upload `count` proofs per model (plus settings/vk when given)."""
+    s3 = boto3.client(
+        "s3", endpoint_url=endpoint, region_name="akave-network",
+        aws_access_key_id="loadtest", aws_secret_access_key="loadtest",
+    )
+    try:
+        s3.create_bucket(Bucket=bucket, CreateBucketConfiguration={"LocationConstraint": "akave-network"})
+    except s3.exceptions.BucketAlreadyOwnedByYou:
+        pass
+
+    if proof_file:
+        with open(proof_file, 'rb') as f:
+            proof = f.read()
+    else:
+        # Shaped like an ezkl proof, so downloads and listings see realistic sizes
+        rng = random.Random(0)
+        proof = json.dumps({
+            "instances": [[os.urandom(32).hex() for _ in range(60)]],
+            "proof": [rng.randint(0, 255) for _ in range(4000)],
+            "hex_proof": "0x" + os.urandom(4000).hex(),
+            "transcript_type": "EVM",
+        }).encode()
+
+    for model_id in models:
+        if keys_dir:
+            for name, key in ((f"{model_id}-settings.json", f"settings/{model_id}.json"),
+                              (f"{model_id}-test.vk", f"verification-keys/{model_id}.vk")):
+                path = os.path.join(keys_dir, name)
+                if os.path.isfile(path):
+                    with open(path, 'rb') as f:
+                        s3.put_object(Bucket=bucket, Key=key, Body=f.read())
+
+    seeded = []
+    for model_id in models:
+        for _ in range(count):
+            proof_id = str(uuid.uuid4())
+            s3.put_object(
+                Bucket=bucket, Key=f"proofs/{model_id}/{proof_id}.json", Body=proof,
+                ContentType="application/json", Metadata={"model_id": model_id},
+            )
+            seeded.append((model_id, proof_id))
+    return seeded
+
+
+def start_app(port: int, endpoint: str, bucket: str, work_dir: str, extra_env: Dict[str, str]) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "AKAVE_ENDPOINT": endpoint,
+        "AKAVE_ACCESS_KEY": "loadtest",
+        "AKAVE_SECRET_KEY": "loadtest",
+        "AKAVE_BUCKET": bucket,
+        "PROOF_INDEX_PATH": os.path.join(work_dir, "proofs.sqlite3"),
+        "VERIFIER_CONTEXT_DIR": os.path.join(work_dir, "verifiers"),
+        **extra_env,
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, start_new_session=True,
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 120.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.25)
+    raise SystemExit("The app did not become healthy in time")
+
+
+# --- Operations --------------------------------------------------------------
+
+class Context:
+    def __init__(self, models: List[str], seeded: List[Tuple[str, str]], seed_value: int):
+        self.models = models
+        self.seeded = seeded
+        self.rng = random.Random(seed_value)
+
+    def proof(self) -> Tuple[str, str]:
+        return self.rng.choice(self.seeded)
+
+
+async def op_inference(client: httpx.AsyncClient, ctx: Context) -> httpx.Response:
+    model_id = ctx.rng.choice(ctx.models)
+    return await client.post(f"{API}/inference/", json={
+        "model_id": model_id, "input_vector": sample_input(model_id, ctx.rng)
+    })
+
+
+async def op_proof(client: httpx.AsyncClient, ctx: Context) -> httpx.Response:
+    return await client.post(f"{API}/proofs/request", json={"input_hash": uuid.uuid4().hex})
+
+
+async def op_list(client: httpx.AsyncClient, ctx: Context) -> httpx.Response:
+    return await client.get(f"{API}/proofs/", params={"limit": 100, "model_id": ctx.rng.choice(ctx.models)})
+
+
+async def op_download(client: httpx.AsyncClient, ctx: Context) -> httpx.Response:
+    model_id, proof_id = ctx.proof()
+    return await client.get(f"{API}/proofs/{model_id}/{proof_id}/raw")
+
+
+async def op_details(client: httpx.AsyncClient, ctx: Context) -> httpx.Response:
+    model_id, proof_id = ctx.proof()
+    return await client.get(f"{API}/proofs/{model_id}/{proof_id}")
+
+
+async def op_verify(client: httpx.AsyncClient, ctx: Context) -> httpx.Response:
+    model_id, proof_id = ctx.proof()
+    return await client.post(f"{API}/proofs/{model_id}/{proof_id}/verify")
+
+
+OPERATIONS = {
+    "inference": op_inference,
+    "proof": op_proof,
+    "list": op_list,
+    "download": op_download,
+    "details": op_details,
+    "verify": op_verify,
+}
+
+
+# --- Load generation ---------------------------------------------------------
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {name: [] for name in OPERATIONS}
+        self.statuses: Dict[str, Dict[str, int]] = {name: {} for name in OPERATIONS}
+        self.recording = False
+
+    def record(self, name: str, elapsed: float, status: str):
+        if not self.recording:
+            return
+        self.latencies[name].append(elapsed)
+        self.statuses[name][status] = self.statuses[name].get(status, 0) + 1
+
+
+async def issue(client: httpx.AsyncClient, ctx: Context, recorder: Recorder, name: str):
+    start = time.perf_counter()
+    try:
+        response = await OPERATIONS[name](client, ctx)
+        status = str(response.status_code)
+    except httpx.TimeoutException:
+        status = "timeout"
+    except httpx.TransportError as e:
+        status = type(e).__name__
+    recorder.record(name, time.perf_counter() - start, status)
+
+
+async def closed_loop(client, ctx, recorder, names, weights, concurrency: int, stop_at: float):
+    async def user():
+        while time.monotonic() < stop_at:
+            await issue(client, ctx, recorder, ctx.rng.choices(names, weights)[0])
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+
+
+async def open_loop(client, ctx, recorder, names, weights, rate: float, stop_at: float):
+    # Poisson arrivals at the target rate, independent of response times
+    pending = set()
+    next_at = time.monotonic()
+    while next_at < stop_at:
+        await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+        task = asyncio.create_task(issue(client, ctx, recorder, ctx.rng.choices(names, weights)[0]))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+        next_at += ctx.rng.expovariate(rate)
+    if pending:
+        await asyncio.wait(pending)
+
+
+async def sample_status(client: httpx.AsyncClient, samples: List[Dict[str, Any]], stop: asyncio.Event):
+    while not stop.is_set():
+        try:
+            status = (await client.get(f"{API}/prover/status")).json()
+            samples.append({
+                "queue_depth": status["proof_jobs"]["queue_depth"],
+                "pending_prover_jobs": status["pool"]["pending_jobs"],
+                "jobs": status["proof_jobs"]["jobs"],
+            })
+        except Exception:
+            pass
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=1.0)
+        except asyncio.TimeoutError:
+            pass
+
+
+def report(recorder: Recorder, elapsed: float, samples: List[Dict[str, Any]]) -> Dict[str, Any]:
+    operations = {}
+    total = errors = 0
+    for name, latencies in recorder.latencies.items():
+        if not latencies:
+            continue
+        ms = np.asarray(latencies) * 1000.0
+        statuses = recorder.statuses[name]
+        failed = sum(n for status, n in statuses.items() if not status.isdigit() or int(status) >= 400)
+        total += len(latencies)
+        errors += failed
+        operations[name] = {
+            "requests": len(latencies),
+            "throughput_rps": round(len(latencies) / elapsed, 2),
+            "error_rate": round(failed / len(latencies), 4),
+            "statuses": statuses,
+            **{f"p{p}_ms": round(float(np.percentile(ms, p)), 2) for p in (50, 90, 95, 99)},
+            "max_ms": round(float(ms.max()), 2),
+        }
+
+    queue = [s["queue_depth"] for s in samples] or [0]
+    pool = [s["pending_prover_jobs"] for s in samples] or [0]
+    return {
+        "duration_seconds": round(elapsed, 2),
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 2) if elapsed > 0 else None,
+        "error_rate": round(errors / total, 4) if total else None,
+        "operations": operations,
+        "queues": {
+            "proof_queue_depth_max": max(queue),
+            "proof_queue_depth_mean": round(float(np.mean(queue)), 2),
+            "prover_pending_max": max(pool),
+            "prover_pending_mean": round(float(np.mean(pool)), 2),
+            "final_jobs": samples[-1]["jobs"] if samples else None,
+        },
+    }
+
+
+async def run(args, base_url: str, seeded: List[Tuple[str, str]]) -> Dict[str, Any]:
+    names = list(args.mix)
+    weights = [args.mix[name] for name in names]
+    ctx = Context(args.models, seeded, args.seed)
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=max(args.concurrency, 100), max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        await wait_ready(client)
+
+        samples: List[Dict[str, Any]] = []
+        stop = asyncio.Event()
+        sampler = asyncio.create_task(sample_status(client, samples, stop))
+
+        async def drive(seconds: float):
+            stop_at = time.monotonic() + seconds
+            if args.rate:
+                await open_loop(client, ctx, recorder, names, weights, args.rate, stop_at)
+            else:
+                await closed_loop(client, ctx, recorder, names, weights, args.concurrency, stop_at)
+
+        if args.warmup > 0:
+            await drive(args.warmup)
+        samples.clear()
+        recorder.recording = True
+        start = time.monotonic()
+        await drive(args.duration)
+        elapsed = time.monotonic() - start
+
+        stop.set()
+        await sampler
+    return report(recorder, elapsed, samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the API against a local S3 stand-in.")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"Weighted operations, e.g. {DEFAULT_MIX}")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent users (closed loop)")
+    parser.add_argument("--rate", type=float, default=None, help="Target requests/second (open loop)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Unmeasured seconds before measuring")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument("--models", nargs="+", default=["parity", "reverse"], help="Model ids to exercise")
+    parser.add_argument("--seed-proofs", type=int, default=200, help="Proofs seeded per model")
+    parser.add_argument("--proof-file", type=str, default=None, help="Proof JSON to seed (default: synthetic)")
+    parser.add_argument("--keys-dir", type=str, default=None,
+                        help="Directory with <model_id>-settings.json and <model_id>-test.vk to seed")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for inputs and operation choice")
+    parser.add_argument("--s3-endpoint", type=str, default=None, help="Use a running S3 stand-in")
+    parser.add_argument("--bucket", type=str, default="loadtest-bucket", help="Bucket in the stand-in")
+    parser.add_argument("--app-url", type=str, default=None, help="Target a running app instead of booting one")
+    parser.add_argument("--env", action="append", default=[],
+                        help="Extra KEY=VALUE settings for the booted app (repeatable)")
+    parser.add_argument("--out", type=str, default=None, help="Write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+
+    s3_server = app = None
+    work_dir = tempfile.mkdtemp(prefix="loadtest-")
+    try:
+        seeded: List[Tuple[str, str]] = []
+        base_url = args.app_url
+        if base_url is None:
+            endpoint = args.s3_endpoint
+            if endpoint is None:
+                port = free_port()
+                s3_server = start_s3(port)
+                endpoint = f"http://127.0.0.1:{port}"
+            seeded = seed(endpoint, args.bucket, args.models, args.seed_proofs, args.proof_file, args.keys_dir)
+
+            app_port = free_port()
+            extra_env = dict(item.split("=", 1) for item in args.env)
+            app = start_app(app_port, endpoint, args.bucket, work_dir, extra_env)
+            base_url = f"http://127.0.0.1:{app_port}"
+        elif any(name in args.mix for name in ("download", "details", "verify")):
+            raise SystemExit("download/details/verify need seeded proofs; drop them from --mix with --app-url")
+
+        results = asyncio.run(run(args, base_url, seeded))
+        results = {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "config": {
+                "mix": args.mix, "concurrency": None if args.rate else args.concurrency, "rate": args.rate,
+                "duration": args.duration, "warmup": args.warmup, "models": args.models,
+                "seed_proofs": args.seed_proofs, "env": args.env,
+            },
+            **results,
+        }
+    finally:
+        if app is not None:
+            # The app's own process group includes its prover workers
+            os.killpg(app.pid, signal.SIGTERM)
+            try:
+                app.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                os.killpg(app.pid, signal.SIGKILL)
+        if s3_server is not None:
+            s3_server.stop()
+
+    for name, op in results["operations"].items():
+        print(
+            f"{name:>10}: {op['requests']:>7} req  {op['throughput_rps']:>8.1f} rps  "
+            f"p50 {op['p50_ms']:>8.1f}  p95 {op['p95_ms']:>8.1f}  p99 {op['p99_ms']:>8.1f} ms  "
+            f"errors {op['error_rate']:.1%}",
+            file=sys.stderr,
+        )
+    output = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Rewrite stored proofs in another storage format.
+
+Run from the backend directory, e.g.:
+
+    python -m tools.migrate_proof_format --to compact
+    python -m tools.migrate_proof_format --to json --model-id parity --dry-run
+"""
+import argparse
+import asyncio
+import time
+
+from app.services.akave import AkaveService
+from app.services.proof_index import parse_proof_key
+from app.utils import proof_codec
+
+
+async def migrate_one(akave: AkaveService, model_id: str, proof_id: str, target: str, dry_run: bool) -> dict:
+    result = await akave.download_proof(model_id, proof_id)
+    if "error" in result:
+        return {"status": "error", "error": result["error"], "bytes_before": 0, "bytes_after": 0}
+
+    current = result["format"]
+    already = current == target or (target == "compact" and current in proof_codec.COMPACT_FORMATS)
+    if already:
+        return {"status": "skipped", "bytes_before": result["stored_size"], "bytes_after": result["stored_size"]}
+
+    encoded, fmt = proof_codec.encode(result["data"], target)
+    if not dry_run:
+        # Keep the rest of the object metadata; the format marker is rewritten
+        metadata = {k: v for k, v in result.get("metadata", {}).items() if k != proof_codec.METADATA_KEY}
+        upload = await akave.upload_proof(model_id, proof_id, result["data"], storage_format=fmt, metadata=metadata)
+        if "error" in upload:
+            return {"status": "error", "error": upload["error"], "bytes_before": result["stored_size"], "bytes_after": 0}
+
+    return {"status": "migrated", "bytes_before": result["stored_size"], "bytes_after": len(encoded)}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Rewrite stored proofs in the json or compact storage format.")
+    parser.add_argument("--to", choices=["json", "compact"], required=True, help="Target storage format")
+    parser.add_argument("--model-id", type=str, default=None, help="Only migrate proofs of this model")
+    parser.add_argument("--concurrency", type=int, default=16, help="Proofs rewritten in parallel")
+    parser.add_argument("--dry-run", action="store_true", help="Report the savings without writing anything")
+    args = parser.parse_args()
+
+    akave = AkaveService()
+    prefix = f"proofs/{args.model_id}/" if args.model_id else "proofs/"
+    semaphore = asyncio.Semaphore(max(1, args.concurrency))
+    totals = {"migrated": 0, "skipped": 0, "error": 0, "bytes_before": 0, "bytes_after": 0}
+    start = time.perf_counter()
+
+    async def run(model_id: str, proof_id: str):
+        async with semaphore:
+            outcome = await migrate_one(akave, model_id, proof_id, args.to, args.dry_run)
+        totals[outcome["status"]] += 1
+        totals["bytes_before"] += outcome["bytes_before"]
+        totals["bytes_after"] += outcome["bytes_after"]
+        if outcome["status"] == "error":
+            print(f"proofs/{model_id}/{proof_id}.json: {outcome['error']}")
+
+    # List page by page so memory stays flat on large buckets
+    pending = set()
+    async for obj in akave.iter_objects(prefix):
+        parsed = parse_proof_key(obj["Key"])
+        if parsed is None:
+            continue
+        pending.add(asyncio.create_task(run(*parsed)))
+        if len(pending) >= 4 * args.concurrency:
+            _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+    if pending:
+        await asyncio.wait(pending)
+
+    elapsed = time.perf_counter() - start
+    saved = totals["bytes_before"] - totals["bytes_after"]
+    print(
+        f"{'Would migrate' if args.dry_run else 'Migrated'} {totals['migrated']} proofs "
+        f"({totals['skipped']} already {args.to}, {totals['error']} errors) in {elapsed:.1f}s; "
+        f"{totals['bytes_before']} -> {totals['bytes_after']} bytes ({saved} saved)"
+    )
+    akave.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
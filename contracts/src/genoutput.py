@@ -1,3 +1,10 @@
+import os
+import sys
+
+# Use the backend's encoder so the output matches the calldata the API serves
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "backend"))
+from app.utils.calldata import to_hex
+
 byt = open("calldata.bytes", "rb").read()
-calldata_hex = "0x" + ''.join(f"{byte:02x}" for byte in byt)
+calldata_hex = to_hex(byt)
 print(calldata_hex)
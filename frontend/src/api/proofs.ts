@@ -1,11 +1,14 @@
 import { apiClient } from './client';
 import { 
   ProofGenerationResponse, 
+  ProofJobStatus,
   ProofListItem, 
   ProofDetails, 
   VerificationResponse 
 } from '@/types';
 
+const PROOF_POLL_INTERVAL_MS = 1000;
+
 export class ProofsApi {
   /**
    * Generate proof for the most recent prediction
@@ -20,7 +23,40 @@ export class ProofsApi {
       }
     };
     
-    return apiClient.post<ProofGenerationResponse>('/proofs/request', requestData);
+    const job = await apiClient.post<ProofGenerationResponse>('/proofs/request', requestData);
+
+    // Proving runs in the background; poll the job until it is uploaded
+    const status = await this.waitForProof(job.proof_id);
+    return {
+      ...job,
+      // A repeated request resolves to the proof already stored for it
+      proof_id: status.proof_id,
+      key: status.storage_location || job.key,
+      etag: status.etag,
+      status: status.status,
+      message: 'Proof generated and uploaded successfully',
+    };
+  }
+
+  /**
+   * Get the status of a proof job
+   */
+  async getProofStatus(proof_id: string): Promise<ProofJobStatus> {
+    return apiClient.get<ProofJobStatus>(`/proofs/${proof_id}`);
+  }
+
+  /**
+   * Poll a proof job until it is uploaded or has failed
+   */
+  async waitForProof(proof_id: string): Promise<ProofJobStatus> {
+    for (;;) {
+      const status = await this.getProofStatus(proof_id);
+      if (status.status === 'uploaded') return status;
+      if (status.status === 'failed') {
+        throw new Error(status.error || 'Proof generation failed');
+      }
+      await new Promise(resolve => setTimeout(resolve, PROOF_POLL_INTERVAL_MS));
+    }
   }
 
   /**
@@ -40,6 +40,23 @@ export interface ProofGenerationResponse {
   checksum_type?: string;
   bucket: string;
   message: string;
+  status?: ProofJobState;
+}
+
+export type ProofJobState = 'queued' | 'running' | 'uploaded' | 'failed';
+
+export interface ProofJobStatus {
+  proof_id: string;
+  job_id?: string;
+  status: ProofJobState;
+  model_id?: string;
+  proof_hash?: string;
+  storage_location?: string;
+  stage_timings: Record<string, number>;
+  created_at?: string;
+  finished_at?: string;
+  etag?: string;
+  error?: string;
 }
 
 export interface ProofListItem {